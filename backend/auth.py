@@ -0,0 +1,228 @@
+"""Token verification with caching and revocation.
+
+- TokenCache: bounded LRU of verified JWT payloads keyed by the SHA-256 digest
+  of the token, so a repeat request skips jwt.decode. Entries are dropped once
+  the token's exp has passed.
+- UserCache: short-TTL cache of user records (without the password hash),
+  shared by the handlers that need more than the token's claims. Bounded, and
+  expired records are evicted as new ones arrive.
+- RevocationList: revoked token digests (logout) and per-user cutoffs
+  (deactivation), held in memory and checked on every request, cache hit or
+  not. Revocations are written to the revoked_tokens collection and other
+  workers pick them up on their next refresh, so a logout elsewhere takes
+  effect within the refresh interval without a per-request database check.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import jwt
+
+USER_FIELDS = {"_id": 0, "password_hash": 0}
+
+# Refreshes re-read this much history so a revocation committed slightly out of
+# revoked_at order by another worker is not skipped; applying one twice is harmless
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _epoch(moment: datetime) -> float:
+    # Mongo hands back naive datetimes that are UTC; a naive .timestamp() would read them as local time
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class TokenCache:
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str, now: float) -> Optional[Dict[str, Any]]:
+        payload = self._entries.get(digest)
+        if payload is None:
+            self.misses += 1
+            return None
+        if payload.get("exp") is not None and payload["exp"] <= now:
+            del self._entries[digest]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return payload
+
+    def set(self, digest: str, payload: Dict[str, Any]) -> None:
+        self._entries[digest] = payload
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, digest: str) -> None:
+        self._entries.pop(digest, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class UserCache:
+    def __init__(self, ttl_seconds: float = 30, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Kept in insertion order; with one TTL for every entry that is also expiry order
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, db, user_id: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > now:
+            return entry[1]
+        user = await db.users.find_one({"id": user_id}, USER_FIELDS)
+        if user is not None and self.ttl_seconds > 0:
+            self._entries[user_id] = (now + self.ttl_seconds, user)
+            self._entries.move_to_end(user_id)
+        else:
+            self._entries.pop(user_id, None)
+        self._evict(now)
+        return user
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            user_id, (expires, _) = next(iter(self._entries.items()))
+            if expires > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[user_id]
+
+    def invalidate(self, user_id: str) -> None:
+        self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "ttl_seconds": self.ttl_seconds}
+
+
+class RevocationList:
+    def __init__(self):
+        self._tokens: Dict[str, Optional[float]] = {}  # digest -> token exp (None: never expires)
+        self._users: Dict[str, float] = {}  # user_id -> tokens issued before this are revoked
+        self._seen_until: Optional[datetime] = None
+
+    def is_revoked(self, digest: str, payload: Dict[str, Any]) -> bool:
+        if digest in self._tokens:
+            return True
+        cutoff = self._users.get(payload.get("user_id"))
+        return cutoff is not None and payload.get("iat", 0) < cutoff
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        if entry.get("digest"):
+            expires_at = entry.get("expires_at")
+            self._tokens[entry["digest"]] = _epoch(expires_at) if expires_at else None
+        elif entry.get("user_id"):
+            self._users[entry["user_id"]] = _epoch(entry["revoked_at"])
+
+    async def revoke_token(self, db, digest: str, exp: Optional[float]) -> None:
+        entry = {
+            "digest": digest,
+            "revoked_at": datetime.utcnow(),
+            # TTL index on expires_at removes the record once the token could no longer be used
+            "expires_at": datetime.fromtimestamp(exp, timezone.utc) if exp else None
+        }
+        self._apply(entry)
+        await db.revoked_tokens.update_one({"digest": digest}, {"$setOnInsert": entry}, upsert=True)
+
+    async def revoke_user(self, db, user_id: str) -> None:
+        entry = {"user_id": user_id, "revoked_at": datetime.utcnow()}
+        self._apply(entry)
+        await db.revoked_tokens.update_one({"user_id": user_id}, {"$set": entry}, upsert=True)
+
+    async def refresh(self, db) -> int:
+        """Pull revocations recorded since the last refresh (by any worker) and prune expired ones"""
+        since = self._seen_until - REFRESH_OVERLAP if self._seen_until else datetime.min
+        new = await db.revoked_tokens.find({"revoked_at": {"$gt": since}}, {"_id": 0}).to_list(length=None)
+        for entry in new:
+            self._apply(entry)
+            self._seen_until = max(self._seen_until or entry["revoked_at"], entry["revoked_at"])
+        now = time.time()
+        self._tokens = {digest: exp for digest, exp in self._tokens.items() if exp is None or exp > now}
+        return len(new)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tokens": len(self._tokens), "users": len(self._users)}
+
+
+class Authenticator:
+    def __init__(
+        self,
+        secret_key: str,
+        token_ttl_seconds: float = 604800,
+        token_cache_size: int = 10000,
+        user_cache_ttl: float = 30,
+        user_cache_size: int = 10000
+    ):
+        self.secret_key = secret_key
+        self.token_ttl_seconds = token_ttl_seconds
+        self.tokens = TokenCache(token_cache_size)
+        self.users = UserCache(user_cache_ttl, user_cache_size)
+        self.revocations = RevocationList()
+
+    def create_token(self, data: Dict[str, Any]) -> str:
+        now = int(time.time())
+        claims = {**data, "iat": now, "jti": uuid.uuid4().hex}
+        if self.token_ttl_seconds > 0:
+            claims["exp"] = now + int(self.token_ttl_seconds)
+        return jwt.encode(claims, self.secret_key, algorithm="HS256")
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Verified payload for token, or None if it is invalid, expired or revoked"""
+        digest = token_digest(token)
+        payload = self.tokens.get(digest, time.time())
+        if payload is None:
+            try:
+                payload = jwt.decode(token, self.secret_key, algorithms=["HS256"])
+            except jwt.PyJWTError:
+                return None
+            self.tokens.set(digest, payload)
+        if self.revocations.is_revoked(digest, payload):
+            return None
+        return payload
+
+    async def revoke_token(self, db, token: str, payload: Dict[str, Any]) -> None:
+        digest = token_digest(token)
+        self.tokens.discard(digest)
+        await self.revocations.revoke_token(db, digest, payload.get("exp"))
+
+    async def revoke_user(self, db, user_id: str) -> None:
+        self.users.invalidate(user_id)
+        await self.revocations.revoke_user(db, user_id)
+
+    async def run_revocation_refresher(self, db, interval_seconds: float):
+        """Background loop picking up revocations made by other workers"""
+        while True:
+            try:
+                await self.revocations.refresh(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error refreshing token revocations: {str(e)}")
+            await asyncio.sleep(interval_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tokens": self.tokens.stats(),
+            "users": self.users.stats(),
+            "revoked": self.revocations.stats(),
+        }
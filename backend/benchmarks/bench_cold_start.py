@@ -0,0 +1,120 @@
+"""Cold start: process launch to first served request.
+
+    python benchmarks/bench_cold_start.py --workers 4 --runs 5 --budget 5
+
+Each run launches `uvicorn server:app` from backend/ as a subprocess (with the
+current environment, so MONGO_URL etc. apply) and polls until:
+
+- /health answers: the socket is accepting and the app is up
+- /ready answers 200: this worker finished indexes, seeding and table loads
+- /api/plants answers 200: the first real catalog request was served
+
+With --workers N the /ready polls keep going until N distinct pids have
+reported, and each worker's own launch-to-ready time (startup_seconds) is shown
+next to the wall-clock numbers.
+
+--drop-db drops nursery_ecommerce before each run to time a first boot with
+seeding. Only use it against a scratch Mongo.
+
+Exits non-zero if any run's time to the first /api/plants exceeds --budget.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def drop_database(mongo_url):
+    from pymongo import MongoClient
+
+    client = MongoClient(mongo_url)
+    client.drop_database("nursery_ecommerce")
+    client.close()
+
+
+def wait_for(url, launched, timeout, accept=(200,)):
+    deadline = launched + timeout
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        try:
+            response = session.get(url, timeout=1)
+            if response.status_code in accept:
+                return time.monotonic() - launched, response
+        except requests.RequestException:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} not answering after {timeout}s")
+
+
+def worker_startups(base_url, workers, timeout):
+    """startup_seconds reported by each worker, keyed by pid"""
+    seen = {}
+    deadline = time.monotonic() + timeout
+    session = requests.Session()
+    while len(seen) < workers and time.monotonic() < deadline:
+        # A fresh connection each time so the load spreads across workers
+        session.close()
+        response = session.get(f"{base_url}/ready", timeout=1)
+        if response.status_code == 200:
+            state = response.json()
+            seen[state["pid"]] = state["startup_seconds"]
+    return seen
+
+
+def run_once(args):
+    if args.drop_db:
+        drop_database(args.mongo_url)
+    env = dict(os.environ, MONGO_URL=args.mongo_url, STARTUP_MODE=args.startup_mode)
+    launched = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port), "--workers", str(args.workers)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        health, _ = wait_for(f"{base_url}/health", launched, args.timeout)
+        ready, _ = wait_for(f"{base_url}/ready", launched, args.timeout)
+        first_request, _ = wait_for(f"{base_url}/api/plants", launched, args.timeout)
+        workers = worker_startups(base_url, args.workers, args.timeout)
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return health, ready, first_request, workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--startup-mode", choices=("blocking", "background"), default="blocking")
+    parser.add_argument("--drop-db", action="store_true")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds from launch to the first /api/plants")
+    args = parser.parse_args()
+
+    print(f"{'run':>3}  {'health':>8}  {'ready':>8}  {'first req':>9}  per-worker startup_seconds")
+    over_budget = False
+    for run in range(1, args.runs + 1):
+        health, ready, first_request, workers = run_once(args)
+        per_worker = ", ".join(f"{seconds:.2f}" for seconds in sorted(workers.values()))
+        print(f"{run:>3}  {health:>7.2f}s  {ready:>7.2f}s  {first_request:>8.2f}s  [{per_worker}]")
+        over_budget = over_budget or first_request > args.budget
+    if over_budget:
+        print(f"❌ cold start exceeded the {args.budget:.1f}s budget")
+        sys.exit(1)
+    print(f"✅ cold start within the {args.budget:.1f}s budget")
+
+
+if __name__ == "__main__":
+    main()
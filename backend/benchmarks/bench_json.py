@@ -0,0 +1,82 @@
+"""Listing serialization throughput at 100 / 1k / 10k documents.
+
+    python benchmarks/bench_json.py
+    python benchmarks/bench_json.py --repeat 50
+
+Compares the old path (stringify _id in a Python loop, then jsonable_encoder
+and stdlib json.dumps, as FastAPI does for a returned list) with
+json_response.dumps on documents fetched without _id. Documents are synthetic
+plants carrying an ObjectId and datetime fields, as they come back from Motor.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from json_response import dumps  # noqa: E402
+from synthetic import synthetic_plants  # noqa: E402
+
+SIZES = (100, 1_000, 10_000)
+
+
+def mongo_documents(count):
+    created = datetime(2024, 1, 1)
+    return [
+        {"_id": ObjectId(), **plant, "created_at": created + timedelta(minutes=i)}
+        for i, plant in enumerate(synthetic_plants(count))
+    ]
+
+
+def old_path(documents):
+    serialized = []
+    for document in documents:
+        if "_id" in document:
+            document["_id"] = str(document["_id"])
+        serialized.append(document)
+    return json.dumps(
+        jsonable_encoder(serialized), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def new_path(documents):
+    return dumps(documents)
+
+
+def median_seconds(fn, make_input, repeat):
+    samples = []
+    for _ in range(repeat):
+        documents = make_input()
+        start = time.perf_counter()
+        fn(documents)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'docs':>7} {'old docs/s':>14} {'new docs/s':>14} {'speedup':>9} {'bytes':>11}")
+    for size in SIZES:
+        with_id = mongo_documents(size)
+        # The new path never sees _id: the Mongo projection drops it
+        without_id = [{key: value for key, value in doc.items() if key != "_id"} for doc in with_id]
+        old = median_seconds(old_path, lambda: [dict(doc) for doc in with_id], args.repeat)
+        new = median_seconds(new_path, lambda: without_id, args.repeat)
+        print(
+            f"{size:>7} {size / old:>14,.0f} {size / new:>14,.0f} {old / new:>8.1f}x"
+            f" {len(new_path(without_id)):>11,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Request-path cost of logging, before and after the queued JSON pipeline.
+
+    python benchmarks/bench_logging.py --requests 20000 --sink-latency-ms 0.5
+
+A trivial ASGI endpoint standing in for GET /api/plants is called in-process,
+so the numbers are the logging overhead alone:
+
+- none: no logging at all
+- before: logging.basicConfig-style StreamHandler, one f-string logging.info
+  per request, written synchronously on the request path
+- after (rate r): AccessLogMiddleware + LogPipeline with the route sampled at r
+
+Records go to a sink that sleeps --sink-latency-ms per write, standing in for
+a slow stdout pipe or disk. With the old handler that sleep lands on every
+request. With the pipeline it lands on the listener thread; once the queue is
+full, records are dropped instead of waited on.
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from structured_logging import AccessLogMiddleware, LogPipeline  # noqa: E402
+
+ROUTE = SimpleNamespace(path="/api/plants")
+SCOPE = {"type": "http", "method": "GET", "path": "/api/plants", "headers": [], "query_string": b""}
+
+
+class SlowSink(io.TextIOBase):
+    def __init__(self, latency_seconds):
+        self.latency_seconds = latency_seconds
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return len(text)
+
+
+def endpoint(log_each_request):
+    async def app(scope, receive, send):
+        # FastAPI leaves the matched route in the scope; the access log reads it from there
+        scope["route"] = ROUTE
+        if log_each_request:
+            logging.info(f"Retrieved {20} plants from database")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"[]"})
+    return app
+
+
+async def drive(app, requests):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await app(dict(SCOPE), receive, send)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def summarize(name, samples, sink):
+    ordered = sorted(samples)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(pct / 100 * (len(ordered) - 1)))]
+    print(f"{name:<18} {sum(samples) / len(samples):>9.1f} {pick(50):>9.1f} {pick(99):>9.1f} {sink.writes:>8}")
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sink-latency-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    latency = args.sink_latency_ms / 1000
+
+    print(f"{'scenario':<18} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'writes':>8}")
+
+    reset_root()
+    sink = SlowSink(latency)
+    summarize("none", asyncio.run(drive(endpoint(False), args.requests)), sink)
+
+    reset_root()
+    sink = SlowSink(latency)
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    logging.getLogger().addHandler(handler)
+    summarize("before", asyncio.run(drive(endpoint(True), args.requests)), sink)
+
+    for rate in (1.0, 0.01):
+        reset_root()
+        sink = SlowSink(latency)
+        pipeline = LogPipeline(level="INFO", stream=sink)
+        pipeline.start()
+        app = AccessLogMiddleware(endpoint(False), route_sample_rates={ROUTE.path: rate})
+        samples = asyncio.run(drive(app, args.requests))
+        dropped = pipeline.handler.dropped
+        pipeline.stop()
+        summarize(f"after (rate {rate:g})", samples, sink)
+        if dropped:
+            print(f"{'':<18} {dropped} records dropped at the full queue instead of blocking")
+
+
+if __name__ == "__main__":
+    main()
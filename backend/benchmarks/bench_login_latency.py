@@ -0,0 +1,101 @@
+"""Catalog latency under a concurrent login burst.
+
+Run against a live server (same as backend_test.py):
+
+    python benchmarks/bench_login_latency.py --base-url http://localhost:8001 \
+        --users 20 --login-concurrency 16 --duration 20
+
+A set of users is registered first, then logins are hammered from a thread pool
+while a separate thread keeps requesting /api/plants. The p50/p95/p99 of the
+catalog requests show how much password hashing leaks into unrelated routes.
+"""
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PASSWORD = "BenchPass123!"
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def register_users(base_url, count):
+    emails = []
+    for _ in range(count):
+        email = f"bench_{uuid.uuid4().hex[:12]}@example.com"
+        response = requests.post(f"{base_url}/api/register", json={
+            "email": email,
+            "password": PASSWORD,
+            "first_name": "Bench",
+            "last_name": "User"
+        })
+        response.raise_for_status()
+        emails.append(email)
+    return emails
+
+
+def login_worker(base_url, emails, stop, counters, lock):
+    session = requests.Session()
+    i = 0
+    while not stop.is_set():
+        email = emails[i % len(emails)]
+        i += 1
+        response = session.post(f"{base_url}/api/login", json={"email": email, "password": PASSWORD})
+        with lock:
+            counters[response.status_code] = counters.get(response.status_code, 0) + 1
+
+
+def catalog_probe(base_url, stop, samples):
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = session.get(f"{base_url}/api/plants")
+        response.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+
+
+def run(base_url, users, login_concurrency, duration):
+    print(f"Registering {users} users...")
+    emails = register_users(base_url, users)
+
+    def measure(with_logins):
+        stop = threading.Event()
+        samples, counters, lock = [], {}, threading.Lock()
+        with ThreadPoolExecutor(max_workers=login_concurrency + 1) as pool:
+            pool.submit(catalog_probe, base_url, stop, samples)
+            if with_logins:
+                for _ in range(login_concurrency):
+                    pool.submit(login_worker, base_url, emails, stop, counters, lock)
+            time.sleep(duration)
+            stop.set()
+        return samples, counters
+
+    for label, with_logins in (("idle", False), ("login burst", True)):
+        samples, counters = measure(with_logins)
+        print(f"\n/api/plants latency ({label}, {len(samples)} requests)")
+        print(f"  p50: {percentile(samples, 50):8.2f} ms")
+        print(f"  p95: {percentile(samples, 95):8.2f} ms")
+        print(f"  p99: {percentile(samples, 99):8.2f} ms")
+        print(f"  mean: {statistics.mean(samples) if samples else 0:7.2f} ms")
+        if counters:
+            print(f"  login responses by status: {dict(sorted(counters.items()))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--login-concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per phase")
+    args = parser.parse_args()
+    run(args.base_url, args.users, args.login_concurrency, args.duration)
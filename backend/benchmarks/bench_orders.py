@@ -0,0 +1,118 @@
+"""Order history latency for users with 10 / 100 / 1k / 10k orders.
+
+    python benchmarks/bench_orders.py --mongo-url mongodb://localhost:27017
+
+Seeds a scratch database (nursery_orders_bench) with one user per history
+size, each order carrying items and a PayPal payment_details blob like the
+ones execute-payment stores, ensures the API's indexes, then times:
+
+- first page: order_history.order_summaries, as GET /api/orders?limit=N serves it
+- deep page: the page starting halfway through the history
+- unbounded: the old find().to_list() of every full order, for comparison
+
+Summary pages should stay flat as the history grows; the unbounded read
+should not.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indexes import ensure_indexes  # noqa: E402
+from order_history import ORDER_SORT, order_summaries  # noqa: E402
+
+BENCH_DB = "nursery_orders_bench"
+HISTORY_SIZES = (10, 100, 1_000, 10_000)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def synthetic_orders(user_id, count, seed=3):
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    for i in range(count):
+        items = [
+            {"name": f"Plant {n}", "quantity": rng.randint(1, 4), "unit_amount": 2.99, "sku": f"plant_{n:03d}"}
+            for n in rng.sample(range(1, 21), rng.randint(1, 6))
+        ]
+        yield {
+            "id": f"{user_id}-{i}",
+            "order_id": f"{user_id}-{i}",
+            "paypal_order_id": f"PAYID-{user_id}-{i}",
+            "user_id": user_id,
+            "total_amount": round(sum(item["quantity"] * item["unit_amount"] for item in items), 2),
+            "currency": "USD",
+            "status": "COMPLETED",
+            "order_status": "delivered",
+            "items": items,
+            "shipping_info": {"address": "1 Bench St", "city": "Bench", "state": "BS", "zip_code": "00000", "country": "US"},
+            "payment_details": {
+                "id": f"PAYID-{user_id}-{i}",
+                "state": "approved",
+                "transactions": [{"item_list": {"items": items}, "related_resources": [{"sale": {"id": f"SALE-{i}"}}]}],
+                "links": [{"href": "https://api.sandbox.paypal.com/v1/payments/x", "rel": "self", "method": "GET"}] * 3,
+            },
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i),
+        }
+
+
+async def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[BENCH_DB]
+    await db.orders.drop()
+    await ensure_indexes(db)
+    for size in HISTORY_SIZES:
+        orders = list(synthetic_orders(f"user_{size}", size))
+        for batch_start in range(0, len(orders), 5_000):
+            await db.orders.insert_many(orders[batch_start:batch_start + 5_000])
+
+    print(f"{'orders':>7}  {'first page p50/p95':>20}  {'deep page p50/p95':>20}  {'unbounded p50/p95':>20}")
+    for size in HISTORY_SIZES:
+        user_id = f"user_{size}"
+        newest_first = sorted(synthetic_orders(user_id, size), key=lambda order: order["created_at"], reverse=True)
+        middle = newest_first[size // 2]
+        middle_values = [middle[field] for field, _ in ORDER_SORT]
+
+        first = await timed(lambda: order_summaries(db, user_id, args.page_size), args.repeat)
+        deep = await timed(lambda: order_summaries(db, user_id, args.page_size, middle_values), args.repeat)
+        unbounded = await timed(
+            lambda: db.orders.find({"user_id": user_id}, {"_id": 0}).to_list(length=None), max(3, args.repeat // 10)
+        )
+        print(
+            f"{size:>7}  {percentile(first, 50):>9.2f}/{percentile(first, 95):<8.2f} ms"
+            f"  {percentile(deep, 50):>9.2f}/{percentile(deep, 95):<8.2f} ms"
+            f"  {percentile(unbounded, 50):>9.2f}/{percentile(unbounded, 95):<8.2f} ms"
+        )
+
+    await client.drop_database(BENCH_DB)
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""Cart pricing cost for carts of 1 to 500 lines.
+
+    python benchmarks/bench_pricing.py
+    python benchmarks/bench_pricing.py --repeat 2000
+
+Compares the old per-line linear scan over the fetched plants with the
+pricing.price_cart dict index. Both run in-process on synthetic plants, so this
+measures only the pricing work, not the Mongo round trips.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing import price_cart, to_cents  # noqa: E402
+from synthetic import synthetic_plants  # noqa: E402
+
+CART_SIZES = (1, 10, 50, 100, 250, 500)
+DISCOUNT = {"type": "percentage", "value": 20}
+
+
+def linear_scan_total(lines, plants, discount):
+    """The previous calculate_total body, kept here as the baseline"""
+    subtotal = 0
+    for plant_id, quantity in lines:
+        plant = next((p for p in plants if p["id"] == plant_id), None)
+        if plant:
+            subtotal += plant["price"] * quantity
+    tax_amount = subtotal * 0.08
+    shipping_cost = 0 if subtotal > 50 else 8.99
+    discount_amount = subtotal * (discount["value"] / 100)
+    return round(subtotal + tax_amount + shipping_cost - discount_amount, 2)
+
+
+def dict_index_total(lines, plants, discount):
+    prices = {plant["id"]: to_cents(plant["price"]) for plant in plants}
+    return price_cart(lines, prices, discount)["total"]
+
+
+def time_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    plants = list(synthetic_plants(max(CART_SIZES)))
+    print(f"{'lines':>6} {'linear scan':>14} {'dict index':>14} {'speedup':>9}")
+    for size in CART_SIZES:
+        cart_plants = plants[:size]
+        lines = [(plant["id"], (i % 5) + 1) for i, plant in enumerate(cart_plants)]
+        linear = time_ms(lambda: linear_scan_total(lines, cart_plants, DISCOUNT), args.repeat)
+        indexed = time_ms(lambda: dict_index_total(lines, cart_plants, DISCOUNT), args.repeat)
+        print(f"{size:>6} {linear:>11.3f} ms {indexed:>11.3f} ms {linear / indexed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
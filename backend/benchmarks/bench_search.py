@@ -0,0 +1,102 @@
+"""Catalog search latency at 10k / 100k / 1M synthetic plants.
+
+    python benchmarks/bench_search.py                       # in-process index only
+    python benchmarks/bench_search.py --mongo-url mongodb://localhost:27017
+
+The in-process inverted index is always measured. With --mongo-url the same
+queries also run against a scratch database (nursery_search_bench) using the
+$text backend and, for comparison, the old unanchored case-insensitive $regex.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import InvertedIndexSearch, MongoTextSearch  # noqa: E402
+from synthetic import search_terms, synthetic_plants  # noqa: E402
+
+BENCH_DB = "nursery_search_bench"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label, samples):
+    print(
+        f"  {label:<22} p50 {percentile(samples, 50):9.3f} ms   p95 {percentile(samples, 95):9.3f} ms"
+        f"   p99 {percentile(samples, 99):9.3f} ms   mean {statistics.mean(samples):9.3f} ms"
+    )
+
+
+def bench_inverted(plants, queries):
+    index = InvertedIndexSearch()
+    start = time.perf_counter()
+    index.build(plants)
+    print(f"  inverted index build   {time.perf_counter() - start:9.2f} s  ({len(index._vocabulary)} terms)")
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, limit=50)
+        samples.append((time.perf_counter() - start) * 1000)
+    report("inverted (top 50)", samples)
+
+
+async def bench_mongo(mongo_url, plants, queries):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(mongo_url)
+    collection = client[BENCH_DB]["plants"]
+    await collection.drop()
+    for batch_start in range(0, len(plants), 10_000):
+        await collection.insert_many([dict(p) for p in plants[batch_start:batch_start + 10_000]])
+    await collection.create_index([("name", "text"), ("description", "text")])
+
+    text = MongoTextSearch()
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        await collection.find(text.filter(query), text.projection).sort(text.sort).limit(50).to_list(length=50)
+        samples.append((time.perf_counter() - start) * 1000)
+    report("mongo $text (top 50)", samples)
+
+    samples = []
+    for query in queries:
+        pattern = re.escape(query)
+        start = time.perf_counter()
+        await collection.find({"$or": [
+            {"name": {"$regex": pattern, "$options": "i"}},
+            {"description": {"$regex": pattern, "$options": "i"}}
+        ]}).limit(50).to_list(length=50)
+        samples.append((time.perf_counter() - start) * 1000)
+    report("mongo $regex (top 50)", samples)
+
+    await client.drop_database(BENCH_DB)
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--mongo-url", default=None)
+    args = parser.parse_args()
+
+    queries = list(itertools.islice(search_terms(), args.queries))
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"\n{size:,} plants, {len(queries)} queries")
+        plants = list(synthetic_plants(size))
+        bench_inverted(plants, queries)
+        if args.mongo_url:
+            asyncio.run(bench_mongo(args.mongo_url, plants, queries))
+
+
+if __name__ == "__main__":
+    main()
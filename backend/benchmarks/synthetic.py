@@ -0,0 +1,52 @@
+"""Deterministic synthetic catalog data for benchmarks."""
+import random
+
+GENERA = [
+    "Monstera", "Ficus", "Pothos", "Philodendron", "Calathea", "Aloe", "Echeveria", "Haworthia",
+    "Sansevieria", "Peperomia", "Begonia", "Orchid", "Lavender", "Basil", "Mint", "Rosemary",
+    "Fern", "Palm", "Ivy", "Jade", "Cactus", "Lily", "Anthurium", "Hoya", "Tradescantia",
+]
+ADJECTIVES = [
+    "Variegated", "Dwarf", "Giant", "Trailing", "Compact", "Golden", "Silver", "Velvet",
+    "Crimson", "Marble", "Tropical", "Desert", "Miniature", "Royal", "Spotted",
+]
+DESCRIPTION_WORDS = [
+    "glossy", "leaves", "bright", "indirect", "light", "low", "maintenance", "easy", "care",
+    "humidity", "trailing", "vine", "flowers", "fragrant", "succulent", "drought", "tolerant",
+    "air", "purifying", "beginners", "hanging", "basket", "statement", "modern", "interiors",
+]
+CATEGORIES = ["houseplant", "succulent", "flowering", "herb"]
+
+
+def synthetic_plants(count, seed=42):
+    rng = random.Random(seed)
+    for i in range(count):
+        genus = rng.choice(GENERA)
+        yield {
+            "id": f"plant_{i:07d}",
+            "name": f"{rng.choice(ADJECTIVES)} {genus} {rng.randint(1, 999)}",
+            "price": round(rng.uniform(0.5, 60.0), 2),
+            "description": " ".join(rng.choice(DESCRIPTION_WORDS) for _ in range(rng.randint(12, 24))),
+            "care_instructions": "Water when the top inch of soil is dry.",
+            "sunlight_requirements": "Bright, indirect light",
+            "category": rng.choice(CATEGORIES),
+            "stock_quantity": rng.randint(0, 100),
+            "image_url": f"https://images.example.com/plants/{i}.jpg",
+            "weight": round(rng.uniform(0.3, 6.0), 1),
+            "average_rating": round(rng.uniform(3.0, 5.0), 1),
+            "total_reviews": rng.randint(0, 500),
+        }
+
+
+def search_terms(seed=7):
+    rng = random.Random(seed)
+    terms = [genus.lower() for genus in GENERA] + [word for word in DESCRIPTION_WORDS]
+    prefixes = [genus.lower()[:3] for genus in GENERA]
+    while True:
+        kind = rng.random()
+        if kind < 0.4:
+            yield rng.choice(terms)
+        elif kind < 0.7:
+            yield f"{rng.choice(ADJECTIVES).lower()} {rng.choice(prefixes)}"
+        else:
+            yield rng.choice(prefixes)
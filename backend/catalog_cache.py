@@ -0,0 +1,58 @@
+"""In-process cache for serialized plant catalog responses.
+
+Each uvicorn worker keeps its own cache, so writes made through one worker
+are only invalidated locally; the TTL bounds how stale the other workers can be.
+"""
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from json_response import dumps
+
+
+def serialize_documents(documents: Any) -> bytes:
+    """Encode Mongo documents to the JSON bytes a MongoJSONResponse would send"""
+    return dumps(documents)
+
+
+class CatalogCache:
+    """TTL cache of pre-serialized catalog payloads with hit/miss counters"""
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, payload: bytes) -> None:
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+
+    def invalidate(self) -> None:
+        """Drop every cached payload after a catalog write"""
+        self._entries.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -0,0 +1,77 @@
+"""Catalog version counter for HTTP caching.
+
+A single document in the meta collection holds a counter that every plant,
+review or inventory write bumps. Catalog responses carry an ETag derived from
+it, so a client (or nginx) that already holds the current version gets a 304
+without the handler touching the database.
+
+Each worker keeps the last version it saw in memory: its own bumps update it
+immediately, and a poller picks up bumps made by other workers. On a change
+the poller also drops the worker's catalog cache, so cross-worker staleness is
+bounded by the poll interval rather than the cache TTL.
+
+Writes that change plant names, categories or descriptions also bump a
+separate text_version, so workers rebuild their search index only for those
+and not for every stock or rating change.
+"""
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from pymongo import ReturnDocument
+
+VERSION_ID = "catalog_version"
+
+
+class CatalogVersion:
+    def __init__(self):
+        self.version = 0
+        self.text_version = 0
+
+    @property
+    def etag(self) -> str:
+        return f'W/"catalog-{self.version}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match header names the current version"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: W/"x" and "x" name the same version
+        current = self.etag[2:]
+        return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+    async def load(self, db) -> int:
+        document = await db.meta.find_one({"_id": VERSION_ID})
+        self.version = document["version"] if document else 0
+        self.text_version = document.get("text_version", 0) if document else 0
+        return self.version
+
+    async def bump(self, db, text_changed: bool = False) -> int:
+        increments = {"version": 1, "text_version": 1} if text_changed else {"version": 1}
+        document = await db.meta.find_one_and_update(
+            {"_id": VERSION_ID},
+            {"$inc": increments},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self.version = document["version"]
+        self.text_version = document.get("text_version", 0)
+        return self.version
+
+    async def run_poller(self, db, interval_seconds: float, on_change: Optional[Callable[[bool], None]] = None):
+        """Background loop picking up versions bumped by other workers.
+
+        on_change(text_changed) is called with whether the text version moved too.
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                previous, previous_text = self.version, self.text_version
+                if await self.load(db) != previous and on_change:
+                    on_change(self.text_version != previous_text)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error polling catalog version: {str(e)}")
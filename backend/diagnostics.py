@@ -0,0 +1,210 @@
+"""Opt-in event-loop diagnostics, cheap enough to leave on in production.
+
+LoopBlockDetector: a task on the loop stamps a heartbeat every few
+milliseconds and a watchdog thread checks it. When the heartbeat is older
+than the threshold, the loop thread is stuck in synchronous code, so the
+watchdog grabs that thread's stack (sys._current_frames) while it is still
+inside the offending call, and logs it. The heartbeat task fills in how long
+the stall lasted once the loop comes back.
+
+SlowRequestProfiler: a sampler thread records the loop thread's stack every
+sample interval, but only while requests are in flight. When a request takes
+longer than the threshold, the samples taken during it are folded into
+flamegraph "collapsed stack" lines and written to a file in a directory that
+keeps the newest max_files profiles. Samples are of the whole loop, so a
+profile also shows whatever other requests ran in the meantime; time spent
+waiting on Mongo or PayPal shows up as the selector's select() frame. All
+aggregation and file I/O happen on the sampler thread, never on the loop.
+"""
+import asyncio
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+STACK_LIMIT = 30
+
+
+def _folded_stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class LoopBlockDetector:
+    def __init__(self, threshold_ms: float, history: int = 20):
+        self.threshold = threshold_ms / 1000
+        # Beat several times per threshold so a stall is caught soon after it crosses it
+        self.interval = max(self.threshold / 4, 0.005)
+        self.blocks = 0
+        self.recent = deque(maxlen=history)
+        self._beat = time.monotonic()
+        self._current: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> asyncio.Task:
+        """Start the watchdog thread; returns the heartbeat task for the caller to cancel at shutdown"""
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._thread = threading.Thread(target=self._watch, name="loop-block-detector", daemon=True)
+        self._thread.start()
+        return asyncio.create_task(self._heartbeat())
+
+    def stop(self):
+        self._stop.set()
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            late = loop.time() - expected
+            with self._lock:
+                if self._current is not None:
+                    self._current["blocked_ms"] = round(late * 1000, 1)
+                    logging.warning(f"Event loop was blocked for {self._current['blocked_ms']}ms")
+                    self._current = None
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            stalled = time.monotonic() - self._beat - self.interval
+            if stalled <= self.threshold:
+                continue
+            with self._lock:
+                # Re-check under the lock: the heartbeat may have just closed the previous stall
+                if self._current is not None or time.monotonic() - self._beat - self.interval <= self.threshold:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame is not None else ""
+                self._current = {"detected_at": time.time(), "blocked_ms": None, "stack": stack}
+                self.recent.append(self._current)
+                self.blocks += 1
+            logging.warning(f"Event loop blocked for over {self.threshold * 1000:g}ms in:\n{stack}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "blocks": self.blocks,
+            "recent": list(self.recent)
+        }
+
+
+class SlowRequestProfiler:
+    def __init__(
+        self,
+        threshold_ms: float,
+        directory: str,
+        sample_interval_ms: float = 10.0,
+        max_files: int = 50,
+        window_seconds: float = 120.0
+    ):
+        self.threshold = threshold_ms / 1000
+        self.directory = directory
+        self.sample_interval = sample_interval_ms / 1000
+        self.max_files = max_files
+        self.in_flight = 0
+        self.profiles_written = 0
+        # (monotonic time, folded stack); only the sampler thread touches it
+        self._samples = deque(maxlen=max(1, int(window_seconds / self.sample_interval)))
+        self._finished = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling the calling thread, which must be the one running the event loop"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._loop_thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def request_finished(self, started: float, finished: float, method: str, route: str):
+        if finished - started >= self.threshold:
+            self._finished.put((started, finished, method, route))
+
+    def _run(self):
+        while not self._stop.wait(self.sample_interval):
+            if self.in_flight:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._samples.append((time.monotonic(), _folded_stack(frame)))
+            while not self._finished.empty():
+                try:
+                    self._write(*self._finished.get_nowait())
+                except Exception as e:
+                    logging.error(f"Could not write request profile: {str(e)}")
+
+    def _write(self, started: float, finished: float, method: str, route: str):
+        stacks = Counter(stack for at, stack in self._samples if started <= at <= finished)
+        if not stacks:
+            return
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        # Timestamp first so names sort oldest to newest for rotation
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}"
+        name = f"{stamp}-{os.getpid()}-{method}-{slug}-{int((finished - started) * 1000)}ms.folded"
+        with open(os.path.join(self.directory, name), "w") as profile:
+            for stack, count in stacks.most_common():
+                profile.write(f"{stack} {count}\n")
+        self.profiles_written += 1
+        self._rotate()
+
+    def _rotate(self):
+        profiles = sorted(name for name in os.listdir(self.directory) if name.endswith(".folded"))
+        for name in profiles[:max(0, len(profiles) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def profiles(self) -> List[str]:
+        try:
+            return sorted((name for name in os.listdir(self.directory) if name.endswith(".folded")), reverse=True)
+        except OSError:
+            return []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "sample_interval_ms": self.sample_interval * 1000,
+            "directory": self.directory,
+            "profiles_written": self.profiles_written,
+            "profiles": self.profiles()
+        }
+
+
+class ProfilingMiddleware:
+    """Tells SlowRequestProfiler when requests are in flight and which ones were slow"""
+
+    def __init__(self, app, profiler: SlowRequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.monotonic()
+        self.profiler.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.in_flight -= 1
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.profiler.request_finished(started, time.monotonic(), scope["method"], route)
@@ -0,0 +1,104 @@
+"""In-process discount code table.
+
+Active codes are loaded from Mongo into a dict keyed by code, with the live
+codes also kept in a list ordered by expires_at. A lookup first retires every
+code at the front of that list whose expiry has passed (amortised O(1), since
+each code is retired once) and then does a dict get, so validating or applying
+a code on the cart path never touches the database.
+
+The table is reloaded every refresh interval, or on change-stream events when
+DISCOUNT_CHANGE_STREAM is enabled (that needs a replica set; without one the
+watcher logs the error and polling keeps the table fresh).
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+DISCOUNT_FIELDS = {"_id": 0, "code": 1, "type": 1, "value": 1, "expires_at": 1}
+
+
+class DiscountTable:
+    def __init__(self):
+        self._live: Dict[str, Dict[str, Any]] = {}
+        self._expired: Dict[str, Dict[str, Any]] = {}
+        self._by_expiry: List[Tuple[datetime, str]] = []
+        self._loaded_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    def load(self, codes, now: Optional[datetime] = None) -> None:
+        now = now or datetime.utcnow()
+        live, expired = {}, {}
+        for code in codes:
+            expires_at = code.get("expires_at")
+            if expires_at is not None and expires_at <= now:
+                expired[code["code"]] = code
+            else:
+                live[code["code"]] = code
+        # Codes without an expiry never leave the live table
+        self._by_expiry = sorted(
+            (code["expires_at"], code["code"]) for code in live.values() if code.get("expires_at") is not None
+        )
+        self._live, self._expired = live, expired
+        self._loaded_at = now
+
+    async def refresh(self, db) -> int:
+        async with self._lock:
+            codes = await db.discount_codes.find({"active": True}, DISCOUNT_FIELDS).to_list(length=None)
+            self.load(codes)
+            return len(self._live)
+
+    def _retire_expired(self, now: datetime) -> None:
+        retired = 0
+        while retired < len(self._by_expiry) and self._by_expiry[retired][0] <= now:
+            code = self._by_expiry[retired][1]
+            self._expired[code] = self._live.pop(code)
+            retired += 1
+        if retired:
+            del self._by_expiry[:retired]
+
+    async def get(self, db, code: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """The live discount for code, or None if it is unknown, inactive or expired"""
+        if self._loaded_at is None:
+            # First use in this worker before startup finished loading
+            await self.refresh(db)
+        self._retire_expired(now or datetime.utcnow())
+        return self._live.get(code)
+
+    def is_expired(self, code: str) -> bool:
+        return code in self._expired
+
+    def next_expiry(self) -> Optional[datetime]:
+        return self._by_expiry[0][0] if self._by_expiry else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live": len(self._live),
+            "expired": len(self._expired),
+            "next_expiry": self.next_expiry(),
+            "loaded_at": self._loaded_at,
+        }
+
+    async def run_refresher(self, db, interval_seconds: float):
+        """Background loop reloading the table every interval_seconds"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.refresh(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error refreshing discount codes: {str(e)}")
+
+    async def watch_changes(self, db):
+        """Reload the table whenever discount_codes changes (requires a replica set)"""
+        try:
+            async with db.discount_codes.watch() as stream:
+                async for _ in stream:
+                    await self.refresh(db)
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            logging.error(f"Discount change stream unavailable, relying on polling: {str(e)}")
@@ -0,0 +1,141 @@
+"""Local stand-in for the PayPal v1 payments API.
+
+Used by tests and load tests so checkout throughput can be measured without
+depending on PayPal's sandbox:
+
+    FAKE_PAYPAL_LATENCY_MS=150 uvicorn fake_paypal:app --port 8002
+    PAYPAL_API_BASE=http://localhost:8002 uvicorn server:app --port 8001
+
+FAKE_PAYPAL_LATENCY_MS adds a delay to every call and FAKE_PAYPAL_FAILURE_RATE
+(0.0-1.0) makes that share of payment calls return 503 to exercise retries.
+"""
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+
+LATENCY_MS = float(os.environ.get("FAKE_PAYPAL_LATENCY_MS", "0"))
+FAILURE_RATE = float(os.environ.get("FAKE_PAYPAL_FAILURE_RATE", "0"))
+
+payments: Dict[str, dict] = {}
+tokens = set()
+# PayPal-Request-Id -> response, so retried POSTs return the original result
+idempotent_responses: Dict[str, dict] = {}
+
+
+async def simulate_network(fail: bool = True):
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if fail and FAILURE_RATE and random.random() < FAILURE_RATE:
+        raise HTTPException(status_code=503, detail="Simulated PayPal outage")
+
+
+def check_token(authorization: Optional[str]):
+    if not authorization or not authorization.startswith("Bearer ") or authorization[7:] not in tokens:
+        raise HTTPException(status_code=401, detail="Invalid access token")
+
+
+@app.exception_handler(HTTPException)
+async def paypal_error_handler(request: Request, exc: HTTPException):
+    # PayPal error bodies carry "name" and "message" rather than FastAPI's "detail"
+    names = {400: "VALIDATION_ERROR", 401: "AUTHENTICATION_FAILURE", 404: "INVALID_RESOURCE_ID", 503: "SERVICE_UNAVAILABLE"}
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"name": names.get(exc.status_code, "INTERNAL_SERVICE_ERROR"), "message": exc.detail},
+    )
+
+
+def payment_links(payment_id: str):
+    return [
+        {"href": f"https://fake.paypal.local/v1/payments/payment/{payment_id}", "rel": "self", "method": "GET"},
+        {"href": f"https://fake.paypal.local/checkoutnow?token={payment_id}", "rel": "approval_url", "method": "REDIRECT"},
+        {"href": f"https://fake.paypal.local/v1/payments/payment/{payment_id}/execute", "rel": "execute", "method": "POST"},
+    ]
+
+
+@app.post("/v1/oauth2/token")
+async def issue_token():
+    await simulate_network(fail=False)
+    token = uuid.uuid4().hex
+    tokens.add(token)
+    return {"access_token": token, "token_type": "Bearer", "expires_in": 32400}
+
+
+@app.post("/v1/payments/payment")
+async def create_payment(
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    paypal_request_id: Optional[str] = Header(None),
+):
+    check_token(authorization)
+    if paypal_request_id and paypal_request_id in idempotent_responses:
+        return idempotent_responses[paypal_request_id]
+    await simulate_network()
+    body = await request.json()
+    payment_id = f"PAYID-{uuid.uuid4().hex[:20].upper()}"
+    payment = {
+        "id": payment_id,
+        "intent": body.get("intent", "sale"),
+        "state": "created",
+        "payer": body.get("payer", {}),
+        "transactions": body.get("transactions", []),
+        "create_time": datetime.utcnow().isoformat() + "Z",
+        "links": payment_links(payment_id),
+    }
+    payments[payment_id] = payment
+    if paypal_request_id:
+        idempotent_responses[paypal_request_id] = payment
+    return payment
+
+
+@app.get("/v1/payments/payment/{payment_id}")
+async def get_payment(payment_id: str, authorization: Optional[str] = Header(None)):
+    check_token(authorization)
+    await simulate_network()
+    if payment_id not in payments:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    return payments[payment_id]
+
+
+@app.post("/v1/payments/payment/{payment_id}/execute")
+async def execute_payment(
+    payment_id: str,
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    paypal_request_id: Optional[str] = Header(None),
+):
+    check_token(authorization)
+    if paypal_request_id and paypal_request_id in idempotent_responses:
+        return idempotent_responses[paypal_request_id]
+    await simulate_network()
+    payment = payments.get(payment_id)
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    if payment["state"] == "approved":
+        raise HTTPException(status_code=400, detail="Payment has already been executed")
+    body = await request.json()
+    payment["state"] = "approved"
+    payment["payer"] = {
+        "payment_method": "paypal",
+        "status": "VERIFIED",
+        "payer_info": {"payer_id": body.get("payer_id")},
+    }
+    payment["update_time"] = datetime.utcnow().isoformat() + "Z"
+    if paypal_request_id:
+        idempotent_responses[paypal_request_id] = payment
+    return payment
+
+
+@app.post("/reset")
+async def reset():
+    payments.clear()
+    tokens.clear()
+    idempotent_responses.clear()
+    return {"message": "Fake PayPal state cleared"}
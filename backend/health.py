@@ -0,0 +1,218 @@
+"""Worker health for liveness, readiness and load shedding.
+
+HealthMonitor refreshes a snapshot in the background every interval. The
+snapshot holds:
+
+- a timed Mongo ping, which includes checking a connection out of the pool
+- recent pool checkout latencies recorded by PoolCheckoutListener
+- whether the PayPal API host answers, checked less often
+
+Probes and the shedding dependency only read the snapshot, so probe traffic
+never reaches Mongo or PayPal.
+
+status is one of:
+
+- "ok"
+- "degraded": Mongo answers, but slowly. Non-critical endpoints are shed so
+  the database goes to browsing and checkout.
+- "down": Mongo does not answer. Readiness fails so the orchestrator stops
+  routing to this worker, and shed endpoints fail fast instead of waiting out
+  server selection.
+
+PayPal reachability is reported but does not change the status, because
+everything except checkout works without it.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import monitoring
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """Times connection checkouts from the driver's pool and counts its connections.
+
+    The started and checked-out events of one checkout fire in order on the
+    thread doing the checkout, so a thread-local pairs them. The counts are
+    summed over every server the client talks to.
+    """
+
+    def __init__(self, window: int = 256):
+        self._local = threading.local()
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+
+    def _add(self, name: str, amount: int):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        self._add("waiting", 1)
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            self._samples.append((time.perf_counter() - started) * 1000)
+            self._local.started = None
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.failures += 1
+            self.waiting -= 1
+        self._local.started = None
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add("open", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_checked_in(self, event):
+        self._add("in_use", -1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Checkout latency over the last `window` checkouts, in milliseconds, and current connection counts"""
+        # deque.copy() is atomic, unlike iterating while driver threads append
+        samples = sorted(self._samples.copy())
+        counts = {"open": self.open, "in_use": self.in_use, "waiting": self.waiting, "failures": self.failures}
+        if not samples:
+            return {"samples": 0, "p50_ms": None, "p95_ms": None, "max_ms": None, **counts}
+        return {
+            "samples": len(samples),
+            "p50_ms": round(_percentile(samples, 50), 2),
+            "p95_ms": round(_percentile(samples, 95), 2),
+            "max_ms": round(samples[-1], 2),
+            **counts
+        }
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        interval_seconds: float = 5.0,
+        ping_timeout: float = 2.0,
+        degraded_ping_ms: float = 250.0,
+        degraded_checkout_ms: float = 100.0,
+        paypal_interval_seconds: float = 30.0,
+        pool_listener: Optional[PoolCheckoutListener] = None
+    ):
+        self.interval_seconds = interval_seconds
+        self.ping_timeout = ping_timeout
+        self.degraded_ping_ms = degraded_ping_ms
+        self.degraded_checkout_ms = degraded_checkout_ms
+        self.paypal_interval_seconds = paypal_interval_seconds
+        self.pool_listener = pool_listener
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._paypal: Optional[Dict[str, Any]] = None
+        self._paypal_checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def status(self) -> Optional[str]:
+        return self.snapshot["status"] if self.snapshot else None
+
+    @property
+    def shedding(self) -> bool:
+        """Whether non-critical endpoints should be refused right now"""
+        return self.status in ("degraded", "down")
+
+    async def _ping_mongo(self, db) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(db.command("ping"), timeout=self.ping_timeout)
+        except Exception as e:
+            return {"ok": False, "latency_ms": None, "error": str(e) or e.__class__.__name__}
+        return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    async def _check_paypal(self, paypal) -> Dict[str, Any]:
+        if self._paypal is not None and time.monotonic() - self._paypal_checked_at < self.paypal_interval_seconds:
+            return self._paypal
+        try:
+            latency_ms = await paypal.ping(timeout=self.ping_timeout)
+            self._paypal = {"reachable": True, "latency_ms": round(latency_ms, 2)}
+        except Exception as e:
+            self._paypal = {"reachable": False, "latency_ms": None, "error": str(e)}
+        self._paypal["configured"] = bool(paypal.client_id)
+        self._paypal_checked_at = time.monotonic()
+        return self._paypal
+
+    async def check(self, db, paypal) -> Dict[str, Any]:
+        """Probe Mongo (and PayPal when due) and store a fresh snapshot"""
+        mongo, paypal_state = await asyncio.gather(self._ping_mongo(db), self._check_paypal(paypal))
+        pool = self.pool_listener.stats() if self.pool_listener else None
+        reasons = []
+        if not mongo["ok"]:
+            reasons.append(f"mongo ping failed: {mongo['error']}")
+        else:
+            if mongo["latency_ms"] > self.degraded_ping_ms:
+                reasons.append(f"mongo ping {mongo['latency_ms']}ms over {self.degraded_ping_ms:g}ms")
+            if pool and pool["p95_ms"] is not None and pool["p95_ms"] > self.degraded_checkout_ms:
+                reasons.append(f"pool checkout p95 {pool['p95_ms']}ms over {self.degraded_checkout_ms:g}ms")
+        status = "down" if not mongo["ok"] else "degraded" if reasons else "ok"
+        if self.snapshot and status != self.snapshot["status"]:
+            logging.warning(f"Health changed from {self.snapshot['status']} to {status}: {'; '.join(reasons) or 'recovered'}")
+        self.snapshot = {
+            "status": status,
+            "reasons": reasons,
+            "mongo": mongo,
+            "pool_checkout": pool,
+            "paypal": paypal_state,
+            "checked_at": datetime.utcnow().isoformat()
+        }
+        self._checked_at = time.monotonic()
+        return self.snapshot
+
+    async def current(self, db, paypal) -> Dict[str, Any]:
+        """The latest snapshot, checking inline only if the background loop has fallen behind"""
+        if self.snapshot is not None and time.monotonic() - self._checked_at < 3 * self.interval_seconds:
+            return self.snapshot
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another probe may have refreshed it while we waited
+            if self.snapshot is not None and time.monotonic() - self._checked_at < 3 * self.interval_seconds:
+                return self.snapshot
+            return await self.check(db, paypal)
+
+    async def run(self, db, paypal):
+        """Refresh the snapshot every interval until cancelled"""
+        while True:
+            try:
+                await self.check(db, paypal)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Health check failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
@@ -0,0 +1,206 @@
+"""Mongo index declarations and query-plan verification.
+
+The API ensures these indexes itself at startup, so deployments that never run
+init-mongo.js (Render, managed Mongo) get the same set as Docker.
+
+QUERY_SHAPES lists every filter/sort combination server.py issues. Run
+
+    MONGO_URL=mongodb://localhost:27017 python indexes.py
+
+to ensure the indexes and explain() each shape; the command exits non-zero if
+any of them would do a collection scan, or sort in memory when the shape has
+a sort. Add a shape here whenever a handler
+starts issuing a new query.
+"""
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "plants": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("category", ASCENDING), ("name", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("name", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("price", ASCENDING), ("id", ASCENDING)]),
+        # Keyset sorts always break ties on id ascending, so price_desc needs its own index:
+        # scanning the one above backwards yields (price -1, id -1)
+        IndexModel([("price", DESCENDING), ("id", ASCENDING)]),
+        IndexModel([("average_rating", DESCENDING), ("id", ASCENDING)]),
+        IndexModel([("created_at", DESCENDING), ("id", ASCENDING)]),
+        IndexModel([("name", TEXT), ("description", TEXT)]),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "orders": [
+        IndexModel([("order_id", ASCENDING)], unique=True),
+        IndexModel([("paypal_order_id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("order_id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("order_status", ASCENDING)]),
+    ],
+    "reviews": [
+        # Lets concurrent startup seeding upsert sample reviews without duplicates
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("plant_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("plant_id", ASCENDING), ("helpful_count", DESCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("plant_id", ASCENDING), ("rating", DESCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("plant_id", ASCENDING), ("user_id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING)]),
+    ],
+    "wishlist": [
+        IndexModel([("user_id", ASCENDING), ("plant_id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING), ("plant_id", ASCENDING)]),
+    ],
+    "inventory_reservations": [
+        IndexModel([("order_id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("expires_at", ASCENDING)]),
+    ],
+    "user_stats": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+    "revoked_tokens": [
+        IndexModel([("digest", ASCENDING)], unique=True, partialFilterExpression={"digest": {"$type": "string"}}),
+        IndexModel([("user_id", ASCENDING)], unique=True, partialFilterExpression={"user_id": {"$type": "string"}}),
+        IndexModel([("revoked_at", ASCENDING)]),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "discount_codes": [
+        IndexModel([("code", ASCENDING)], unique=True),
+        IndexModel([("active", ASCENDING), ("expires_at", ASCENDING)]),
+    ],
+}
+
+# "collection.index_name" of every unique index, the form ensure_indexes() reports failures in
+UNIQUE_INDEX_NAMES = {
+    f"{collection_name}.{model.document['name']}"
+    for collection_name, models in INDEXES.items()
+    for model in models
+    if model.document.get("unique")
+}
+
+# (collection, filter, sort) for every query the API issues; values are placeholders
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"collection": "plants", "filter": {}, "sort": [("name", 1), ("id", 1)]},
+    {"collection": "plants", "filter": {}, "sort": [("price", 1), ("id", 1)]},
+    {"collection": "plants", "filter": {}, "sort": [("price", -1), ("id", 1)]},
+    {"collection": "plants", "filter": {}, "sort": [("average_rating", -1), ("id", 1)]},
+    {"collection": "plants", "filter": {}, "sort": [("created_at", -1), ("id", 1)]},
+    {"collection": "plants", "filter": {"category": "houseplant"}, "sort": [("name", 1), ("id", 1)]},
+    {"collection": "plants", "filter": {"price": {"$gte": 1.0, "$lte": 3.0}}, "sort": [("price", 1), ("id", 1)]},
+    {"collection": "plants", "filter": {"id": "plant_001"}},
+    {"collection": "plants", "filter": {"id": {"$in": ["plant_001", "plant_002"]}}},
+    {"collection": "plants", "filter": {"id": {"$in": ["plant_001", "plant_002"]}, "reservations.order_001": {"$exists": True}}},
+    {"collection": "plants", "filter": {"id": "plant_001", "reservations.order_001": {"$exists": True}}},
+    {"collection": "plants", "filter": {"id": {"$in": ["plant_001", "plant_002"]}, "reservations": {}}},
+    {"collection": "plants", "filter": {"$text": {"$search": "monstera"}}},
+    {"collection": "users", "filter": {"email": "someone@example.com"}},
+    {"collection": "users", "filter": {"id": "user_001"}},
+    {"collection": "orders", "filter": {"user_id": "user_001"}},
+    {"collection": "orders", "filter": {"user_id": "user_001"}, "sort": [("created_at", -1), ("order_id", -1)]},
+    {"collection": "orders", "filter": {"user_id": "user_001", "status": "COMPLETED"}},
+    {"collection": "orders", "filter": {"order_id": "order_001", "user_id": "user_001"}},
+    {"collection": "orders", "filter": {"order_id": "order_001"}},
+    {"collection": "orders", "filter": {"order_id": {"$in": ["order_001", "order_002"]}, "status": "COMPLETED"}},
+    {"collection": "orders", "filter": {"paypal_order_id": "PAYID-1"}},
+    {"collection": "reviews", "filter": {"plant_id": "plant_001"}, "sort": [("created_at", -1), ("id", -1)]},
+    {"collection": "reviews", "filter": {"plant_id": "plant_001"}, "sort": [("helpful_count", -1), ("created_at", -1), ("id", -1)]},
+    {"collection": "reviews", "filter": {"plant_id": "plant_001"}, "sort": [("rating", -1), ("created_at", -1), ("id", -1)]},
+    {"collection": "reviews", "filter": {"plant_id": "plant_001", "user_id": "user_001"}},
+    {"collection": "reviews", "filter": {"user_id": "user_001"}},
+    {"collection": "reviews", "filter": {"id": "review_001"}},
+    {"collection": "wishlist", "filter": {"user_id": "user_001"}, "sort": [("created_at", 1), ("plant_id", 1)]},
+    {"collection": "wishlist", "filter": {"user_id": "user_001", "plant_id": "plant_001"}},
+    {"collection": "discount_codes", "filter": {"active": True}},
+    {"collection": "user_stats", "filter": {"user_id": "user_001"}},
+    {"collection": "meta", "filter": {"_id": "catalog_version"}},
+    {"collection": "revoked_tokens", "filter": {"revoked_at": {"$gt": datetime(2025, 1, 1)}}},
+    {"collection": "revoked_tokens", "filter": {"digest": "0" * 64}},
+    {"collection": "revoked_tokens", "filter": {"user_id": "user_001"}},
+    {"collection": "inventory_reservations", "filter": {"order_id": "order_001", "status": "held"}},
+    {"collection": "inventory_reservations", "filter": {"status": "held", "expires_at": {"$lt": datetime(2025, 1, 1)}}},
+]
+
+
+async def ensure_indexes(db) -> List[str]:
+    """Create any missing indexes; returns the names that could not be created.
+
+    A failure (e.g. duplicate data blocking a unique index, or an existing index
+    with different options) is logged rather than raised so the API still starts.
+    """
+    failed = []
+    for collection_name, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[collection_name].create_indexes([model])
+            except OperationFailure as e:
+                name = f"{collection_name}.{model.document['name']}"
+                logging.error(f"Could not ensure index {name}: {e}")
+                failed.append(name)
+    return failed
+
+
+def _stages(plan: Any):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+async def explain_query_shapes(db) -> List[Dict[str, Any]]:
+    """explain() every query shape and report the stages of its winning plan"""
+    results = []
+    for shape in QUERY_SHAPES:
+        cursor = db[shape["collection"]].find(shape["filter"])
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        explanation = await cursor.explain()
+        stages = list(_stages(explanation.get("queryPlanner", {}).get("winningPlan", {})))
+        results.append({
+            **shape,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+            # A blocking SORT means no index delivers the requested order
+            "in_memory_sort": bool(shape.get("sort")) and "SORT" in stages,
+        })
+    return results
+
+
+async def main() -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    db = client["nursery_ecommerce"]
+    failed = await ensure_indexes(db)
+    results = await explain_query_shapes(db)
+    client.close()
+
+    for result in results:
+        marker = "❌" if result["collscan"] or result["in_memory_sort"] else "✅"
+        sort = f" sort={result['sort']}" if result.get("sort") else ""
+        print(f"{marker} {result['collection']} {result['filter']}{sort}: {' > '.join(result['stages'])}")
+    collscans = [result for result in results if result["collscan"]]
+    if failed:
+        print(f"\n{len(failed)} index(es) could not be created: {', '.join(failed)}")
+    if collscans:
+        print(f"\n{len(collscans)} query shape(s) fall back to COLLSCAN")
+    sorts = [result for result in results if result["in_memory_sort"]]
+    if sorts:
+        print(f"\n{len(sorts)} query shape(s) sort in memory")
+    return 1 if collscans or sorts or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
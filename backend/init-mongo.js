@@ -12,6 +12,7 @@ db.createCollection('wishlist');
 db.createCollection('discount_codes');
 
 // Create indexes for better performance
+// (the API also ensures these on startup, see backend/indexes.py)
 db.plants.createIndex({ "category": 1 });
 db.plants.createIndex({ "price": 1 });
 db.plants.createIndex({ "average_rating": -1 });
@@ -0,0 +1,199 @@
+"""Stock reservation and decrement for PayPal orders.
+
+Stock is held when the PayPal order is created and committed when the payment
+is executed:
+
+- reserve() decrements every line in one unordered bulk_write. Each update is
+  conditional on enough stock being left and on the order not already holding
+  that plant, so stock never goes below zero and a retried reserve is a no-op.
+  The held quantity is recorded on the plant under reservations.<order_id>; if
+  any line cannot be held, the lines that were are put back and
+  InsufficientStock is raised. The marker is internal: catalog reads project
+  it out (HOLDS_PROJECTION), and it is removed again on commit or release.
+- commit() turns the hold into a sale exactly once per order, guarded by a
+  status compare-and-set on the reservation document, so retried executes do
+  not decrement twice. If the hold already expired, it falls back to a
+  decrement clamped at zero and reports any shortfall.
+- release_expired() returns stock from holds older than the TTL. A hold whose
+  order is already COMPLETED was paid for (its commit failed after payment),
+  so it is committed instead of released.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+HOLDS_FIELD = "reservations"
+# Merge into every projection that returns whole plant documents
+HOLDS_PROJECTION = {HOLDS_FIELD: 0}
+
+
+class InsufficientStock(Exception):
+    def __init__(self, plant_ids: List[str]):
+        super().__init__(f"Insufficient stock for: {', '.join(plant_ids)}")
+        self.plant_ids = plant_ids
+
+
+def order_lines(items: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Quantity per plant for the order items that carry a plant id as their sku"""
+    lines: Dict[str, int] = OrderedDict()
+    for item in items:
+        plant_id = item.get("sku")
+        if plant_id and not plant_id.startswith("item-") and item.get("quantity", 0) > 0:
+            lines[plant_id] = lines.get(plant_id, 0) + item["quantity"]
+    return lines
+
+
+class InventoryEngine:
+    def __init__(self, reservation_ttl_seconds: float = 3600):
+        self.reservation_ttl_seconds = reservation_ttl_seconds
+
+    async def reserve(self, db, order_id: str, lines: Dict[str, int]) -> None:
+        if not lines:
+            return
+        hold = f"{HOLDS_FIELD}.{order_id}"
+        await db.inventory_reservations.update_one(
+            {"order_id": order_id},
+            {"$setOnInsert": {
+                "order_id": order_id,
+                "lines": lines,
+                "status": "held",
+                "created_at": datetime.utcnow(),
+                "expires_at": datetime.utcnow() + timedelta(seconds=self.reservation_ttl_seconds)
+            }},
+            upsert=True
+        )
+        result = await db.plants.bulk_write([
+            UpdateOne(
+                {"id": plant_id, "stock_quantity": {"$gte": quantity}, hold: {"$exists": False}},
+                {"$inc": {"stock_quantity": -quantity}, "$set": {hold: quantity}}
+            )
+            for plant_id, quantity in lines.items()
+        ], ordered=False)
+        if result.matched_count == len(lines):
+            return
+
+        # Some lines could not be held: find which (for the error), then undo the rest
+        held = {
+            plant["id"]
+            async for plant in db.plants.find({"id": {"$in": list(lines)}, hold: {"$exists": True}}, {"_id": 0, "id": 1})
+        }
+        if held == set(lines):
+            # A retried reserve: everything was already held by the first attempt
+            return
+        await self.release(db, order_id)
+        raise InsufficientStock([plant_id for plant_id in lines if plant_id not in held])
+
+    async def _clear_holds(self, db, order_id: str, lines: Dict[str, int], return_stock: bool) -> None:
+        """Drop the order's hold markers from its own plants, optionally giving the stock back"""
+        if not lines:
+            return
+        hold = f"{HOLDS_FIELD}.{order_id}"
+        # Only plants still carrying the marker are touched, so a repeat is a no-op
+        updates = [
+            UpdateOne(
+                {"id": plant_id, hold: {"$exists": True}},
+                {"$inc": {"stock_quantity": quantity}, "$unset": {hold: ""}} if return_stock else {"$unset": {hold: ""}}
+            )
+            for plant_id, quantity in lines.items()
+        ]
+        # Plants with no other order's hold left lose the empty map too
+        updates.append(UpdateMany({"id": {"$in": list(lines)}, HOLDS_FIELD: {}}, {"$unset": {HOLDS_FIELD: ""}}))
+        await db.plants.bulk_write(updates, ordered=True)
+
+    async def release(self, db, order_id: str) -> bool:
+        """Give held stock back (cancelled order, failed PayPal call or expired hold)"""
+        claimed = await db.inventory_reservations.find_one_and_update(
+            {"order_id": order_id, "status": "held"},
+            {"$set": {"status": "released", "released_at": datetime.utcnow()}}
+        )
+        if claimed is None:
+            return False
+        await self._clear_holds(db, order_id, claimed.get("lines") or {}, return_stock=True)
+        return True
+
+    async def commit(self, db, order_id: str, lines: Dict[str, int]) -> List[str]:
+        """Finalise the sale for an order; returns plant ids that could not be fully decremented"""
+        claimed = await db.inventory_reservations.find_one_and_update(
+            {"order_id": order_id, "status": "held"},
+            {"$set": {"status": "committed", "committed_at": datetime.utcnow()}}
+        )
+        if claimed is not None:
+            # Stock was taken at reserve time; only the hold markers need clearing
+            await self._clear_holds(db, order_id, claimed.get("lines") or {}, return_stock=False)
+            return []
+
+        # No live hold (it expired, or the order predates reservations). Record the
+        # commit first so a retried execute stops at the duplicate key below.
+        try:
+            await db.inventory_reservations.update_one(
+                {"order_id": order_id, "status": {"$ne": "committed"}},
+                {
+                    "$set": {"status": "committed", "committed_at": datetime.utcnow()},
+                    "$setOnInsert": {"order_id": order_id, "lines": lines, "created_at": datetime.utcnow()}
+                },
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return []
+        if not lines:
+            return []
+        stock = {
+            plant["id"]: plant.get("stock_quantity", 0)
+            async for plant in db.plants.find({"id": {"$in": list(lines)}}, {"_id": 0, "id": 1, "stock_quantity": 1})
+        }
+        # Payment is already captured: take what is left, never below zero, and report the oversell
+        await db.plants.bulk_write([
+            UpdateOne({"id": plant_id}, [
+                {"$set": {"stock_quantity": {"$max": [0, {"$subtract": ["$stock_quantity", quantity]}]}}}
+            ])
+            for plant_id, quantity in lines.items()
+        ], ordered=False)
+        return [plant_id for plant_id, quantity in lines.items() if stock.get(plant_id, 0) < quantity]
+
+    async def release_expired(self, db) -> int:
+        expired = await db.inventory_reservations.find(
+            {"status": "held", "expires_at": {"$lt": datetime.utcnow()}}, {"_id": 0, "order_id": 1, "lines": 1}
+        ).to_list(length=None)
+        if not expired:
+            return 0
+        paid = {
+            order["order_id"]
+            async for order in db.orders.find(
+                {"order_id": {"$in": [reservation["order_id"] for reservation in expired]}, "status": "COMPLETED"},
+                {"_id": 0, "order_id": 1}
+            )
+        }
+        released = 0
+        for reservation in expired:
+            order_id = reservation["order_id"]
+            if order_id in paid:
+                # The goods were sold: finish the commit that failed after payment
+                await self.commit(db, order_id, reservation.get("lines") or {})
+                await db.orders.update_one(
+                    {"order_id": order_id},
+                    {"$set": {"inventory_status": "committed", "inventory_shortfall": []}}
+                )
+                logging.warning(f"Committed expired hold of completed order {order_id}")
+            elif await self.release(db, order_id):
+                released += 1
+        return released
+
+    async def run_reservation_reaper(self, db, interval_seconds: float, on_change=None):
+        """Background loop returning stock from expired holds"""
+        while True:
+            try:
+                released = await self.release_expired(db)
+                if released:
+                    logging.info(f"Released {released} expired inventory reservation(s)")
+                    if on_change:
+                        await on_change()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error releasing expired reservations: {str(e)}")
+            await asyncio.sleep(interval_seconds)
@@ -0,0 +1,91 @@
+"""Diff two load-test result files, e.g. the base branch against a change.
+
+    python loadtest/compare.py results/base.json results/HEAD.json --threshold 10
+
+For each endpoint in either file, prints requests per second and p50/p95/p99
+side by side with the change in percent. An endpoint regresses when its p95
+grows, or its throughput drops, by more than --threshold percent, or when its
+error rate rises. Exits 1 if anything regressed, so a CI job can gate on it.
+
+Runs are only comparable with the same mix, concurrency and scale; a mismatch
+in those is printed as a warning before the table.
+"""
+import argparse
+import json
+import sys
+
+COMPARED_META = ("mix", "concurrency", "scale", "server_workers", "paypal_latency_ms")
+
+
+def load(path: str):
+    with open(path) as results:
+        return json.load(results)
+
+
+def change(before, after):
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before * 100
+
+
+def error_rate(row) -> float:
+    return row["errors"] / row["requests"] if row and row["requests"] else 0.0
+
+
+def compare(baseline, current, threshold: float):
+    """Yield (label, before row, after row, regression reasons) for every endpoint"""
+    for label in sorted(set(baseline["endpoints"]) | set(current["endpoints"])):
+        before = baseline["endpoints"].get(label)
+        after = current["endpoints"].get(label)
+        reasons = []
+        if before and after:
+            p95 = change(before["p95_ms"], after["p95_ms"])
+            rps = change(before["rps"], after["rps"])
+            if p95 is not None and p95 > threshold:
+                reasons.append(f"p95 +{p95:.1f}%")
+            if rps is not None and rps < -threshold:
+                reasons.append(f"rps {rps:.1f}%")
+            if error_rate(after) > error_rate(before):
+                reasons.append(f"errors {error_rate(before):.1%} -> {error_rate(after):.1%}")
+        yield label, before, after, reasons
+
+
+def cell(before, after, key: str) -> str:
+    if before is None or after is None:
+        value = (after or before)[key]
+        return f"{value:>9.1f} {'(only ' + ('after' if after else 'before') + ')':>13}"
+    delta = change(before[key], after[key])
+    return f"{after[key]:>9.1f} {'' if delta is None else f'{delta:+.1f}%':>13}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent")
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    current = load(args.current)
+    print(f"baseline {baseline['meta']['commit']} ({baseline['meta']['timestamp']})")
+    print(f"current  {current['meta']['commit']} ({current['meta']['timestamp']})")
+    for key in COMPARED_META:
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: {key} differs: {baseline['meta'].get(key)} vs {current['meta'].get(key)}")
+
+    print(f"\n{'endpoint':<40} {'rps':>9} {'':>13} {'p50':>9} {'':>13} {'p95':>9} {'':>13} {'p99':>9} {'':>13}")
+    regressions = []
+    for label, before, after, reasons in compare(baseline, current, args.threshold):
+        row = " ".join(cell(before, after, key) for key in ("rps", "p50_ms", "p95_ms", "p99_ms"))
+        print(f"{label:<40} {row}{'  REGRESSED: ' + ', '.join(reasons) if reasons else ''}")
+        if reasons:
+            regressions.append(label)
+
+    if regressions:
+        print(f"\n{len(regressions)} endpoint(s) regressed beyond {args.threshold:g}%: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo endpoint regressed beyond {args.threshold:g}%")
+
+
+if __name__ == "__main__":
+    main()
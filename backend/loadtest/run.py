@@ -0,0 +1,308 @@
+"""Load test: seed a scratch database, drive a workload mix, report per-endpoint latency.
+
+    python loadtest/run.py --mix mixed --concurrency 32 --duration 60 --output results/HEAD.json
+    python loadtest/compare.py results/base.json results/HEAD.json
+
+Everything runs locally by default:
+
+- Mongo: a throwaway `mongod` on a free port with a temporary --dbpath, so
+  results do not depend on a shared server's data or load. Pass --mongo-url to
+  use an existing server instead; only the --db-name database is touched.
+- PayPal: fake_paypal.py on a free port (--paypal-latency-ms sets its delay)
+- the API: `uvicorn server:app` from backend/ with --workers N, pointed at
+  both of the above
+
+The database is seeded before the server starts, so the built-in sample data is
+not mixed in. With --base-url the test targets a server that is already
+running; it must be pointed at the same --mongo-url and --db-name, and the run
+waits --settle seconds after seeding for its catalog caches to notice.
+
+Each of --concurrency workers loops over operations drawn from the mix by
+weight, with its own seeded random stream, for --duration seconds after a
+--warmup that is not recorded. Results are printed as a table and written as
+JSON: per endpoint label the request and error counts, throughput, mean, p50,
+p95, p99 and max in milliseconds, plus the commit, scale and settings.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(LOADTEST_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+from seed import seed  # noqa: E402
+from workloads import MIXES, OPERATIONS, Context, Recorder  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float, process=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"{' '.join(process.args)} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise SystemExit(f"{url} did not answer within {timeout:g}s")
+
+
+def wait_for_port(port: int, timeout: float, process):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{' '.join(process.args)} exited with code {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"Nothing listened on {port} within {timeout:g}s")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentile(ordered, fraction: float) -> float:
+    # Nearest rank on an already sorted list
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(recorder: Recorder, seconds: float):
+    endpoints = {}
+    for label in sorted(recorder.latencies):
+        ordered = sorted(recorder.latencies[label])
+        endpoints[label] = {
+            "requests": len(ordered),
+            "errors": recorder.errors.get(label, 0),
+            "rps": round(len(ordered) / seconds, 2),
+            "mean_ms": round(sum(ordered) / len(ordered), 2),
+            "p50_ms": round(percentile(ordered, 0.50), 2),
+            "p95_ms": round(percentile(ordered, 0.95), 2),
+            "p99_ms": round(percentile(ordered, 0.99), 2),
+            "max_ms": round(ordered[-1], 2),
+            "status_codes": {str(code): count for code, count in sorted(recorder.statuses[label].items())}
+        }
+    everything = sorted(value for values in recorder.latencies.values() for value in values)
+    total = {
+        "requests": len(everything),
+        "errors": sum(recorder.errors.values()),
+        "rps": round(len(everything) / seconds, 2),
+        "p50_ms": round(percentile(everything, 0.50), 2) if everything else None,
+        "p95_ms": round(percentile(everything, 0.95), 2) if everything else None,
+        "p99_ms": round(percentile(everything, 0.99), 2) if everything else None
+    }
+    return endpoints, total
+
+
+def print_table(endpoints, total):
+    print(f"{'endpoint':<40} {'requests':>9} {'errors':>7} {'rps':>9} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for label, row in endpoints.items():
+        print(
+            f"{label:<40} {row['requests']:>9} {row['errors']:>7} {row['rps']:>9.1f} {row['mean_ms']:>8.2f} "
+            f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.2f}"
+        )
+    if total["requests"]:
+        print(
+            f"{'total':<40} {total['requests']:>9} {total['errors']:>7} {total['rps']:>9.1f} {'':>8} "
+            f"{total['p50_ms']:>8.2f} {total['p95_ms']:>8.2f} {total['p99_ms']:>8.2f}"
+        )
+
+
+async def drive(base_url: str, data, mix, concurrency: int, warmup: float, duration: float, rng_seed: int):
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        contexts = [Context(client, recorder, data, random.Random(rng_seed * 1000 + n)) for n in range(concurrency)]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + warmup + duration
+
+        async def worker(ctx: Context):
+            while loop.time() < deadline:
+                name = ctx.rng.choices(names, weights)[0]
+                await OPERATIONS[name](ctx)
+
+        recorder.enabled = False
+        workers = [asyncio.create_task(worker(ctx)) for ctx in contexts]
+        await asyncio.sleep(warmup)
+        recorder.enabled = True
+        started = time.perf_counter()
+        await asyncio.gather(*workers)
+        return recorder, time.perf_counter() - started
+
+
+async def seed_database(mongo_url: str, db_name: str, args):
+    client = AsyncIOMotorClient(mongo_url)
+    try:
+        started = time.perf_counter()
+        data = await seed(
+            client[db_name], args.plants, args.users, args.orders_per_user, args.reviews_per_plant, seed=args.seed
+        )
+        print(f"Seeded {data['counts']} in {time.perf_counter() - started:.1f}s")
+        return data
+    finally:
+        client.close()
+
+
+def spawn(command, env=None, cwd=BACKEND_DIR, quiet=True):
+    return subprocess.Popen(
+        command, cwd=cwd, env=env,
+        stdout=subprocess.DEVNULL if quiet else None, stderr=subprocess.DEVNULL if quiet else None,
+        start_new_session=True
+    )
+
+
+def terminate(process):
+    if process is None or process.poll() is not None:
+        return
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="recorded seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unrecorded seconds before the run")
+    parser.add_argument("--plants", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--orders-per-user", type=int, default=5)
+    parser.add_argument("--reviews-per-plant", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=11, help="seed for the data and the workers' random streams")
+    parser.add_argument("--mongo-url", help="use this Mongo instead of a throwaway mongod")
+    parser.add_argument("--db-name", default="nursery_loadtest")
+    parser.add_argument("--base-url", help="target an already running server instead of starting one")
+    parser.add_argument("--settle", type=float, default=6.0, help="with --base-url, seconds to wait after seeding")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned server")
+    parser.add_argument("--paypal-latency-ms", type=float, default=50.0)
+    parser.add_argument("--server-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra environment for the spawned server; repeatable")
+    parser.add_argument("--show-server-output", action="store_true")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    processes = []
+    scratch = None
+    try:
+        mongo_url = args.mongo_url
+        if mongo_url is None:
+            mongod = shutil.which("mongod")
+            if mongod is None:
+                raise SystemExit("mongod is not on PATH; install MongoDB or pass --mongo-url")
+            scratch = tempfile.mkdtemp(prefix="nursery-loadtest-")
+            port = free_port()
+            process = spawn([mongod, "--dbpath", scratch, "--port", str(port), "--bind_ip", "127.0.0.1"])
+            processes.append(process)
+            wait_for_port(port, 30, process)
+            mongo_url = f"mongodb://127.0.0.1:{port}"
+
+        data = asyncio.run(seed_database(mongo_url, args.db_name, args))
+
+        base_url = args.base_url
+        if base_url is None:
+            paypal_port = free_port()
+            paypal_env = dict(os.environ, FAKE_PAYPAL_LATENCY_MS=str(args.paypal_latency_ms), FAKE_PAYPAL_FAILURE_RATE="0")
+            paypal = spawn([sys.executable, "-m", "uvicorn", "fake_paypal:app", "--port", str(paypal_port)], env=paypal_env)
+            processes.append(paypal)
+            wait_for_port(paypal_port, 30, paypal)
+
+            server_port = free_port()
+            server_env = dict(
+                os.environ,
+                MONGO_URL=mongo_url,
+                MONGO_DB_NAME=args.db_name,
+                PAYPAL_API_BASE=f"http://127.0.0.1:{paypal_port}",
+                PAYPAL_CLIENT_ID="loadtest",
+                PAYPAL_SECRET="loadtest"
+            )
+            for assignment in args.server_env:
+                name, _, value = assignment.partition("=")
+                server_env[name] = value
+            server = spawn(
+                [sys.executable, "-m", "uvicorn", "server:app", "--port", str(server_port), "--workers", str(args.workers)],
+                env=server_env, quiet=not args.show_server_output
+            )
+            processes.append(server)
+            base_url = f"http://127.0.0.1:{server_port}"
+            wait_for(f"{base_url}/ready", 60, server)
+        else:
+            time.sleep(args.settle)
+
+        mix = MIXES[args.mix]
+        print(f"{args.mix} mix, {args.concurrency} workers, {args.warmup:g}s warmup + {args.duration:g}s against {base_url}")
+        recorder, seconds = asyncio.run(
+            drive(base_url, data, mix, args.concurrency, args.warmup, args.duration, args.seed)
+        )
+        endpoints, total = summarize(recorder, seconds)
+        print_table(endpoints, total)
+
+        if args.output:
+            result = {
+                "meta": {
+                    "commit": git_commit(),
+                    "timestamp": datetime.utcnow().isoformat() + "Z",
+                    "host": platform.node(),
+                    "python": platform.python_version(),
+                    "mix": args.mix,
+                    "weights": mix,
+                    "concurrency": args.concurrency,
+                    "duration_seconds": round(seconds, 2),
+                    "warmup_seconds": args.warmup,
+                    "server_workers": args.workers if args.base_url is None else None,
+                    "paypal_latency_ms": args.paypal_latency_ms if args.base_url is None else None,
+                    "scale": data["counts"],
+                    "seed": args.seed
+                },
+                "total": total,
+                "endpoints": endpoints
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, "w") as output:
+                json.dump(result, output, indent=2, sort_keys=True)
+            print(f"Wrote {args.output}")
+    finally:
+        for process in reversed(processes):
+            terminate(process)
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
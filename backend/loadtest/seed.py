@@ -0,0 +1,105 @@
+"""Synthetic load-test data: catalog, users, orders and reviews at a given scale.
+
+Plants come from benchmarks/synthetic.py with stock raised so checkouts never
+run out mid-run. Every user shares one password, hashed once, because hashing
+thousands of bcrypt passwords would dominate seeding time.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from passlib.context import CryptContext
+
+from catalog_version import CatalogVersion
+from synthetic import synthetic_plants
+
+PASSWORD = "LoadTest123!"
+LOADTEST_STOCK = 1_000_000
+BATCH_SIZE = 5_000
+
+
+def user_email(index: int) -> str:
+    return f"loadtest_{index:06d}@example.com"
+
+
+async def _insert(collection, documents: List[Dict[str, Any]]) -> int:
+    for start in range(0, len(documents), BATCH_SIZE):
+        await collection.insert_many(documents[start:start + BATCH_SIZE], ordered=False)
+    return len(documents)
+
+
+async def seed(db, plants: int, users: int, orders_per_user: int, reviews_per_plant: int, seed: int = 11) -> Dict[str, Any]:
+    """Replace the load-test collections with fresh synthetic data; returns ids the workloads draw from"""
+    rng = random.Random(seed)
+    for name in ("plants", "users", "orders", "reviews", "wishlist", "user_stats", "inventory_reservations"):
+        await db[name].delete_many({})
+
+    plant_docs = [dict(plant, stock_quantity=LOADTEST_STOCK, created_at=datetime(2024, 1, 1)) for plant in synthetic_plants(plants, seed=seed)]
+    await _insert(db.plants, plant_docs)
+
+    password_hash = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(PASSWORD)
+    now = datetime.utcnow()
+    user_docs = [{
+        "id": f"loadtest-user-{i:06d}",
+        "email": user_email(i),
+        "password_hash": password_hash,
+        "first_name": "Load",
+        "last_name": f"User {i}",
+        "phone": None,
+        "created_at": now - timedelta(days=rng.randint(0, 700)),
+        "last_login": now,
+        "is_active": True,
+        "email_verified": False,
+        "profile_complete": False
+    } for i in range(users)]
+    await _insert(db.users, user_docs)
+
+    order_docs = []
+    for user in user_docs:
+        for n in range(orders_per_user):
+            items = [
+                {"name": plant["name"], "quantity": rng.randint(1, 3), "unit_amount": plant["price"], "sku": plant["id"]}
+                for plant in rng.sample(plant_docs, min(len(plant_docs), rng.randint(1, 4)))
+            ]
+            order_id = f"{user['id']}-order-{n}"
+            order_docs.append({
+                "id": order_id,
+                "order_id": order_id,
+                "paypal_order_id": f"PAYID-{order_id}",
+                "customer_email": user["email"],
+                "user_id": user["id"],
+                "total_amount": round(sum(item["quantity"] * item["unit_amount"] for item in items), 2),
+                "currency": "USD",
+                "status": "COMPLETED",
+                "order_status": "delivered",
+                "items": items,
+                "created_at": now - timedelta(minutes=rng.randint(0, 500_000)),
+                "updated_at": now
+            })
+    await _insert(db.orders, order_docs)
+
+    review_docs = []
+    for plant in plant_docs:
+        for n in range(reviews_per_plant):
+            user = rng.choice(user_docs) if user_docs else {"id": "loadtest-user-none", "first_name": "Load", "last_name": "User"}
+            review_docs.append({
+                "id": f"{plant['id']}-review-{n}",
+                "plant_id": plant["id"],
+                "user_id": user["id"],
+                "user_name": f"{user['first_name']} {user['last_name'][:1]}.",
+                "rating": rng.randint(1, 5),
+                "comment": "Seeded for load testing.",
+                "helpful_count": rng.randint(0, 50),
+                "created_at": now - timedelta(minutes=rng.randint(0, 500_000))
+            })
+    await _insert(db.reviews, review_docs)
+    # A server that is already running drops its catalog caches and search index on its next version poll
+    await CatalogVersion().bump(db, text_changed=True)
+
+    return {
+        "plant_ids": [plant["id"] for plant in plant_docs],
+        "plants": {plant["id"]: plant for plant in plant_docs},
+        "categories": sorted({plant["category"] for plant in plant_docs}),
+        "user_emails": [user["email"] for user in user_docs],
+        "counts": {"plants": len(plant_docs), "users": len(user_docs), "orders": len(order_docs), "reviews": len(review_docs)}
+    }
@@ -0,0 +1,161 @@
+"""Operations the load test drives, and the mixes they are combined into.
+
+Each operation makes one or more HTTP calls through Context.request(), which
+times every call under a stable endpoint label (the route template plus the
+query shape), so results from different runs line up key for key.
+"""
+import random
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from seed import PASSWORD
+
+SHIPPING_INFO = {"address": "1 Load Test Way", "city": "Benchtown", "state": "CA", "zip_code": "94000", "country": "US"}
+DISCOUNT_CODES = ("SPRING20", "SAVE10")
+SEARCH_TERMS = ("monstera", "ficus", "pothos", "succulent", "trailing", "golden", "fern", "palm", "variegated", "easy care")
+SUGGEST_PREFIXES = ("mon", "fic", "pot", "cal", "ech", "fer", "pal", "jad", "hoy", "lav")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.enabled = True
+
+    def record(self, label: str, seconds: float, status_code: Optional[int]):
+        if not self.enabled:
+            return
+        self.latencies[label].append(seconds * 1000)
+        if status_code is None or status_code >= 400:
+            self.errors[label] += 1
+        self.statuses[label][status_code or 0] += 1
+
+
+class Context:
+    """Per-worker state: its own client, random stream and signed-in token"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, data: Dict[str, Any], rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.data = data
+        self.rng = rng
+        self.token: Optional[str] = None
+
+    async def request(self, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(label, time.perf_counter() - started, None)
+            return None
+        self.recorder.record(label, time.perf_counter() - started, response.status_code)
+        return response
+
+    def plant_id(self) -> str:
+        return self.rng.choice(self.data["plant_ids"])
+
+    def cart_items(self) -> List[Dict[str, Any]]:
+        return [{"plant_id": self.plant_id(), "quantity": self.rng.randint(1, 3)} for _ in range(self.rng.randint(1, 5))]
+
+    async def ensure_token(self) -> Optional[str]:
+        if self.token is None and self.data["user_emails"]:
+            response = await self.request("POST /api/login", "POST", "/api/login", json={
+                "email": self.rng.choice(self.data["user_emails"]), "password": PASSWORD
+            })
+            if response is not None and response.status_code == 200:
+                self.token = response.json()["access_token"]
+        return self.token
+
+
+async def browse(ctx: Context):
+    roll = ctx.rng.random()
+    if roll < 0.35:
+        params = {"limit": 20, "fields": "id,name,price,image_url,average_rating"}
+        if ctx.rng.random() < 0.5:
+            params["category"] = ctx.rng.choice(ctx.data["categories"])
+        await ctx.request("GET /api/plants?limit", "GET", "/api/plants", params=params)
+    elif roll < 0.75:
+        await ctx.request("GET /api/plants/{plant_id}", "GET", f"/api/plants/{ctx.plant_id()}")
+    elif roll < 0.85:
+        await ctx.request("GET /api/categories", "GET", "/api/categories")
+    else:
+        await ctx.request("GET /api/plants/{plant_id}/reviews?paginate", "GET", f"/api/plants/{ctx.plant_id()}/reviews", params={
+            "limit": 10, "paginate": "true"
+        })
+
+
+async def search(ctx: Context):
+    if ctx.rng.random() < 0.6:
+        await ctx.request("GET /api/plants?search", "GET", "/api/plants", params={
+            "search": ctx.rng.choice(SEARCH_TERMS), "limit": 20
+        })
+    else:
+        await ctx.request("GET /api/plants/suggest", "GET", "/api/plants/suggest", params={
+            "q": ctx.rng.choice(SUGGEST_PREFIXES)
+        })
+
+
+async def cart(ctx: Context):
+    body = {"items": ctx.cart_items(), "shipping_info": SHIPPING_INFO}
+    if ctx.rng.random() < 0.3:
+        body["discount_code"] = ctx.rng.choice(DISCOUNT_CODES)
+    await ctx.request("POST /api/calculate-total", "POST", "/api/calculate-total", json=body)
+
+
+async def login(ctx: Context):
+    ctx.token = None
+    await ctx.ensure_token()
+
+
+async def account(ctx: Context):
+    token = await ctx.ensure_token()
+    if token is None:
+        return
+    headers = {"Authorization": f"Bearer {token}"}
+    if ctx.rng.random() < 0.5:
+        await ctx.request("GET /api/orders?limit", "GET", "/api/orders", params={"limit": 20}, headers=headers)
+    else:
+        await ctx.request("GET /api/profile", "GET", "/api/profile", headers=headers)
+
+
+async def checkout(ctx: Context):
+    items = []
+    for line in ctx.cart_items():
+        plant = ctx.data["plants"][line["plant_id"]]
+        items.append({"name": plant["name"], "quantity": line["quantity"], "unit_amount": plant["price"], "sku": plant["id"]})
+    response = await ctx.request("POST /api/paypal/create-order", "POST", "/api/paypal/create-order", json={
+        "items": items,
+        "total_amount": round(sum(item["quantity"] * item["unit_amount"] for item in items), 2),
+        "currency": "USD",
+        "customer_email": ctx.rng.choice(ctx.data["user_emails"]) if ctx.data["user_emails"] else None,
+        "shipping_info": SHIPPING_INFO
+    })
+    if response is None or response.status_code != 200:
+        return
+    await ctx.request("POST /api/paypal/execute-payment", "POST", "/api/paypal/execute-payment", params={
+        "payment_id": response.json()["id"], "payer_id": f"PAYER-{ctx.rng.randint(1, 10 ** 9)}"
+    })
+
+
+OPERATIONS = {
+    "browse": browse,
+    "search": search,
+    "cart": cart,
+    "login": login,
+    "account": account,
+    "checkout": checkout,
+}
+
+# Relative weights per operation
+MIXES = {
+    "browse": {"browse": 1},
+    "search": {"search": 1},
+    "cart": {"cart": 1},
+    "login": {"login": 1},
+    "checkout": {"checkout": 1},
+    "mixed": {"browse": 50, "search": 20, "cart": 12, "account": 8, "login": 5, "checkout": 5},
+}
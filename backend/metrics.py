@@ -0,0 +1,259 @@
+"""Prometheus-style metrics for one worker, served as text from /metrics.
+
+Collected:
+
+- HTTP requests per FastAPI route template (not raw path, to keep label
+  cardinality bounded): count by status, 5xx errors, latency histogram
+- Mongo command latency per collection and command, from a pymongo
+  CommandListener (durations are the driver's own, excluding pool waits)
+- PayPal HTTP calls per operation and outcome
+- bcrypt: time queued for the executor and time spent hashing
+- event-loop lag: how late a periodic sleep wakes up
+
+Each uvicorn worker keeps its own numbers. Metrics are held in plain dicts
+under a lock because pymongo reports commands from driver threads.
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from pymongo import monitoring
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+PAYPAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BCRYPT_BUCKETS = (0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5, 5.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in sorted(values)
+        ]
+
+
+class Gauge(Metric):
+    """Read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        super().__init__(name, help_text)
+        self.read = read
+
+    def render(self) -> List[str]:
+        return self.header() + [f"{self.name} {_number(self.read())}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = HTTP_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (non-cumulative, last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        lines = self.header()
+        for labels, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = _labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {repr(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class AppMetrics:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.http_requests = self._add(Counter(
+            "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+        ))
+        self.http_errors = self._add(Counter(
+            "http_request_errors_total", "HTTP requests that ended in a 5xx or an unhandled exception", ("method", "route")
+        ))
+        self.http_duration = self._add(Histogram(
+            "http_request_duration_seconds", "Time from request start to the last body byte sent", ("method", "route")
+        ))
+        self.in_progress = 0
+        self._add(Gauge("http_requests_in_progress", "Requests currently being handled", lambda: self.in_progress))
+        self.mongo_duration = self._add(Histogram(
+            "mongo_command_duration_seconds", "Mongo command round trips reported by the driver",
+            ("collection", "command"), MONGO_BUCKETS
+        ))
+        self.mongo_failures = self._add(Counter(
+            "mongo_command_failures_total", "Mongo commands that returned an error", ("collection", "command")
+        ))
+        self.paypal_duration = self._add(Histogram(
+            "paypal_request_duration_seconds", "PayPal HTTP calls by operation and outcome (status code or error)",
+            ("operation", "outcome"), PAYPAL_BUCKETS
+        ))
+        self.password_hash_duration = self._add(Histogram(
+            "password_hash_duration_seconds", "Time spent in bcrypt", ("operation",), BCRYPT_BUCKETS
+        ))
+        self.password_hash_wait = self._add(Histogram(
+            "password_hash_wait_seconds", "Time bcrypt calls waited for an executor slot", ("operation",), BCRYPT_BUCKETS
+        ))
+        self.loop_lag = self._add(Histogram(
+            "event_loop_lag_seconds", "How late the event loop woke a periodic sleep", (), LOOP_LAG_BUCKETS
+        ))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        return self._add(Gauge(name, help_text, read))
+
+    def observe_paypal(self, operation: str, outcome: str, seconds: float):
+        self.paypal_duration.observe(seconds, operation, outcome)
+
+    def observe_password_hash(self, operation: str, wait_seconds: float, hash_seconds: float):
+        self.password_hash_wait.observe(wait_seconds, operation)
+        self.password_hash_duration.observe(hash_seconds, operation)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Feeds AppMetrics.mongo_duration; the started event is only needed for the collection name"""
+
+    def __init__(self, metrics: AppMetrics):
+        self.metrics = metrics
+        self._collections: Dict[Tuple[object, int], str] = {}
+
+    @staticmethod
+    def _collection(event) -> str:
+        target = event.command.get("collection") if event.command_name == "getMore" else event.command.get(event.command_name)
+        return target if isinstance(target, str) else "-"
+
+    def started(self, event):
+        self._collections[(event.connection_id, event.request_id)] = self._collection(event)
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "-")
+        self.metrics.mongo_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "-")
+        self.metrics.mongo_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+        self.metrics.mongo_failures.inc(collection, event.command_name)
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and labels it with the matched route template"""
+
+    def __init__(self, app, metrics: AppMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.metrics.in_progress += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.in_progress -= 1
+            # FastAPI leaves the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            self.metrics.http_requests.inc(method, route_label, str(status_code))
+            if status_code >= 500:
+                self.metrics.http_errors.inc(method, route_label)
+            self.metrics.http_duration.observe(time.perf_counter() - started, method, route_label)
+
+
+async def run_loop_lag_monitor(metrics: AppMetrics, interval_seconds: float = 0.5):
+    """Background loop sleeping interval_seconds and recording how late it wakes"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval_seconds)
+        metrics.loop_lag.observe(max(0.0, loop.time() - started - interval_seconds))
@@ -0,0 +1,44 @@
+"""Paginated order history.
+
+Orders are listed newest first with keyset pagination on
+(user_id, created_at, order_id), which the orders index covers, so every page
+costs one bounded index range scan whatever the length of the user's history.
+Listing rows are summaries: payment_details, items and shipping_info are left
+out and replaced by item_count; the full order comes from /api/orders/{id}.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from pagination import encode_cursor, keyset_filter, merge_filters
+
+ORDER_SORT = [("created_at", -1), ("order_id", -1)]
+ORDER_SUMMARY_FIELDS = (
+    "id", "order_id", "paypal_order_id", "status", "order_status",
+    "total_amount", "currency", "created_at", "updated_at",
+)
+
+
+def summary_pipeline(user_id: str, page_size: int, cursor_values: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+    match = {"user_id": user_id}
+    if cursor_values is not None:
+        match = merge_filters(match, keyset_filter(ORDER_SORT, cursor_values))
+    return [
+        {"$match": match},
+        {"$sort": dict(ORDER_SORT)},
+        {"$limit": page_size + 1},
+        {"$project": {
+            "_id": 0,
+            **{field: 1 for field in ORDER_SUMMARY_FIELDS},
+            "item_count": {"$size": {"$ifNull": ["$items", []]}}
+        }}
+    ]
+
+
+async def order_summaries(
+    db, user_id: str, page_size: int, cursor_values: Optional[List[Any]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of order summaries and the cursor for the next page (None on the last)"""
+    orders = await db.orders.aggregate(summary_pipeline(user_id, page_size, cursor_values)).to_list(length=page_size + 1)
+    if len(orders) <= page_size:
+        return orders, None
+    orders = orders[:page_size]
+    return orders, encode_cursor(orders[-1], ORDER_SORT)
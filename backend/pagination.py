@@ -0,0 +1,97 @@
+"""Keyset (cursor) pagination helpers.
+
+A cursor is the sort-key values of the last document on the previous page,
+base64url-encoded JSON. The next page is fetched with a range filter on those
+values instead of skip(), so deep pages cost the same as the first one and
+stay stable while documents are inserted. Every sort must end on a unique
+field (usually "id") so ties are broken deterministically.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+Sort = Sequence[Tuple[str, int]]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and set(value) == {"$date"}:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def _get_path(document: Dict[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def encode_cursor(document: Dict[str, Any], sort: Sort) -> str:
+    values = [_encode_value(_get_path(document, field)) for field, _ in sort]
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: Sort) -> List[Any]:
+    """Decode a cursor for this sort, raising a 400 if it is malformed or from another sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeEncodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    try:
+        return [_decode_value(value) for value in values]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def _after(value: Any, direction: int) -> Optional[Dict[str, Any]]:
+    """Condition matching values that sort after `value` (Mongo sorts null/missing lowest)"""
+    if value is None:
+        return {"$ne": None} if direction == 1 else None
+    if direction == 1:
+        return {"$gt": value}
+    # Descending: smaller values and then null/missing ones come next
+    return {"$not": {"$gte": value}}
+
+
+def keyset_filter(sort: Sort, values: List[Any]) -> Dict[str, Any]:
+    """Filter selecting the documents strictly after `values` in `sort` order"""
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        condition = _after(values[i], direction)
+        if condition is None:
+            continue
+        branch = {prior_field: values[j] for j, (prior_field, _) in enumerate(sort[:i])}
+        branch[field] = condition
+        branches.append(branch)
+    if not branches:
+        # Nothing can follow the cursor
+        return {"_id": {"$exists": False}}
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+
+def merge_filters(query: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+    if not query:
+        return extra
+    return {"$and": [query, extra]}
+
+
+def page_envelope(items: List[Dict[str, Any]], next_cursor: Optional[str], total: Optional[int] = None, **extra) -> Dict[str, Any]:
+    envelope = {"items": items, "next_cursor": next_cursor}
+    if total is not None:
+        envelope["total"] = total
+    envelope.update(extra)
+    return envelope
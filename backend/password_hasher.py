@@ -0,0 +1,88 @@
+"""Bounded executor for bcrypt hashing and verification.
+
+bcrypt is deliberately slow (100-300 ms per call), so running it inline in an
+async handler stalls every other request on the worker. Calls are handed to a
+thread or process pool instead, and callers are turned away once too many are
+already waiting so a login burst cannot build an unbounded backlog.
+"""
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the pending-work limit is reached"""
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _timed(fn, *args):
+    # Runs in the executor (module level so process pools can pickle it)
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pending: int = 32,
+        executor: str = "thread",
+        observer: Optional[Callable[[str, float, float], None]] = None
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor_kind = executor
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+        # Called as observer(operation, wait_seconds, hash_seconds) after every call
+        self.observer = observer
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so forked uvicorn workers each get their own pool
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            result, hash_seconds = await loop.run_in_executor(self._get_executor(), _timed, fn, *args)
+            if self.observer is not None:
+                self.observer(operation, time.perf_counter() - started - hash_seconds, hash_seconds)
+            return result
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", _verify, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,199 @@
+"""Async PayPal REST client (v1 payments API).
+
+Replaces the blocking paypalrestsdk calls. A single keep-alive connection pool
+is shared by every request on the worker, the OAuth token is cached until
+shortly before it expires, and transient failures (timeouts, 429, 5xx) are
+retried with jittered exponential backoff. POSTs carry a PayPal-Request-Id so
+a retried create or execute is de-duplicated by PayPal instead of repeated.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+PAYPAL_API_BASES = {
+    "sandbox": "https://api-m.sandbox.paypal.com",
+    "live": "https://api-m.paypal.com",
+}
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Refresh the token this many seconds before PayPal says it expires
+TOKEN_EXPIRY_MARGIN = 60
+
+
+class PayPalError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None, details: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+
+class PayPalGateway:
+    def __init__(
+        self,
+        client_id: Optional[str],
+        client_secret: Optional[str],
+        mode: str = "sandbox",
+        base_url: Optional[str] = None,
+        timeout: float = 10.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        max_connections: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        observer: Optional[Callable[[str, str, float], None]] = None,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.base_url = (base_url or PAYPAL_API_BASES.get(mode, PAYPAL_API_BASES["sandbox"])).rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_connections = max_connections
+        self._transport = transport
+        # Called as observer(operation, outcome, seconds) after every HTTP attempt
+        self.observer = observer
+        self._client: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock: Optional[asyncio.Lock] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created on first use so the pool belongs to the worker's event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    def _observe(self, operation: str, outcome: str, started: float) -> None:
+        if self.observer is not None:
+            self.observer(operation, outcome, time.perf_counter() - started)
+
+    async def _access_token(self) -> str:
+        if self._token and time.monotonic() < self._token_expires_at:
+            return self._token
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            # Another request may have refreshed the token while we waited
+            if self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+            started = time.perf_counter()
+            try:
+                response = await self._get_client().post(
+                    "/v1/oauth2/token",
+                    data={"grant_type": "client_credentials"},
+                    auth=(self.client_id or "", self.client_secret or ""),
+                    headers={"Accept": "application/json"},
+                )
+            except httpx.HTTPError as e:
+                self._observe("oauth_token", "error", started)
+                raise PayPalError(f"PayPal authentication failed: {e}")
+            self._observe("oauth_token", str(response.status_code), started)
+            if response.status_code != 200:
+                raise PayPalError("PayPal authentication failed", response.status_code, _safe_json(response))
+            body = response.json()
+            self._token = body["access_token"]
+            expires_in = float(body.get("expires_in", 3600))
+            self._token_expires_at = time.monotonic() + max(expires_in - TOKEN_EXPIRY_MARGIN, 0)
+            return self._token
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": spreads retries from many workers over the window
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        json: Optional[Dict[str, Any]] = None,
+        request_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        operation: str = "request",
+    ) -> Dict[str, Any]:
+        last_error: Optional[PayPalError] = None
+        token_refreshed = False
+        attempt = 0
+        while attempt <= self.max_retries:
+            token = await self._access_token()
+            headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+            if request_id:
+                headers["PayPal-Request-Id"] = request_id
+            started = time.perf_counter()
+            try:
+                response = await self._get_client().request(
+                    method, path, json=json, headers=headers, timeout=timeout or self.timeout
+                )
+            except httpx.TransportError as e:
+                self._observe(operation, "error", started)
+                last_error = PayPalError(f"PayPal request failed: {e.__class__.__name__}")
+            else:
+                self._observe(operation, str(response.status_code), started)
+                if response.status_code == 401 and not token_refreshed:
+                    # Token revoked or expired early; fetch a new one and retry once for free
+                    self._token = None
+                    token_refreshed = True
+                    continue
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    last_error = PayPalError(
+                        f"PayPal returned {response.status_code}", response.status_code, _safe_json(response)
+                    )
+                elif response.status_code >= 400:
+                    details = _safe_json(response)
+                    message = details.get("message") if isinstance(details, dict) else None
+                    raise PayPalError(message or f"PayPal returned {response.status_code}", response.status_code, details)
+                else:
+                    return response.json()
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt)
+                logging.warning(f"PayPal {method} {path} failed ({last_error}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            attempt += 1
+        raise last_error
+
+    async def create_payment(self, payment: Dict[str, Any], request_id: Optional[str] = None) -> Dict[str, Any]:
+        return await self._request(
+            "POST", "/v1/payments/payment", json=payment, request_id=request_id, operation="create_payment"
+        )
+
+    async def find_payment(self, payment_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/v1/payments/payment/{payment_id}", operation="find_payment")
+
+    async def execute_payment(self, payment_id: str, payer_id: str, request_id: Optional[str] = None) -> Dict[str, Any]:
+        return await self._request(
+            "POST",
+            f"/v1/payments/payment/{payment_id}/execute",
+            json={"payer_id": payer_id},
+            request_id=request_id or f"execute-{payment_id}-{payer_id}",
+            operation="execute_payment",
+        )
+
+    async def ping(self, timeout: float) -> float:
+        """Round trip to the API host in milliseconds; any HTTP answer counts as reachable"""
+        started = time.perf_counter()
+        try:
+            await self._get_client().get("/", timeout=timeout)
+        except httpx.HTTPError as e:
+            raise PayPalError(f"PayPal unreachable: {e.__class__.__name__}")
+        return (time.perf_counter() - started) * 1000
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _safe_json(response: httpx.Response) -> Any:
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
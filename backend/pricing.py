@@ -0,0 +1,75 @@
+"""Cart pricing in exact integer cents.
+
+Prices are looked up through a plant_id -> cents dict built once per request,
+so pricing a cart is O(lines) instead of scanning the fetched plants for every
+line. All arithmetic is on integer cents, with Decimal half-up rounding only
+where a percentage is applied (tax and percentage discounts), so totals never
+pick up float drift like 0.1 + 0.2.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+TAX_RATE = Decimal("0.08")
+FREE_SHIPPING_OVER_CENTS = 5000
+SHIPPING_CENTS = 899
+
+
+def to_cents(amount: Any) -> int:
+    """Dollar amount (float, str or Decimal) to integer cents, rounding half up"""
+    if isinstance(amount, (int, float)):
+        # Stored prices have at most two decimals, so this is exact without a Decimal round trip
+        cents = amount * 100
+        whole = round(cents)
+        if abs(cents - whole) < 1e-6:
+            return int(whole)
+    return int((Decimal(str(amount)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def to_amount(cents: int) -> float:
+    return float(Decimal(cents) / 100)
+
+
+def _percent_of(cents: int, rate: Decimal) -> int:
+    return int((cents * rate).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+async def fetch_prices(db, plant_ids: Iterable[str]) -> Dict[str, int]:
+    """Price index for the given plants, fetched with a projection of id and price only"""
+    cursor = db.plants.find({"id": {"$in": list(set(plant_ids))}}, {"_id": 0, "id": 1, "price": 1})
+    return {plant["id"]: to_cents(plant["price"]) async for plant in cursor if plant.get("price") is not None}
+
+
+def discount_cents(discount: Optional[Dict[str, Any]], subtotal_cents: int) -> int:
+    if not discount:
+        return 0
+    if discount["type"] == "percentage":
+        return _percent_of(subtotal_cents, Decimal(str(discount["value"])) / 100)
+    if discount["type"] == "fixed":
+        return min(to_cents(discount["value"]), subtotal_cents)
+    return 0
+
+
+def price_cart(
+    lines: Iterable[Tuple[str, int]],
+    prices: Dict[str, int],
+    discount: Optional[Dict[str, Any]] = None
+) -> Dict[str, float]:
+    """Totals for (plant_id, quantity) lines; plants missing from prices are skipped"""
+    subtotal = 0
+    for plant_id, quantity in lines:
+        price = prices.get(plant_id)
+        if price is not None and quantity > 0:
+            subtotal += price * quantity
+
+    tax = _percent_of(subtotal, TAX_RATE)
+    shipping = 0 if subtotal > FREE_SHIPPING_OVER_CENTS else SHIPPING_CENTS
+    discount_amount = discount_cents(discount, subtotal)
+    total = subtotal + tax + shipping - discount_amount
+
+    return {
+        "subtotal": to_amount(subtotal),
+        "tax_amount": to_amount(tax),
+        "shipping_cost": to_amount(shipping),
+        "discount_amount": to_amount(discount_amount),
+        "total": to_amount(total)
+    }
@@ -0,0 +1,135 @@
+"""Incremental plant rating state.
+
+Each plant keeps rating_sum, rating_count and a per-star rating_histogram
+alongside the average_rating/total_reviews fields the frontend reads. A new
+review updates them in a single pipeline update, which is atomic per document,
+so concurrent reviews cannot overwrite each other's counts and nothing has to
+re-read the reviews collection.
+
+reconcile_ratings() recomputes the same state from the reviews collection with
+an aggregation and repairs any plant whose stored state has drifted. Plants
+that predate this state (no rating_count yet) count as drifted, so the first
+run after a deploy initialises every plant, and average_rating/total_reviews
+are replaced by the figures the reviews collection actually supports.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import UpdateOne
+
+STARS = ("1", "2", "3", "4", "5")
+
+
+def _average_stage() -> Dict[str, Any]:
+    return {"$set": {
+        "average_rating": {"$cond": [
+            {"$gt": ["$rating_count", 0]},
+            {"$round": [{"$divide": ["$rating_sum", "$rating_count"]}, 1]},
+            0.0
+        ]},
+        "total_reviews": "$rating_count"
+    }}
+
+
+async def record_review_rating(db, plant_id: str, rating: int) -> bool:
+    """Fold one new review into the plant's rating state; returns False if the plant is missing"""
+    star = str(rating)
+    result = await db.plants.update_one({"id": plant_id, "rating_count": {"$exists": True}}, [
+        {"$set": {
+            "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, rating]},
+            "rating_count": {"$add": [{"$ifNull": ["$rating_count", 0]}, 1]},
+            f"rating_histogram.{star}": {"$add": [{"$ifNull": [f"$rating_histogram.{star}", 0]}, 1]}
+        }},
+        _average_stage()
+    ])
+    if result.matched_count:
+        return True
+    # No rating state yet: build it from every review, including the one just inserted
+    return await reconcile_ratings(db, plant_id=plant_id) > 0
+
+
+def empty_histogram() -> Dict[str, int]:
+    return {star: 0 for star in STARS}
+
+
+def _rating_state(total: int, count: int, histogram: Dict[str, int]) -> Dict[str, Any]:
+    return {
+        "rating_sum": total,
+        "rating_count": count,
+        "rating_histogram": {star: histogram.get(star, 0) for star in STARS},
+        "average_rating": round(total / count, 1) if count else 0.0,
+        "total_reviews": count,
+    }
+
+
+async def reconcile_ratings(db, plant_id: Optional[str] = None) -> int:
+    """Recompute rating state from reviews and fix drifted plants; returns how many were fixed.
+
+    Without plant_id every plant is checked, including ones with no rating
+    state yet, which are initialised.
+
+    Plant state is read before aggregating and written back only if it is still
+    unchanged, so a review recorded while this runs is never overwritten; that
+    plant is simply picked up on the next run.
+    """
+    plant_filter = {"id": plant_id} if plant_id else {}
+    current = {
+        plant["id"]: plant
+        async for plant in db.plants.find(
+            plant_filter, {"_id": 0, "id": 1, "rating_sum": 1, "rating_count": 1, "rating_histogram": 1}
+        )
+    }
+    if not current:
+        return 0
+    pipeline = [
+        {"$match": {"plant_id": plant_id}} if plant_id else {"$match": {}},
+        {"$group": {
+            "_id": {"plant_id": "$plant_id", "rating": "$rating"},
+            "count": {"$sum": 1}
+        }},
+        {"$group": {
+            "_id": "$_id.plant_id",
+            "rating_sum": {"$sum": {"$multiply": ["$_id.rating", "$count"]}},
+            "rating_count": {"$sum": "$count"},
+            "stars": {"$push": {"k": {"$toString": "$_id.rating"}, "v": "$count"}}
+        }}
+    ]
+    expected: Dict[str, Dict[str, Any]] = {}
+    async for row in db.reviews.aggregate(pipeline):
+        histogram = {star["k"]: star["v"] for star in row["stars"]}
+        expected[row["_id"]] = _rating_state(row["rating_sum"], row["rating_count"], histogram)
+
+    updates = []
+    for current_id, plant in current.items():
+        state = expected.get(current_id, _rating_state(0, 0, {}))
+        stored = {
+            "rating_sum": plant.get("rating_sum"),
+            "rating_count": plant.get("rating_count"),
+            "rating_histogram": plant.get("rating_histogram"),
+        }
+        if all(stored[key] == state[key] for key in stored):
+            continue
+        # Compare-and-set against what was read above; a None matches a missing field
+        updates.append(UpdateOne({"id": current_id, **stored}, {"$set": state}))
+
+    if not updates:
+        return 0
+    result = await db.plants.bulk_write(updates, ordered=False)
+    return result.modified_count
+
+
+async def run_rating_reconciler(db, interval_seconds: float, on_change: Optional[Callable[[], Awaitable[None]]] = None):
+    """Background loop: reconcile now, then every interval_seconds"""
+    while True:
+        try:
+            fixed = await reconcile_ratings(db)
+            if fixed:
+                logging.warning(f"Rating reconciliation repaired {fixed} plant(s)")
+                if on_change:
+                    await on_change()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Error reconciling plant ratings: {str(e)}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,197 @@
+"""Catalog search backends.
+
+Both backends take the raw search string from the query parameter and reduce
+it to plain lowercase alphanumeric tokens first, so regex metacharacters and
+$text operators (quotes, leading "-") in user input have no effect.
+
+- MongoTextSearch uses the plants text index and ranks by textScore.
+- InvertedIndexSearch keeps an in-process index built from the plants
+  collection, ranks by field-weighted TF-IDF and treats the last query token
+  as a prefix so it can serve typeahead. Only the indexed text matters to it:
+  stock, price and rating writes leave it alone. Once an index exists, a stale
+  one keeps serving while its replacement is built in a worker thread.
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import re
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+MAX_QUERY_TOKENS = 8
+MAX_TOKEN_LENGTH = 32
+MAX_PREFIX_EXPANSIONS = 50
+# Name matches count for more than description matches
+FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "description": 1.0}
+
+
+def tokenize(text: Optional[str], limit: Optional[int] = None) -> List[str]:
+    tokens = [token[:MAX_TOKEN_LENGTH] for token in TOKEN_PATTERN.findall((text or "").lower())]
+    return tokens[:limit] if limit else tokens
+
+
+def query_tokens(search: Optional[str]) -> List[str]:
+    # De-duplicate while keeping order; the last token is the one being typed
+    return list(dict.fromkeys(tokenize(search, MAX_QUERY_TOKENS)))
+
+
+class MongoTextSearch:
+    """Relevance search through the `name`/`description` text index"""
+
+    name = "text"
+    projection = {"score": {"$meta": "textScore"}}
+    sort = [("score", {"$meta": "textScore"})]
+
+    def filter(self, search: str) -> Optional[Dict[str, Any]]:
+        tokens = query_tokens(search)
+        if not tokens:
+            return None
+        return {"$text": {"$search": " ".join(tokens)}}
+
+
+class InvertedIndexSearch:
+    """In-process inverted index over plant name, category and description"""
+
+    name = "inverted"
+
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self._names: Dict[str, str] = {}
+        self._built_at: Optional[float] = None
+        # mark_stale() bumps the generation; an index is current if built from the latest one
+        self._generation = 0
+        self._built_generation = -1
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._rebuild: Optional[asyncio.Task] = None
+        self.document_count = 0
+        self.rebuilds = 0
+
+    @property
+    def is_stale(self) -> bool:
+        return (
+            self._built_at is None
+            or self._built_generation != self._generation
+            or time.monotonic() - self._built_at > self.ttl_seconds
+        )
+
+    def mark_stale(self) -> None:
+        """Call after writes that change plant names, categories or descriptions"""
+        self._generation += 1
+
+    def build(self, plants: Iterable[Dict[str, Any]]) -> None:
+        self._install(*self._compute(plants), generation=self._generation)
+
+    @staticmethod
+    def _compute(plants: Iterable[Dict[str, Any]]):
+        postings: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        names: Dict[str, str] = {}
+        for plant in plants:
+            plant_id = plant["id"]
+            names[plant_id] = plant.get("name", "")
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(plant.get(field)):
+                    postings[token][plant_id] += weight
+
+        # Fold IDF into the stored weights so a query is just lookups and sums
+        total = max(len(names), 1)
+        weighted = {}
+        for token, documents in postings.items():
+            idf = math.log(1 + total / len(documents))
+            weighted[token] = {plant_id: tf * idf for plant_id, tf in documents.items()}
+        return weighted, sorted(weighted), names
+
+    def _install(self, postings, vocabulary, names, generation: int) -> None:
+        # Plain assignments with no await in between, so a search never sees a half-swapped index
+        self._postings = postings
+        self._vocabulary = vocabulary
+        self._names = names
+        self.document_count = len(names)
+        self._built_at = time.monotonic()
+        self._built_generation = generation
+        self.rebuilds += 1
+
+    async def _rebuild_from(self, collection) -> None:
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            # Concurrent callers wait for a single rebuild instead of each starting one
+            if not self.is_stale:
+                return
+            # Writes marked after this point leave the new index stale again
+            generation = self._generation
+            cursor = collection.find({}, {"_id": 0, "id": 1, "name": 1, "category": 1, "description": 1})
+            plants = await cursor.to_list(length=None)
+            # Tokenising the whole catalog takes seconds at 100k plants; keep it off the event loop
+            computed = await asyncio.to_thread(self._compute, plants)
+            self._install(*computed, generation=generation)
+
+    async def refresh(self, collection) -> None:
+        """Rebuild from Mongo when the index is older than its TTL or was marked stale.
+
+        The first build is awaited. After that, the current index keeps serving
+        while a rebuild runs in the background.
+        """
+        if not self.is_stale:
+            return
+        if self._built_at is None:
+            await self._rebuild_from(collection)
+            return
+        if self._rebuild is None or self._rebuild.done():
+            self._rebuild = asyncio.create_task(self._rebuild_from(collection))
+            self._rebuild.add_done_callback(self._log_rebuild_failure)
+
+    @staticmethod
+    def _log_rebuild_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Error rebuilding search index: {str(task.exception())}")
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        matches = []
+        for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def _term_scores(self, terms: List[str]) -> Dict[str, float]:
+        # Best-scoring expansion per document, so "mon" does not favour plants
+        # that happen to contain both "monstera" and "money"
+        scores: Dict[str, float] = {}
+        for term in terms:
+            for plant_id, weight in self._postings.get(term, {}).items():
+                if weight > scores.get(plant_id, 0.0):
+                    scores[plant_id] = weight
+        return scores
+
+    def search(self, search: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return (plant_id, score) pairs matching every token, best first"""
+        tokens = query_tokens(search)
+        if not tokens:
+            return []
+        results: Optional[Dict[str, float]] = None
+        for position, token in enumerate(tokens):
+            is_last = position == len(tokens) - 1
+            terms = self._expand_prefix(token) if is_last else [token]
+            scores = self._term_scores(terms)
+            if results is None:
+                results = scores
+            else:
+                results = {plant_id: score + scores[plant_id] for plant_id, score in results.items() if plant_id in scores}
+            if not results:
+                return []
+        def order(item):
+            return (-item[1], item[0])
+
+        if limit:
+            return heapq.nsmallest(limit, results.items(), key=order)
+        return sorted(results.items(), key=order)
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, str]]:
+        return [{"id": plant_id, "name": self._names[plant_id]} for plant_id, _ in self.search(prefix, limit)]
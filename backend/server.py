@@ -1,18 +1,40 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
+import atexit
 import os
+from contextlib import asynccontextmanager
 import uuid
 from datetime import datetime
-import jwt
-from passlib.context import CryptContext
-import paypalrestsdk
-from paypalrestsdk import Payment, BillingPlan, BillingAgreement
 import logging
 import re
+from auth import Authenticator
+from catalog_cache import CatalogCache, serialize_documents
+from catalog_version import CatalogVersion
+from compression import CompressionMiddleware, choose_encoding, compress
+from diagnostics import LoopBlockDetector, ProfilingMiddleware, SlowRequestProfiler
+from discounts import DiscountTable
+from health import HealthMonitor, PoolCheckoutListener
+from indexes import UNIQUE_INDEX_NAMES, ensure_indexes
+from inventory import HOLDS_PROJECTION, InsufficientStock, InventoryEngine, order_lines
+from json_response import MongoJSONResponse
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, AppMetrics, MetricsMiddleware, MongoCommandListener, run_loop_lag_monitor
+from order_history import ORDER_SORT, order_summaries
+from password_hasher import PasswordHasher, PasswordHasherBusy
+from pricing import fetch_prices, price_cart
+from pagination import decode_cursor, encode_cursor, keyset_filter, merge_filters, page_envelope
+from paypal_gateway import PayPalError, PayPalGateway
+from ratings import empty_histogram, reconcile_ratings, record_review_rating, run_rating_reconciler
+from search import InvertedIndexSearch, MongoTextSearch
+from startup import FirstResponseTimer, StartupState, is_empty, seed
+from structured_logging import AccessLogMiddleware, LogPipeline, parse_sample_rates
+from user_stats import UserStatsStore
 
 # Models
 class Plant(BaseModel):
@@ -143,14 +165,58 @@ class WishlistItem(BaseModel):
     plant_id: str
     created_at: datetime
 
+# Logging: JSON records with request id and route, written from a background thread
+log_pipeline = LogPipeline(
+    level=os.environ.get("LOG_LEVEL", "INFO"),
+    fmt=os.environ.get("LOG_FORMAT", "json"),  # json or text
+    queue_size=int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+)
+log_pipeline.start()
+atexit.register(log_pipeline.stop)
+
+@asynccontextmanager
+async def lifespan(app):
+    # The Mongo client is made here, on the worker's own event loop after uvicorn has
+    # forked, and closed on the way out so its pooled connections are released at once
+    connect_mongo()
+    try:
+        await startup_event()
+        yield
+        await shutdown_event()
+    finally:
+        client.close()
+
 # FastAPI app
-app = FastAPI()
+app = FastAPI(default_response_class=MongoJSONResponse, lifespan=lifespan)
+
+# Per-worker request, Mongo, PayPal, bcrypt and event-loop metrics, served from /metrics
+app_metrics = AppMetrics()
+
+# Startup: with STARTUP_MODE=background the worker accepts connections at once and
+# /ready answers 503 until indexes, seed data and in-memory tables are loaded
+startup_state = StartupState()
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "blocking")  # blocking or background
 
 # Security
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    max_workers=int(os.environ.get("PASSWORD_HASH_WORKERS", "2")),
+    max_pending=int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "32")),
+    executor=os.environ.get("PASSWORD_HASH_EXECUTOR", "thread"),  # thread or process
+    observer=app_metrics.observe_password_hash
+)
+app_metrics.add_gauge("password_hash_pending", "bcrypt calls running or queued", lambda: password_hasher.pending)
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-here-change-in-production")  # Set SECRET_KEY in production!
 
+# Token verification: cached verified payloads, a short-lived user cache and in-memory revocations
+authenticator = Authenticator(
+    secret_key=SECRET_KEY,
+    token_ttl_seconds=float(os.environ.get("ACCESS_TOKEN_TTL", "604800")),
+    token_cache_size=int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    user_cache_ttl=float(os.environ.get("AUTH_USER_CACHE_TTL", "30")),
+    user_cache_size=int(os.environ.get("AUTH_USER_CACHE_SIZE", "10000"))
+)
+
 # CORS origins
 ALLOWED_ORIGINS = os.environ.get("ALLOWED_ORIGINS", "*").split(",")
 app.add_middleware(
@@ -161,20 +227,191 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database
+# Compression: brotli/gzip above a size threshold. The full catalog and the category list
+# are also compressed at the highest levels once per catalog version, in a worker thread,
+# and passed through as they are (see catalog_response()).
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+PRECOMPRESS_LEVELS = {"gzip": 9, "br": int(os.environ.get("PRECOMPRESS_BROTLI_QUALITY", "11"))}
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4"))
+)
+app.add_middleware(FirstResponseTimer, state=startup_state)
+# Opt-in diagnostics: the stack that blocked the event loop, and sampled profiles of slow requests
+LOOP_BLOCK_THRESHOLD_MS = float(os.environ.get("LOOP_BLOCK_THRESHOLD_MS", "0"))  # 0 = off
+loop_block_detector = LoopBlockDetector(threshold_ms=LOOP_BLOCK_THRESHOLD_MS) if LOOP_BLOCK_THRESHOLD_MS > 0 else None
+SLOW_REQUEST_PROFILE_MS = float(os.environ.get("SLOW_REQUEST_PROFILE_MS", "0"))  # 0 = off
+slow_request_profiler = SlowRequestProfiler(
+    threshold_ms=SLOW_REQUEST_PROFILE_MS,
+    directory=os.environ.get("PROFILE_DIR", "/tmp/green-haven-profiles"),
+    sample_interval_ms=float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "10")),
+    max_files=int(os.environ.get("PROFILE_MAX_FILES", "50"))
+) if SLOW_REQUEST_PROFILE_MS > 0 else None
+if slow_request_profiler:
+    app.add_middleware(ProfilingMiddleware, profiler=slow_request_profiler)
+# One access record per request: errors and slow requests always, successes sampled per route
+app.add_middleware(
+    AccessLogMiddleware,
+    sample_rate=float(os.environ.get("LOG_ACCESS_SAMPLE_RATE", "1.0")),
+    route_sample_rates=parse_sample_rates(os.environ.get(
+        "LOG_ACCESS_SAMPLE_ROUTES",
+        "/api/plants=0.01,/api/plants/{plant_id}=0.01,/api/categories=0.01,/api/plants/suggest=0,"
+        "/api/plants/{plant_id}/reviews=0.05,/health=0,/ready=0,/metrics=0"
+    )),
+    slow_request_ms=float(os.environ.get("LOG_SLOW_REQUEST_MS", "1000"))
+)
+app_metrics.add_gauge("log_records_dropped", "Log records dropped because the log queue was full", lambda: log_pipeline.handler.dropped)
+# Outermost, so request latency includes compression and every other middleware
+app.add_middleware(MetricsMiddleware, metrics=app_metrics)
+
+# Database: one client per worker, created in lifespan(). Pool sizes are per worker,
+# so the server sees up to workers x MONGO_MAX_POOL_SIZE connections.
 MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGO_URL)
-db = client["nursery_ecommerce"]
+MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "nursery_ecommerce")
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", "50")),
+    "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", "0")),
+    # Connections a pool opens at once; keeps a fresh deploy from opening them all in one burst
+    "maxConnecting": int(os.environ.get("MONGO_MAX_CONNECTING", "2")),
+    "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000")),
+    "waitQueueTimeoutMS": int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    "connectTimeoutMS": int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+}
+MONGO_COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", "")  # e.g. zstd,snappy,zlib
+if MONGO_COMPRESSORS:
+    MONGO_CLIENT_OPTIONS["compressors"] = MONGO_COMPRESSORS
+mongo_pool_listener = PoolCheckoutListener()
+client = None
+db = None
+
+def connect_mongo():
+    global client, db
+    client = AsyncIOMotorClient(
+        MONGO_URL,
+        event_listeners=[mongo_pool_listener, MongoCommandListener(app_metrics)],
+        **MONGO_CLIENT_OPTIONS
+    )
+    db = client[MONGO_DB_NAME]
+
+app_metrics.add_gauge("mongo_pool_connections_open", "Connections open in the Mongo pool", lambda: mongo_pool_listener.open)
+app_metrics.add_gauge("mongo_pool_connections_in_use", "Pooled Mongo connections checked out", lambda: mongo_pool_listener.in_use)
+app_metrics.add_gauge("mongo_pool_checkouts_waiting", "Operations waiting for a pooled Mongo connection", lambda: mongo_pool_listener.waiting)
+app_metrics.add_gauge("mongo_pool_max_size", "MONGO_MAX_POOL_SIZE for this worker", lambda: MONGO_CLIENT_OPTIONS["maxPoolSize"])
 
 # PayPal configuration
-paypalrestsdk.configure({
-    "mode": os.environ.get("PAYPAL_MODE", "sandbox"),  # sandbox or live
-    "client_id": os.environ.get("PAYPAL_CLIENT_ID"),
-    "client_secret": os.environ.get("PAYPAL_SECRET")
-})
+paypal = PayPalGateway(
+    client_id=os.environ.get("PAYPAL_CLIENT_ID"),
+    client_secret=os.environ.get("PAYPAL_SECRET"),
+    mode=os.environ.get("PAYPAL_MODE", "sandbox"),  # sandbox or live
+    base_url=os.environ.get("PAYPAL_API_BASE"),  # e.g. http://localhost:8002 for fake_paypal.py
+    timeout=float(os.environ.get("PAYPAL_TIMEOUT", "10")),
+    max_retries=int(os.environ.get("PAYPAL_MAX_RETRIES", "2")),
+    max_connections=int(os.environ.get("PAYPAL_MAX_CONNECTIONS", "20")),
+    observer=app_metrics.observe_paypal
+)
+
 
-# Logging
-logging.basicConfig(level=logging.INFO)
+# Catalog cache (per worker; writes below invalidate it explicitly)
+catalog_cache = CatalogCache(
+    ttl_seconds=float(os.environ.get("CATALOG_CACHE_TTL", "30")),
+    max_entries=int(os.environ.get("CATALOG_CACHE_MAX_ENTRIES", "256"))
+)
+
+# Catalog search: "inverted" (in-process index) or "text" (Mongo text index).
+# Typeahead always uses the in-process index since $text cannot match prefixes.
+plant_index = InvertedIndexSearch(ttl_seconds=float(os.environ.get("SEARCH_INDEX_TTL", "300")))
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "inverted")
+plant_search = MongoTextSearch() if SEARCH_BACKEND == "text" else plant_index
+
+# Profile stats: computed per request, or kept in user_stats documents when materialised
+user_stats = UserStatsStore(
+    enabled=os.environ.get("USER_STATS_MATERIALIZED", "false").lower() == "true",
+    max_age_seconds=float(os.environ.get("USER_STATS_MAX_AGE", "86400"))
+)
+
+# Stock is held at PayPal order creation and committed when the payment executes
+inventory = InventoryEngine(
+    reservation_ttl_seconds=float(os.environ.get("INVENTORY_RESERVATION_TTL", "3600"))
+)
+
+# Active discount codes, served from memory on the cart path
+discount_table = DiscountTable()
+
+# Mongo/PayPal health, refreshed in the background; /ready and load shedding read the snapshot
+health_monitor = HealthMonitor(
+    interval_seconds=float(os.environ.get("HEALTH_CHECK_INTERVAL", "5")),
+    ping_timeout=float(os.environ.get("HEALTH_PING_TIMEOUT", "2")),
+    degraded_ping_ms=float(os.environ.get("HEALTH_DEGRADED_PING_MS", "250")),
+    degraded_checkout_ms=float(os.environ.get("HEALTH_DEGRADED_CHECKOUT_MS", "100")),
+    paypal_interval_seconds=float(os.environ.get("HEALTH_PAYPAL_INTERVAL", "30")),
+    pool_listener=mongo_pool_listener
+)
+SHED_WHEN_DEGRADED = os.environ.get("HEALTH_SHED_WHEN_DEGRADED", "true").lower() == "true"
+
+# Bumped on every plant, review or inventory write; catalog ETags are derived from it
+catalog_version = CatalogVersion()
+CATALOG_CACHE_CONTROL = f"public, max-age={int(os.environ.get('CATALOG_HTTP_MAX_AGE', '30'))}"
+
+def drop_catalog_caches(text_changed: bool = False):
+    """Drop this worker's cached catalog reads, and its search index if plant text changed"""
+    catalog_cache.invalidate()
+    if text_changed:
+        plant_index.mark_stale()
+
+async def invalidate_catalog(text_changed: bool = False):
+    """After any plant, review or inventory write: drop local caches and bump the shared version.
+
+    Pass text_changed=True when plant names, categories or descriptions changed.
+    """
+    drop_catalog_caches(text_changed)
+    await catalog_version.bump(db, text_changed=text_changed)
+
+def catalog_headers():
+    return {"ETag": catalog_version.etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+
+# Precompressions in flight, by cache key and encoding
+precompress_tasks = {}
+
+async def precompress(compressed_key, payload: bytes, encoding: str):
+    try:
+        # brotli 11 on the full catalog takes long enough to stall every other request
+        body = await asyncio.to_thread(compress, payload, encoding, PRECOMPRESS_LEVELS[encoding])
+        catalog_cache.set(compressed_key, body)
+    except Exception as e:
+        logging.error(f"Error precompressing catalog payload: {str(e)}")
+    finally:
+        precompress_tasks.pop(compressed_key, None)
+
+def catalog_response(request: Request, cache_key, payload: bytes, headers: dict, precompressed: bool = False):
+    """Serve a cached catalog payload.
+
+    Payloads are left to CompressionMiddleware's per-request levels, except
+    precompressed ones (the full catalog and the category list). Those are
+    compressed at the highest level once per entry and encoding in the
+    background; until that is done, they too go through the middleware.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if precompressed and encoding is not None and len(payload) >= COMPRESSION_MIN_SIZE:
+        compressed_key = cache_key + (encoding,)
+        body = catalog_cache.get(compressed_key)
+        if body is not None:
+            return Response(
+                content=body,
+                media_type="application/json",
+                headers={**headers, "Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+            )
+        if compressed_key not in precompress_tasks:
+            precompress_tasks[compressed_key] = asyncio.create_task(precompress(compressed_key, payload, encoding))
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+def catalog_not_modified(request: Request):
+    """A 304 if the client already holds the current catalog version, else None"""
+    if catalog_version.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers={**catalog_headers(), "Vary": "Accept-Encoding"})
+    return None
 
 # Sample plant data
 SAMPLE_PLANTS = [
@@ -467,14 +704,14 @@ SAMPLE_DISCOUNT_CODES = [
         "type": "percentage",
         "value": 20,
         "active": True,
-        "expires_at": datetime(2025, 6, 1)
+        "expires_at": datetime(2027, 6, 1)
     },
     {
         "code": "SAVE10",
         "type": "fixed",
         "value": 10,
         "active": True,
-        "expires_at": datetime(2025, 12, 31)
+        "expires_at": datetime(2027, 12, 31)
     }
 ]
 
@@ -502,73 +739,247 @@ SAMPLE_REVIEWS = [
     }
 ]
 
+# Long-running tasks started at startup and cancelled at shutdown
+background_tasks = []
+
 # Initialize database
-@app.on_event("startup")
-async def startup_event():
+# (collection, label, documents, unique key) seeded into empty collections
+SAMPLE_DATA = [
+    ("plants", "plants", SAMPLE_PLANTS, "id"),
+    ("discount_codes", "discount codes", SAMPLE_DISCOUNT_CODES, "code"),
+    ("reviews", "reviews", SAMPLE_REVIEWS, "id"),
+]
+
+async def prepare_worker():
+    """Indexes, seed data and in-memory tables, with each round of checks and loads run concurrently"""
     try:
-        # Check if plants collection exists and initialize with sample data
-        plants_count = await db.plants.count_documents({})
-        if plants_count == 0:
-            await db.plants.insert_many(SAMPLE_PLANTS)
-            print(f"✅ {len(SAMPLE_PLANTS)} sample plants added to database")
-        else:
-            print(f"✅ Database already contains {plants_count} plants")
+        # Indexes are declared in indexes.py so every deploy gets them, not just Docker.
+        # Seeding waits for them: the unique indexes are what make concurrent upserts safe.
+        failed_indexes, *empty = await asyncio.gather(
+            ensure_indexes(db),
+            *(is_empty(db, collection) for collection, _, _, _ in SAMPLE_DATA)
+        )
+        if failed_indexes:
+            print(f"⚠️ Could not ensure indexes: {', '.join(failed_indexes)}")
+        # Without its unique index, racing upserts from several workers could insert duplicates
+        unguarded = {name.partition(".")[0] for name in failed_indexes if name in UNIQUE_INDEX_NAMES}
+        
+        # Every worker may get here at once on a first boot; seed() only inserts what is missing
+        to_seed = []
+        for sample, is_missing in zip(SAMPLE_DATA, empty):
+            collection, label, _, _ = sample
+            if is_missing and collection in unguarded:
+                print(f"⚠️ Not seeding sample {label}: a unique index on {collection} is missing")
+            elif is_missing:
+                to_seed.append(sample)
+        inserted = await asyncio.gather(*(
+            seed(db, collection, documents, key) for collection, _, documents, key in to_seed
+        ))
+        for (_, label, _, _), count in zip(to_seed, inserted):
+            if count:
+                print(f"✅ {count} sample {label} added to database")
         
-        # Check if discount codes exist and initialize
-        discount_count = await db.discount_codes.count_documents({})
-        if discount_count == 0:
-            await db.discount_codes.insert_many(SAMPLE_DISCOUNT_CODES)
-            print(f"✅ {len(SAMPLE_DISCOUNT_CODES)} sample discount codes added to database")
+        _, _, live_codes = await asyncio.gather(
+            authenticator.revocations.refresh(db),
+            catalog_version.load(db),
+            discount_table.refresh(db)
+        )
+        print(f"✅ {live_codes} live discount codes loaded")
         
-        # Check if reviews exist and initialize
-        reviews_count = await db.reviews.count_documents({})
-        if reviews_count == 0:
-            await db.reviews.insert_many(SAMPLE_REVIEWS)
-            print(f"✅ {len(SAMPLE_REVIEWS)} sample reviews added to database")
+        # Keep incremental rating state honest against the reviews collection
+        background_tasks.append(asyncio.create_task(run_rating_reconciler(
+            db,
+            interval_seconds=float(os.environ.get("RATING_RECONCILE_INTERVAL", "3600")),
+            on_change=invalidate_catalog
+        )))
+        background_tasks.append(asyncio.create_task(inventory.run_reservation_reaper(
+            db,
+            interval_seconds=float(os.environ.get("INVENTORY_REAPER_INTERVAL", "60")),
+            on_change=invalidate_catalog
+        )))
+        background_tasks.append(asyncio.create_task(discount_table.run_refresher(
+            db,
+            interval_seconds=float(os.environ.get("DISCOUNT_REFRESH_INTERVAL", "60"))
+        )))
+        if os.environ.get("DISCOUNT_CHANGE_STREAM", "false").lower() == "true":
+            background_tasks.append(asyncio.create_task(discount_table.watch_changes(db)))
+        background_tasks.append(asyncio.create_task(catalog_version.run_poller(
+            db,
+            interval_seconds=float(os.environ.get("CATALOG_VERSION_POLL_INTERVAL", "5")),
+            on_change=drop_catalog_caches
+        )))
+        background_tasks.append(asyncio.create_task(authenticator.run_revocation_refresher(
+            db,
+            interval_seconds=float(os.environ.get("AUTH_REVOCATION_REFRESH", "15"))
+        )))
+        background_tasks.append(asyncio.create_task(health_monitor.run(db, paypal)))
+        background_tasks.append(asyncio.create_task(run_loop_lag_monitor(
+            app_metrics,
+            interval_seconds=float(os.environ.get("METRICS_LOOP_LAG_INTERVAL", "0.5"))
+        )))
         
-        print("🚀 Green Haven Nursery API is ready!")
+        startup_seconds = startup_state.mark_ready()
+        print(f"🚀 Green Haven Nursery API is ready! ({startup_seconds:.2f}s after launch)")
     except Exception as e:
+        startup_state.mark_failed(e)
         print(f"❌ Error during startup: {str(e)}")
         raise e
 
+async def startup_event():
+    # Started first so a slow warm-up is covered too
+    if loop_block_detector:
+        background_tasks.append(loop_block_detector.start())
+        app_metrics.add_gauge("event_loop_blocks", "Event loop stalls over LOOP_BLOCK_THRESHOLD_MS", lambda: loop_block_detector.blocks)
+    if slow_request_profiler:
+        slow_request_profiler.start()
+    if STARTUP_MODE == "background":
+        background_tasks.append(asyncio.create_task(prepare_worker()))
+    else:
+        await prepare_worker()
+
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    if loop_block_detector:
+        loop_block_detector.stop()
+    if slow_request_profiler:
+        slow_request_profiler.stop()
+    password_hasher.shutdown()
+    await paypal.aclose()
+
 # Utility functions
 def create_access_token(data: dict):
-    to_encode = data.copy()
-    return jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
+    return authenticator.create_token(data)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
-        return payload
-    except:
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    # async so the cached lookup runs on the event loop instead of the threadpool
+    payload = authenticator.verify(credentials.credentials)
+    if payload is None:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+def password_hasher_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy. Please try again shortly.",
+        headers={"Retry-After": "1"}
+    )
+
+async def shed_when_degraded():
+    """Dependency for non-critical routes: refuse them while Mongo is slow or unreachable"""
+    if SHED_WHEN_DEGRADED and health_monitor.shedding:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="This feature is temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(int(health_monitor.interval_seconds))}
+        )
 
-def hash_password(password: str):
-    return pwd_context.hash(password)
+async def hash_password(password: str):
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str):
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
 
 # API Routes
 
 # Plants endpoints
+PLANT_SORT_OPTIONS = {
+    "price_asc": [("price", 1)],
+    "price_desc": [("price", -1)],
+    "rating": [("average_rating", -1)],
+    "name": [("name", 1)],
+    "newest": [("created_at", -1)]
+}
+PLANT_FIELDS = set(Plant.model_fields) | {"created_at"}
+# Whole plant documents, minus Mongo's _id and the per-order stock holds kept on them
+PLANT_PROJECTION = {"_id": 0, **HOLDS_PROJECTION}
+DEFAULT_PAGE_SIZE = 20
+RELEVANCE_CURSOR_SORT = [("position", 1)]
+
+def parse_plant_fields(fields: Optional[str]):
+    """Turn `fields=id,name,price` into a projection, or None for whole documents"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in PLANT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown plant fields: {', '.join(unknown)}")
+    return requested
+
+async def count_plants(query: dict):
+    # The collection metadata count avoids touching documents when nothing is filtered
+    if not query:
+        return await db.plants.estimated_document_count()
+    return await db.plants.count_documents(query)
+
 @app.get("/api/plants")
 async def get_plants(
+    request: Request,
     category: Optional[str] = None, 
     search: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    sort_by: Optional[str] = None  # price_asc, price_desc, rating, name
+    sort_by: Optional[str] = None,  # price_asc, price_desc, rating, name, relevance (default with search)
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None  # comma-separated projection for listing views, e.g. id,name,price,image_url
 ):
+    """List plants.
+    
+    Without `limit`/`cursor` the whole matching catalog is returned as a list.
+    With either, a page is returned as {items, next_cursor, total}; pass
+    next_cursor back to fetch the following page.
+    """
+    not_modified = catalog_not_modified(request)
+    if not_modified:
+        return not_modified
+    # Taken before any read, so the tag never claims a newer version than the data
+    headers = catalog_headers()
+    cache_key = ("plants", catalog_version.version, category, search, min_price, max_price, sort_by, limit, cursor, fields)
+    # Only the unfiltered listing is worth the highest compression levels
+    full_catalog = all(value is None for value in (category, search, min_price, max_price, sort_by, limit, cursor, fields))
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return catalog_response(request, cache_key, cached, headers, precompressed=full_catalog)
+    
+    requested_fields = parse_plant_fields(fields)
+    paginate = limit is not None or cursor is not None
+    page_size = limit or DEFAULT_PAGE_SIZE
+    sort_by_relevance = bool(search) and sort_by in (None, "relevance")
+    sort_criteria = PLANT_SORT_OPTIONS.get(sort_by or "name", PLANT_SORT_OPTIONS["name"])
+    # A unique tiebreaker keeps keyset pages stable when sort values repeat
+    keyset_sort = sort_criteria + [("id", 1)]
+    cursor_values = None
+    if cursor:
+        cursor_values = decode_cursor(cursor, RELEVANCE_CURSOR_SORT if sort_by_relevance else keyset_sort)
+    
     try:
         query = {}
+        # Inclusion when fields are requested (set below), else everything but internal fields
+        projection = {"_id": 0} if requested_fields else dict(PLANT_PROJECTION)
+        relevance_rank = None
         if category:
             query["category"] = category
         if search:
-            query["$or"] = [
-                {"name": {"$regex": search, "$options": "i"}},
-                {"description": {"$regex": search, "$options": "i"}}
-            ]
+            if plant_search is plant_index:
+                await plant_index.refresh(db.plants)
+                ranked = plant_index.search(search)
+                relevance_rank = {plant_id: rank for rank, (plant_id, _) in enumerate(ranked)}
+                query["id"] = {"$in": list(relevance_rank)}
+            else:
+                text_filter = plant_search.filter(search)
+                if text_filter:
+                    query.update(text_filter)
+                    projection.update(plant_search.projection)
+                else:
+                    # Nothing searchable left after tokenising (e.g. only punctuation)
+                    query["id"] = {"$in": []}
         if min_price is not None or max_price is not None:
             price_query = {}
             if min_price is not None:
@@ -577,49 +988,107 @@ async def get_plants(
                 price_query["$lte"] = max_price
             query["price"] = price_query
         
-        # Sorting
-        sort_options = {
-            "price_asc": [("price", 1)],
-            "price_desc": [("price", -1)],
-            "rating": [("average_rating", -1)],
-            "name": [("name", 1)],
-            "newest": [("created_at", -1)]
-        }
-        sort_criteria = sort_options.get(sort_by or "name", [("name", 1)])
+        if requested_fields:
+            # Sort keys are fetched too so the next cursor can be built, then dropped
+            projection["id"] = 1
+            for field in requested_fields:
+                projection[field] = 1
+            for field, _ in keyset_sort:
+                projection[field] = 1
+        
+        if sort_by_relevance and "score" in projection:
+            sort_criteria = plant_search.sort
+        
+        total = None
+        next_cursor = None
+        if not paginate:
+            plants = await db.plants.find(query, projection).sort(sort_criteria).to_list(length=None)
+            if sort_by_relevance and relevance_rank is not None:
+                plants.sort(key=lambda plant: relevance_rank[plant["id"]])
+        elif sort_by_relevance:
+            # Relevance has no stored sort key, so pages are addressed by position
+            position = cursor_values[0] if cursor_values else 0
+            if not isinstance(position, int) or position < 0:
+                raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+            if relevance_rank is not None:
+                matching = await db.plants.find(query, {"_id": 0, "id": 1}).to_list(length=None)
+                ordered_ids = sorted((plant["id"] for plant in matching), key=relevance_rank.__getitem__)
+                total = len(ordered_ids)
+                page_ids = ordered_ids[position:position + page_size]
+                page_docs = await db.plants.find({"id": {"$in": page_ids}}, projection).to_list(length=None)
+                plants = sorted(page_docs, key=lambda plant: relevance_rank[plant["id"]])
+            else:
+                plants, total = await asyncio.gather(
+                    db.plants.find(query, projection).sort(sort_criteria).skip(position).limit(page_size).to_list(length=page_size),
+                    count_plants(query)
+                )
+            if position + len(plants) < total:
+                next_cursor = encode_cursor({"position": position + len(plants)}, RELEVANCE_CURSOR_SORT)
+        else:
+            page_query = query
+            if cursor_values is not None:
+                page_query = merge_filters(query, keyset_filter(keyset_sort, cursor_values))
+            plants, total = await asyncio.gather(
+                db.plants.find(page_query, projection).sort(keyset_sort).limit(page_size + 1).to_list(length=page_size + 1),
+                count_plants(query)
+            )
+            if len(plants) > page_size:
+                plants = plants[:page_size]
+                next_cursor = encode_cursor(plants[-1], keyset_sort)
         
-        plants_cursor = db.plants.find(query).sort(sort_criteria)
-        plants = await plants_cursor.to_list(length=None)
+        if requested_fields:
+            keep = set(requested_fields)
+            plants = [{key: value for key, value in plant.items() if key in keep} for plant in plants]
         
-        # Convert MongoDB documents to Pydantic models to handle ObjectId serialization
-        serialized_plants = []
-        for plant in plants:
-            # Convert _id to string if it exists
-            if "_id" in plant:
-                plant["_id"] = str(plant["_id"])
-            serialized_plants.append(plant)
+        # Serialize once and keep the bytes for later hits
+        payload = serialize_documents(page_envelope(plants, next_cursor, total) if paginate else plants)
+        catalog_cache.set(cache_key, payload)
         
-        logging.info(f"Retrieved {len(serialized_plants)} plants from database")
-        return serialized_plants
+        logging.debug(f"Retrieved {len(plants)} plants from database")
+        return catalog_response(request, cache_key, payload, headers, precompressed=full_catalog)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error fetching plants: {str(e)}")
         raise HTTPException(status_code=500, detail="Error fetching plants. Please try again.")
 
+@app.get("/api/plants/suggest", dependencies=[Depends(shed_when_degraded)])
+async def suggest_plants(q: str, limit: int = 8):
+    """Typeahead: plant names matching the query, last word treated as a prefix"""
+    await plant_index.refresh(db.plants)
+    return plant_index.suggest(q, limit=max(1, min(limit, 20)))
+
 @app.get("/api/plants/{plant_id}")
-async def get_plant(plant_id: str):
-    plant = await db.plants.find_one({"id": plant_id})
+async def get_plant(plant_id: str, request: Request):
+    not_modified = catalog_not_modified(request)
+    if not_modified:
+        return not_modified
+    headers = catalog_headers()
+    cache_key = ("plant", catalog_version.version, plant_id)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return catalog_response(request, cache_key, cached, headers)
+    
+    plant = await db.plants.find_one({"id": plant_id}, PLANT_PROJECTION)
     if not plant:
         raise HTTPException(status_code=404, detail="Plant not found")
     
-    # Convert _id to string if it exists
-    if "_id" in plant:
-        plant["_id"] = str(plant["_id"])
-    
-    return plant
+    payload = serialize_documents(plant)
+    catalog_cache.set(cache_key, payload)
+    return catalog_response(request, cache_key, payload, headers)
 
 @app.get("/api/categories")
-async def get_categories():
-    categories = await db.plants.distinct("category")
-    return categories
+async def get_categories(request: Request):
+    not_modified = catalog_not_modified(request)
+    if not_modified:
+        return not_modified
+    headers = catalog_headers()
+    cache_key = ("categories", catalog_version.version)
+    payload = catalog_cache.get(cache_key)
+    if payload is None:
+        payload = serialize_documents(await db.plants.distinct("category"))
+        catalog_cache.set(cache_key, payload)
+    return catalog_response(request, cache_key, payload, headers, precompressed=True)
 
 # User authentication endpoints
 @app.post("/api/register")
@@ -650,7 +1119,7 @@ async def register(user_data: UserRegister):
     
     # Create new user with enhanced data
     user_id = str(uuid.uuid4())
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     
     user = {
         "id": user_id,
@@ -711,7 +1180,7 @@ async def login(user_data: UserLogin):
             raise HTTPException(status_code=401, detail="Account is deactivated. Please contact support.")
         
         # Verify password
-        if not verify_password(user_data.password, user["password_hash"]):
+        if not await verify_password(user_data.password, user["password_hash"]):
             # Log failed login attempt
             logging.warning(f"Failed login attempt for email: {user_data.email}")
             raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -756,7 +1225,7 @@ async def login(user_data: UserLogin):
 # User profile endpoints
 @app.get("/api/profile")
 async def get_profile(current_user: dict = Depends(verify_token)):
-    user = await db.users.find_one({"id": current_user["user_id"]})
+    user = await authenticator.users.get(db, current_user["user_id"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -780,68 +1249,28 @@ async def update_profile(profile_data: UserProfile, current_user: dict = Depends
         {"id": current_user["user_id"]},
         {"$set": profile_data.dict()}
     )
+    authenticator.users.invalidate(current_user["user_id"])
     return {"message": "Profile updated successfully"}
 
 # Cart and order endpoints
 @app.post("/api/calculate-total")
 async def calculate_total(order_data: OrderRequest):
-    # Get plant details for cart items
-    plant_ids = [item.plant_id for item in order_data.items]
-    plants = await db.plants.find({"id": {"$in": plant_ids}}).to_list(length=None)
-    
-    # Calculate subtotal
-    subtotal = 0
-    for item in order_data.items:
-        plant = next((p for p in plants if p["id"] == item.plant_id), None)
-        if plant:
-            subtotal += plant["price"] * item.quantity
-    
-    # Calculate tax (8% tax rate)
-    tax_amount = subtotal * 0.08
-    
-    # Calculate shipping (free shipping over $50, otherwise $8.99)
-    shipping_cost = 0 if subtotal > 50 else 8.99
-    
-    # Calculate discount
-    discount_amount = 0
-    if order_data.discount_code:
-        discount = await db.discount_codes.find_one({
-            "code": order_data.discount_code,
-            "active": True
-        })
-        if discount:
-            if discount["type"] == "percentage":
-                discount_amount = subtotal * (discount["value"] / 100)
-            elif discount["type"] == "fixed":
-                discount_amount = min(discount["value"], subtotal)
-    
-    total = subtotal + tax_amount + shipping_cost - discount_amount
+    # Expired codes are not applied; the lookup is served from the in-memory table
+    discount = await discount_table.get(db, order_data.discount_code) if order_data.discount_code else None
+    prices = await fetch_prices(db, (item.plant_id for item in order_data.items))
     
-    return {
-        "subtotal": round(subtotal, 2),
-        "tax_amount": round(tax_amount, 2),
-        "shipping_cost": round(shipping_cost, 2),
-        "discount_amount": round(discount_amount, 2),
-        "total": round(total, 2)
-    }
+    # 8% tax, free shipping over $50 (otherwise $8.99); see pricing.py
+    return price_cart(((item.plant_id, item.quantity) for item in order_data.items), prices, discount)
 
 @app.get("/api/validate-discount")
 async def validate_discount(discount_code: str):
-    discount = await db.discount_codes.find_one({
-        "code": discount_code,
-        "active": True
-    })
+    discount = await discount_table.get(db, discount_code)
     if not discount:
+        # Check if expired
+        if discount_table.is_expired(discount_code):
+            raise HTTPException(status_code=400, detail="Discount code has expired")
         raise HTTPException(status_code=404, detail="Invalid discount code")
     
-    # Check if expired
-    if discount["expires_at"] < datetime.utcnow():
-        raise HTTPException(status_code=400, detail="Discount code has expired")
-    
-    # Convert _id to string if it exists
-    if "_id" in discount:
-        discount["_id"] = str(discount["_id"])
-    
     return {
         "valid": True,
         "type": discount["type"],
@@ -856,40 +1285,50 @@ async def create_paypal_order(order_request: PayPalOrderRequest):
         # Generate unique order ID
         order_id = str(uuid.uuid4())
         
+        # Hold stock before asking PayPal, so an approved payment always has inventory behind it
+        lines = order_lines(item.dict() for item in order_request.items)
+        await inventory.reserve(db, order_id, lines)
+        await invalidate_catalog()
+        
         # Create PayPal payment
-        payment = Payment({
-            "intent": "sale",
-            "payer": {
-                "payment_method": "paypal"
-            },
-            "redirect_urls": {
-                "return_url": "http://localhost:3000/payment/success",
-                "cancel_url": "http://localhost:3000/payment/cancel"
-            },
-            "transactions": [{
-                "item_list": {
-                    "items": [{
-                        "name": item.name,
-                        "sku": item.sku or f"item-{uuid.uuid4()}",
-                        "price": f"{item.unit_amount:.2f}",
-                        "currency": order_request.currency,
-                        "quantity": item.quantity
-                    } for item in order_request.items]
+        try:
+            payment = await paypal.create_payment({
+                "intent": "sale",
+                "payer": {
+                    "payment_method": "paypal"
                 },
-                "amount": {
-                    "total": f"{order_request.total_amount:.2f}",
-                    "currency": order_request.currency
+                "redirect_urls": {
+                    "return_url": "http://localhost:3000/payment/success",
+                    "cancel_url": "http://localhost:3000/payment/cancel"
                 },
-                "description": f"Order {order_id} - Green Haven Nursery"
-            }]
-        })
+                "transactions": [{
+                    "item_list": {
+                        "items": [{
+                            "name": item.name,
+                            "sku": item.sku or f"item-{uuid.uuid4()}",
+                            "price": f"{item.unit_amount:.2f}",
+                            "currency": order_request.currency,
+                            "quantity": item.quantity
+                        } for item in order_request.items]
+                    },
+                    "amount": {
+                        "total": f"{order_request.total_amount:.2f}",
+                        "currency": order_request.currency
+                    },
+                    "description": f"Order {order_id} - Green Haven Nursery"
+                }]
+            }, request_id=f"create-{order_id}")
+        except Exception:
+            await inventory.release(db, order_id)
+            await invalidate_catalog()
+            raise
         
-        if payment.create():
+        if payment.get("id"):
             # Store order in database
             paypal_order = {
                 "id": order_id,
                 "order_id": order_id,
-                "paypal_order_id": payment.id,
+                "paypal_order_id": payment["id"],
                 "customer_email": order_request.customer_email,
                 "user_id": order_request.customer_email,  # Will be improved with proper user ID
                 "total_amount": order_request.total_amount,
@@ -903,24 +1342,31 @@ async def create_paypal_order(order_request: PayPalOrderRequest):
             }
             
             await db.orders.insert_one(paypal_order)
+            await user_stats.increment(db, paypal_order["user_id"], order_count=1)
             
             # Get approval URL
-            approval_url = None
-            for link in payment.links:
-                if link.rel == "approval_url":
-                    approval_url = link.href
-                    break
+            links = payment.get("links", [])
+            approval_url = next((link["href"] for link in links if link.get("rel") == "approval_url"), None)
             
             return {
-                "id": payment.id,
+                "id": payment["id"],
                 "order_id": order_id,
                 "status": "CREATED",
                 "approval_url": approval_url,
-                "links": [{"href": link.href, "rel": link.rel, "method": link.method} for link in payment.links]
+                "links": [{"href": link.get("href"), "rel": link.get("rel"), "method": link.get("method")} for link in links]
             }
         else:
-            raise HTTPException(status_code=400, detail=f"PayPal payment creation failed: {payment.error}")
+            await inventory.release(db, order_id)
+            await invalidate_catalog()
+            raise HTTPException(status_code=400, detail=f"PayPal payment creation failed: {payment}")
             
+    except HTTPException:
+        raise
+    except InsufficientStock as e:
+        raise HTTPException(status_code=409, detail=f"Not enough stock for: {', '.join(e.plant_ids)}")
+    except PayPalError as e:
+        logging.error(f"PayPal rejected order creation: {str(e)} {e.details}")
+        raise HTTPException(status_code=400, detail=f"PayPal payment creation failed: {str(e)}")
     except Exception as e:
         logging.error(f"Error creating PayPal order: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error creating PayPal order: {str(e)}")
@@ -928,39 +1374,49 @@ async def create_paypal_order(order_request: PayPalOrderRequest):
 @app.post("/api/paypal/execute-payment")
 async def execute_paypal_payment(payment_id: str, payer_id: str):
     try:
-        # Get the payment
-        payment = Payment.find(payment_id)
+        payment = await paypal.execute_payment(payment_id, payer_id)
         
-        if payment.execute({"payer_id": payer_id}):
-            # Update order status in database
-            await db.orders.update_one(
-                {"paypal_order_id": payment_id},
+        if payment.get("state") == "approved":
+            # Only the first execute moves the order to COMPLETED. The PayPal payment id is
+            # the idempotency key, so a retried execute never repeats the side effects below.
+            order = await db.orders.find_one_and_update(
+                {"paypal_order_id": payment_id, "status": {"$ne": "COMPLETED"}},
                 {
                     "$set": {
                         "status": "COMPLETED",
                         "order_status": "processing",
                         "updated_at": datetime.utcnow(),
                         "payer_id": payer_id,
-                        "payment_details": payment.to_dict()
+                        "payment_details": payment
                     }
-                }
+                },
+                return_document=ReturnDocument.AFTER
             )
             
-            # Get order details for processing
-            order = await db.orders.find_one({"paypal_order_id": payment_id})
             if order:
+                await user_stats.increment(db, order.get("user_id"), total_spent=order.get("total_amount", 0))
                 # Process order completion - update inventory
                 await process_order_completion(order)
+            else:
+                order = await db.orders.find_one({"paypal_order_id": payment_id})
+                if order and order.get("inventory_status") == "error":
+                    # The first execute's stock commit failed; commit() is idempotent, so retry it
+                    await process_order_completion(order)
             
             return {
-                "id": payment.id,
+                "id": payment["id"],
                 "status": "COMPLETED",
                 "order_id": order["order_id"] if order else None,
-                "total_amount": payment.transactions[0].amount.total
+                "total_amount": payment["transactions"][0]["amount"]["total"]
             }
         else:
-            raise HTTPException(status_code=400, detail=f"PayPal payment execution failed: {payment.error}")
+            raise HTTPException(status_code=400, detail=f"PayPal payment execution failed: payment is {payment.get('state')}")
             
+    except HTTPException:
+        raise
+    except PayPalError as e:
+        logging.error(f"PayPal rejected payment execution: {str(e)} {e.details}")
+        raise HTTPException(status_code=400, detail=f"PayPal payment execution failed: {str(e)}")
     except Exception as e:
         logging.error(f"Error executing PayPal payment: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error executing PayPal payment: {str(e)}")
@@ -968,28 +1424,35 @@ async def execute_paypal_payment(payment_id: str, payer_id: str):
 @app.get("/api/paypal/payment/{payment_id}")
 async def get_paypal_payment(payment_id: str):
     try:
-        payment = Payment.find(payment_id)
-        return payment.to_dict()
+        return await paypal.find_payment(payment_id)
+    except PayPalError as e:
+        if e.status_code == 404:
+            raise HTTPException(status_code=404, detail="PayPal payment not found")
+        logging.error(f"Error getting PayPal payment: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Error getting PayPal payment: {str(e)}")
     except Exception as e:
         logging.error(f"Error getting PayPal payment: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting PayPal payment: {str(e)}")
 
 # Order Management endpoints
 @app.get("/api/orders")
-async def get_orders(current_user: dict = Depends(verify_token)):
+async def get_orders(
+    current_user: dict = Depends(verify_token),
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Order history, newest first.
+    
+    Without `limit`/`cursor` the newest DEFAULT_PAGE_SIZE orders are returned
+    as a list; with either, a page is returned as {items, next_cursor}. Items
+    are summaries (no payment details or item list); fetch
+    /api/orders/{order_id} for the full order.
+    """
+    paginate = limit is not None or cursor is not None
+    cursor_values = decode_cursor(cursor, ORDER_SORT) if cursor else None
     try:
-        # Get orders for current user
-        orders_cursor = db.orders.find({"user_id": current_user["user_id"]})
-        orders = await orders_cursor.to_list(length=None)
-        
-        # Convert MongoDB documents to serializable format
-        serialized_orders = []
-        for order in orders:
-            if "_id" in order:
-                order["_id"] = str(order["_id"])
-            serialized_orders.append(order)
-        
-        return serialized_orders
+        orders, next_cursor = await order_summaries(db, current_user["user_id"], limit or DEFAULT_PAGE_SIZE, cursor_values)
+        return MongoJSONResponse(page_envelope(orders, next_cursor) if paginate else orders)
     except Exception as e:
         logging.error(f"Error getting orders: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting orders: {str(e)}")
@@ -1000,15 +1463,13 @@ async def get_order(order_id: str, current_user: dict = Depends(verify_token)):
         order = await db.orders.find_one({
             "order_id": order_id,
             "user_id": current_user["user_id"]
-        })
+        }, {"_id": 0})
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
         
-        # Convert _id to string if it exists
-        if "_id" in order:
-            order["_id"] = str(order["_id"])
-        
-        return order
+        return MongoJSONResponse(order)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error getting order: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting order: {str(e)}")
@@ -1043,31 +1504,105 @@ async def update_order_status(order_id: str, status_update: OrderStatusUpdate, c
             }
         )
         
+        # Give back stock still held for an unpaid order
+        if await inventory.release(db, order_id):
+            await invalidate_catalog()
+        
         return {"message": "Order status updated successfully"}
     except Exception as e:
         logging.error(f"Error updating order status: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error updating order status: {str(e)}")
 
 # Review endpoints
-@app.get("/api/plants/{plant_id}/reviews")
-async def get_plant_reviews(plant_id: str, limit: int = 10, offset: int = 0):
+# Each review sort ends on the unique id and is backed by a (plant_id, ...) index
+# Reviews per page or list when limit is not given
+DEFAULT_REVIEW_PAGE_SIZE = 10
+REVIEW_SORT_OPTIONS = {
+    "newest": [("created_at", -1), ("id", -1)],
+    "most_helpful": [("helpful_count", -1), ("created_at", -1), ("id", -1)],
+    "rating": [("rating", -1), ("created_at", -1), ("id", -1)],
+}
+
+@app.get("/api/plants/{plant_id}/reviews", dependencies=[Depends(shed_when_degraded)])
+async def get_plant_reviews(
+    plant_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_REVIEW_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = None,
+    sort_by: str = "newest",  # newest, most_helpful, rating
+    paginate: bool = False,
+    offset: int = Query(0, ge=0)
+):
+    """Reviews of a plant in sort_by order.
+    
+    By default the first `limit` reviews are returned as a list, as before
+    cursor pagination existed. With `paginate=true` or a `cursor`, a page is
+    returned as {items, next_cursor, rating_histogram, average_rating,
+    total_reviews}. The old `offset` is rejected rather than ignored: deep
+    pages are reached by following next_cursor.
+    
+    The rating summary comes from the plant's incrementally kept rating state,
+    read alongside the page, so no aggregation over reviews is needed. A plant
+    the reconciler has not initialised yet is reconciled on the spot, and an
+    unknown plant gets an all-zero histogram, so rating_histogram is never null.
+    """
+    if offset:
+        raise HTTPException(status_code=400, detail="offset is no longer supported; pass paginate=true and follow next_cursor")
+    not_modified = catalog_not_modified(request)
+    if not_modified:
+        return not_modified
+    headers = catalog_headers()
+    sort = REVIEW_SORT_OPTIONS.get(sort_by)
+    if sort is None:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of: {', '.join(REVIEW_SORT_OPTIONS)}")
+    paginate = paginate or cursor is not None
+    query = {"plant_id": plant_id}
+    if cursor:
+        query = merge_filters(query, keyset_filter(sort, decode_cursor(cursor, sort)))
     try:
-        reviews_cursor = db.reviews.find({"plant_id": plant_id}).skip(offset).limit(limit).sort("created_at", -1)
-        reviews = await reviews_cursor.to_list(length=None)
+        if not paginate:
+            reviews = await db.reviews.find(query, {"_id": 0}).sort(sort).limit(limit).to_list(length=limit)
+            return MongoJSONResponse(reviews, headers=headers)
         
-        serialized_reviews = []
-        for review in reviews:
-            if "_id" in review:
-                review["_id"] = str(review["_id"])
-            serialized_reviews.append(review)
+        reviews, plant = await asyncio.gather(
+            db.reviews.find(query, {"_id": 0}).sort(sort).limit(limit + 1).to_list(length=limit + 1),
+            db.plants.find_one(
+                {"id": plant_id},
+                {"_id": 0, "rating_histogram": 1, "average_rating": 1, "total_reviews": 1}
+            )
+        )
+        next_cursor = None
+        if len(reviews) > limit:
+            reviews = reviews[:limit]
+            next_cursor = encode_cursor(reviews[-1], sort)
         
-        return serialized_reviews
+        if plant and "rating_histogram" not in plant:
+            # Not initialised by the reconciler yet: build the state now rather than answer without it
+            if await reconcile_ratings(db, plant_id=plant_id):
+                await invalidate_catalog()
+                headers = catalog_headers()
+            plant = await db.plants.find_one(
+                {"id": plant_id},
+                {"_id": 0, "rating_histogram": 1, "average_rating": 1, "total_reviews": 1}
+            )
+        
+        plant = plant or {}
+        return MongoJSONResponse(page_envelope(
+            reviews,
+            next_cursor,
+            rating_histogram=plant.get("rating_histogram") or empty_histogram(),
+            average_rating=plant.get("average_rating", 0.0),
+            total_reviews=plant.get("total_reviews", 0)
+        ), headers=headers)
     except Exception as e:
         logging.error(f"Error getting reviews: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting reviews: {str(e)}")
 
 @app.post("/api/plants/{plant_id}/reviews")
 async def create_review(plant_id: str, review_data: ReviewCreate, current_user: dict = Depends(verify_token)):
+    if review_data.rating < 1 or review_data.rating > 5:
+        raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
+    
     try:
         # Check if user has already reviewed this plant
         existing_review = await db.reviews.find_one({
@@ -1078,7 +1613,7 @@ async def create_review(plant_id: str, review_data: ReviewCreate, current_user:
             raise HTTPException(status_code=400, detail="You have already reviewed this plant")
         
         # Get user info
-        user = await db.users.find_one({"id": current_user["user_id"]})
+        user = await authenticator.users.get(db, current_user["user_id"])
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -1096,56 +1631,86 @@ async def create_review(plant_id: str, review_data: ReviewCreate, current_user:
         }
         
         await db.reviews.insert_one(review)
+        await user_stats.increment(db, current_user["user_id"], review_count=1)
         
         # Update plant's average rating
-        await update_plant_rating(plant_id)
+        await update_plant_rating(plant_id, review_data.rating)
         
         return {"message": "Review created successfully", "review_id": review_id}
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error creating review: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error creating review: {str(e)}")
 
-async def update_plant_rating(plant_id: str):
-    """Update plant's average rating and review count"""
+async def update_plant_rating(plant_id: str, rating: int):
+    """Fold a new review into the plant's average rating and review count"""
     try:
-        # Get all reviews for this plant
-        reviews = await db.reviews.find({"plant_id": plant_id}).to_list(length=None)
-        
-        if reviews:
-            total_rating = sum(review["rating"] for review in reviews)
-            average_rating = total_rating / len(reviews)
-            
-            await db.plants.update_one(
-                {"id": plant_id},
-                {
-                    "$set": {
-                        "average_rating": round(average_rating, 1),
-                        "total_reviews": len(reviews)
-                    }
-                }
-            )
+        await record_review_rating(db, plant_id, rating)
     except Exception as e:
         logging.error(f"Error updating plant rating: {str(e)}")
+    # The review itself is new either way, so cached review pages are stale too
+    await invalidate_catalog()
 
 # Wishlist endpoints
-@app.get("/api/wishlist")
-async def get_wishlist(current_user: dict = Depends(verify_token)):
+# Wishlist entries come back as the plant's listing fields plus plant_id and added_at
+WISHLIST_PLANT_FIELDS = ("id", "name", "price", "image_url", "category", "stock_quantity", "average_rating", "total_reviews", "weight")
+WISHLIST_SORT = [("created_at", 1), ("plant_id", 1)]
+
+@app.get("/api/wishlist", dependencies=[Depends(shed_when_degraded)])
+async def get_wishlist(
+    current_user: dict = Depends(verify_token),
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Wishlist in the order plants were added.
+    
+    Without `limit`/`cursor` the whole wishlist is returned as a list; with
+    either, a page is returned as {items, next_cursor, total}.
+    """
+    paginate = limit is not None or cursor is not None
+    page_size = limit or DEFAULT_PAGE_SIZE
+    match = {"user_id": current_user["user_id"]}
+    if cursor:
+        match = merge_filters(match, keyset_filter(WISHLIST_SORT, decode_cursor(cursor, WISHLIST_SORT)))
+    
     try:
-        wishlist_cursor = db.wishlist.find({"user_id": current_user["user_id"]})
-        wishlist_items = await wishlist_cursor.to_list(length=None)
-        
-        # Get plant details for wishlist items
-        plant_ids = [item["plant_id"] for item in wishlist_items]
-        plants = await db.plants.find({"id": {"$in": plant_ids}}).to_list(length=None)
+        # One round trip: wishlist entries in insertion order joined with their plants
+        pipeline = [
+            {"$match": match},
+            {"$sort": dict(WISHLIST_SORT)},
+        ]
+        if paginate:
+            pipeline.append({"$limit": page_size + 1})
+        pipeline += [
+            {"$lookup": {"from": "plants", "localField": "plant_id", "foreignField": "id", "as": "plant"}},
+            {"$project": {
+                "_id": 0,
+                "plant_id": 1,
+                "created_at": 1,
+                **{f"plant.{field}": 1 for field in WISHLIST_PLANT_FIELDS}
+            }},
+            {"$unwind": {"path": "$plant", "preserveNullAndEmptyArrays": True}}
+        ]
+        if paginate:
+            entries, total = await asyncio.gather(
+                db.wishlist.aggregate(pipeline).to_list(length=page_size + 1),
+                db.wishlist.count_documents({"user_id": current_user["user_id"]})
+            )
+        else:
+            entries = await db.wishlist.aggregate(pipeline).to_list(length=None)
         
-        # Convert to serializable format
-        serialized_plants = []
-        for plant in plants:
-            if "_id" in plant:
-                plant["_id"] = str(plant["_id"])
-            serialized_plants.append(plant)
+        next_cursor = None
+        if paginate and len(entries) > page_size:
+            entries = entries[:page_size]
+            next_cursor = encode_cursor(entries[-1], WISHLIST_SORT)
         
-        return serialized_plants
+        # Entries whose plant has since been removed from the catalog are skipped
+        items = [
+            {**entry["plant"], "plant_id": entry["plant_id"], "added_at": entry.get("created_at")}
+            for entry in entries if entry.get("plant")
+        ]
+        return MongoJSONResponse(page_envelope(items, next_cursor, total) if paginate else items)
     except Exception as e:
         logging.error(f"Error getting wishlist: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting wishlist: {str(e)}")
@@ -1153,23 +1718,28 @@ async def get_wishlist(current_user: dict = Depends(verify_token)):
 @app.post("/api/wishlist/{plant_id}")
 async def add_to_wishlist(plant_id: str, current_user: dict = Depends(verify_token)):
     try:
-        # Check if already in wishlist
-        existing_item = await db.wishlist.find_one({
-            "user_id": current_user["user_id"],
-            "plant_id": plant_id
-        })
-        if existing_item:
+        # Single upsert on the unique (user_id, plant_id) index: a double click adds the plant once
+        try:
+            result = await db.wishlist.update_one(
+                {"user_id": current_user["user_id"], "plant_id": plant_id},
+                {"$setOnInsert": {
+                    "user_id": current_user["user_id"],
+                    "plant_id": plant_id,
+                    "created_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+            added = result.upserted_id is not None
+        except DuplicateKeyError:
+            # A concurrent upsert for the same pair won the race
+            added = False
+        if not added:
             raise HTTPException(status_code=400, detail="Plant already in wishlist")
         
-        # Add to wishlist
-        wishlist_item = {
-            "user_id": current_user["user_id"],
-            "plant_id": plant_id,
-            "created_at": datetime.utcnow()
-        }
-        
-        await db.wishlist.insert_one(wishlist_item)
+        await user_stats.increment(db, current_user["user_id"], wishlist_count=1)
         return {"message": "Plant added to wishlist"}
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error adding to wishlist: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error adding to wishlist: {str(e)}")
@@ -1184,8 +1754,11 @@ async def remove_from_wishlist(plant_id: str, current_user: dict = Depends(verif
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Plant not found in wishlist")
+        await user_stats.increment(db, current_user["user_id"], wishlist_count=-1)
         
         return {"message": "Plant removed from wishlist"}
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error removing from wishlist: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error removing from wishlist: {str(e)}")
@@ -1193,14 +1766,15 @@ async def remove_from_wishlist(plant_id: str, current_user: dict = Depends(verif
 async def process_order_completion(order):
     """Process order completion - update inventory, send notifications, etc."""
     try:
-        # Update plant inventory
-        for item in order["items"]:
-            plant_id = item.get("sku", "").replace("plant_", "")
-            if plant_id:
-                await db.plants.update_one(
-                    {"id": plant_id},
-                    {"$inc": {"stock_quantity": -item["quantity"]}}
-                )
+        # Update plant inventory (order item skus are plant ids)
+        shortfall = await inventory.commit(db, order["order_id"], order_lines(order["items"]))
+        await invalidate_catalog()
+        if shortfall:
+            logging.error(f"Order {order['order_id']} oversold: {', '.join(shortfall)}")
+        await db.orders.update_one(
+            {"order_id": order["order_id"]},
+            {"$set": {"inventory_status": "shortfall" if shortfall else "committed", "inventory_shortfall": shortfall}}
+        )
         
         # Here you could add:
         # - Send confirmation email
@@ -1211,20 +1785,48 @@ async def process_order_completion(order):
         logging.info(f"Order {order['order_id']} processed successfully")
         
     except Exception as e:
-        logging.error(f"Error processing order completion: {str(e)}")
-        # Don't raise exception here to avoid breaking the payment flow
+        logging.exception(f"Error processing order completion for {order.get('order_id')}: {str(e)}")
+        # Don't raise exception here to avoid breaking the payment flow; flag the order for follow-up
+        await db.orders.update_one({"order_id": order.get("order_id")}, {"$set": {"inventory_status": "error"}})
 
-@app.post("/api/admin/reset-plants")
-async def reset_plants(request: Request):
+def verify_admin_token(request: Request):
     # Simple admin protection (use a header 'x-admin-token')
     admin_token = os.environ.get("ADMIN_RESET_TOKEN", "changeme")
     req_token = request.headers.get("x-admin-token")
     if req_token != admin_token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+
+@app.post("/api/admin/reset-plants")
+async def reset_plants(request: Request):
+    verify_admin_token(request)
     await db.plants.delete_many({})
     await db.plants.insert_many(SAMPLE_PLANTS)
+    await invalidate_catalog(text_changed=True)
     return {"message": "Plants collection reset and re-initialized with sample data."}
 
+@app.get("/api/admin/cache-stats")
+async def get_cache_stats(request: Request):
+    """Catalog cache hit/miss counters for this worker"""
+    verify_admin_token(request)
+    return {
+        "catalog": catalog_cache.stats(),
+        "search_index": {"documents": plant_index.document_count, "rebuilds": plant_index.rebuilds, "stale": plant_index.is_stale},
+        "discounts": discount_table.stats(),
+        "auth": authenticator.stats(),
+        "logging": log_pipeline.stats(),
+        "pid": os.getpid()
+    }
+
+@app.get("/api/admin/diagnostics")
+async def get_diagnostics(request: Request):
+    """Recent event-loop stalls and slow-request profiles for this worker (when enabled)"""
+    verify_admin_token(request)
+    return {
+        "loop_blocks": loop_block_detector.stats() if loop_block_detector else None,
+        "slow_requests": slow_request_profiler.stats() if slow_request_profiler else None,
+        "pid": os.getpid()
+    }
+
 # Additional user management endpoints
 @app.post("/api/forgot-password")
 async def forgot_password(email: str):
@@ -1260,11 +1862,11 @@ async def change_password(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verify current password
-    if not verify_password(current_password, user["password_hash"]):
+    if not await verify_password(current_password, user["password_hash"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Hash new password
-    new_password_hash = hash_password(new_password)
+    new_password_hash = await hash_password(new_password)
     
     # Update password
     await db.users.update_one(
@@ -1275,36 +1877,26 @@ async def change_password(
     logging.info(f"Password changed for user: {user['email']}")
     return {"message": "Password changed successfully"}
 
-@app.get("/api/user/stats")
+@app.get("/api/user/stats", dependencies=[Depends(shed_when_degraded)])
 async def get_user_stats(current_user: dict = Depends(verify_token)):
     """Get user statistics (orders, reviews, etc.)"""
-    user_id = current_user["user_id"]
-    
-    # Count orders
-    order_count = await db.orders.count_documents({"user_id": user_id})
-    
-    # Count reviews
-    review_count = await db.reviews.count_documents({"user_id": user_id})
-    
-    # Count wishlist items
-    wishlist_count = await db.wishlist.count_documents({"user_id": user_id})
-    
-    # Get total spent
-    orders = await db.orders.find({"user_id": user_id, "status": "COMPLETED"}).to_list(length=None)
-    total_spent = sum(order.get("total_amount", 0) for order in orders)
+    stats, user = await asyncio.gather(
+        user_stats.get(db, current_user["user_id"]),
+        authenticator.users.get(db, current_user["user_id"])
+    )
     
     return {
-        "order_count": order_count,
-        "review_count": review_count,
-        "wishlist_count": wishlist_count,
-        "total_spent": round(total_spent, 2),
-        "member_since": current_user.get("created_at")
+        "order_count": stats["order_count"],
+        "review_count": stats["review_count"],
+        "wishlist_count": stats["wishlist_count"],
+        "total_spent": round(stats["total_spent"], 2),
+        "member_since": user.get("created_at") if user else None
     }
 
 @app.delete("/api/user/deactivate")
 async def deactivate_account(current_user: dict = Depends(verify_token)):
     """Deactivate user account"""
-    user = await db.users.find_one({"id": current_user["user_id"]})
+    user = await authenticator.users.get(db, current_user["user_id"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -1313,16 +1905,19 @@ async def deactivate_account(current_user: dict = Depends(verify_token)):
         {"id": current_user["user_id"]},
         {"$set": {"is_active": False, "deactivated_at": datetime.utcnow()}}
     )
+    # Every token issued to this user so far stops working
+    await authenticator.revoke_user(db, current_user["user_id"])
     
     logging.info(f"Account deactivated for user: {user['email']}")
     return {"message": "Account deactivated successfully"}
 
 @app.post("/api/logout")
-async def logout(current_user: dict = Depends(verify_token)):
-    """Logout user (invalidate token on frontend)"""
-    # In a real implementation, you might want to:
-    # 1. Add token to blacklist
-    # 2. Update last logout time
+async def logout(
+    current_user: dict = Depends(verify_token),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Logout user (the token is revoked server-side as well as dropped by the frontend)"""
+    await authenticator.revoke_token(db, credentials.credentials, current_user)
     
     logging.info(f"User logged out: {current_user['email']}")
     return {"message": "Logged out successfully"}
@@ -1346,12 +1941,38 @@ def root():
 
 @app.get("/health")
 def health_check():
+    # Liveness: deliberately independent of Mongo, restarting the worker would not bring it back
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
         "service": "Green Haven Nursery API"
     }
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return Response(content=app_metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/ready")
+async def readiness_check():
+    """Whether this worker should get traffic: startup finished and Mongo answering.
+    
+    Reads the health snapshot kept by the background monitor, so probes add no
+    load; degraded still counts as ready since critical routes keep working.
+    """
+    state = startup_state.stats()
+    if not startup_state.ready:
+        return MongoJSONResponse(
+            {"status": "failed" if startup_state.error else "starting", **state},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "1"}
+        )
+    health = await health_monitor.current(db, paypal)
+    body = {**state, **health, "ready": health["status"] != "down"}
+    if health["status"] == "down":
+        return MongoJSONResponse(body, status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+    return body
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
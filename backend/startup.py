@@ -0,0 +1,120 @@
+"""Startup seeding and readiness.
+
+Every uvicorn worker runs the startup hook, so on a first boot with
+--workers N they all find empty collections at the same moment. Seeding is
+therefore done with upserts keyed on each document's unique field
+($setOnInsert): the first worker inserts, the rest match and write nothing, and
+if two upserts still race the unique index rejects the second insert, which is
+ignored. No lock is needed, but the unique index is: a collection whose unique
+index could not be built is not seeded. Seeding only runs on an empty
+collection, so one left half-seeded (a worker died mid-write) is not completed
+on later boots; empty it, or use /api/admin/reset-plants for plants.
+
+StartupState records when this worker's process was launched, when startup
+finished and when the first response went out, which is what /ready reports.
+"""
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY = 11000
+
+
+async def is_empty(db, collection_name: str) -> bool:
+    """Cheaper than count_documents({}): stops at the first document"""
+    return await db[collection_name].find_one({}, {"_id": 1}) is None
+
+
+async def seed(db, collection_name: str, documents: Iterable[Dict[str, Any]], key: str = "id") -> int:
+    """Insert whichever documents are missing (matched on key); returns how many were inserted"""
+    operations = [
+        UpdateOne(
+            {key: document[key]},
+            # _id is left out: insert_many elsewhere may have stamped one on the shared dict
+            {"$setOnInsert": {field: value for field, value in document.items() if field != "_id"}},
+            upsert=True
+        )
+        for document in documents
+    ]
+    if not operations:
+        return 0
+    try:
+        result = await db[collection_name].bulk_write(operations, ordered=False)
+        return result.upserted_count
+    except BulkWriteError as e:
+        # Another worker inserted the same documents between our match and insert
+        if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nUpserted", 0)
+
+
+def process_started_monotonic() -> float:
+    """time.monotonic() at process launch, read from /proc; falls back to now elsewhere"""
+    try:
+        with open("/proc/self/stat") as stat:
+            # Fields after the parenthesised command name start at field 3 (state); starttime is field 22
+            start_ticks = int(stat.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as uptime:
+            uptime_seconds = float(uptime.read().split()[0])
+        return time.monotonic() - (uptime_seconds - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.monotonic()
+
+
+class StartupState:
+    def __init__(self):
+        self.launched_at = process_started_monotonic()
+        self.ready_at: Optional[float] = None
+        self.first_response_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def mark_ready(self) -> float:
+        """Record that startup finished; returns seconds since launch"""
+        self.ready_at = time.monotonic()
+        return self.ready_at - self.launched_at
+
+    def mark_failed(self, error: Exception):
+        self.error = str(error)
+
+    def _since_launch(self, at: Optional[float]) -> Optional[float]:
+        return round(at - self.launched_at, 3) if at is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "startup_seconds": self._since_launch(self.ready_at),
+            "first_response_seconds": self._since_launch(self.first_response_at),
+            "error": self.error,
+            "pid": os.getpid()
+        }
+
+
+class FirstResponseTimer:
+    """ASGI middleware that stamps StartupState.first_response_at once, then gets out of the way"""
+
+    def __init__(self, app, state: StartupState):
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope, receive, send):
+        if self.state.first_response_at is not None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            await send(message)
+            if (
+                message["type"] == "http.response.body"
+                and not message.get("more_body", False)
+                and self.state.first_response_at is None
+            ):
+                self.state.first_response_at = time.monotonic()
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,207 @@
+"""Structured, non-blocking logging.
+
+LogPipeline points the root logger at a QueueHandler. A QueueListener thread
+formats records (JSON lines by default) and writes them to stderr, so a slow
+stdout or disk stalls that thread and never the event loop. When the queue is
+full, records are dropped and counted instead of waited on.
+
+Every record carries the id and route template of the request that logged it.
+AccessLogMiddleware puts both in contextvars, and the route is read from the
+scope at log time, once FastAPI has matched it. The middleware also writes
+one access record per request and echoes the id back in X-Request-ID. Errors
+and slow requests are always logged. Other successes are sampled per route,
+so the catalog's hot paths do not flood the logs. The decision is made before
+a record is created, so unsampled requests cost one random() call.
+
+uvicorn's own loggers are routed through the same queue. Its access log is
+switched off because the middleware replaces it.
+"""
+import contextvars
+import logging
+import queue
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+import orjson
+
+access_logger = logging.getLogger("access")
+
+_request_id: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+_request_scope: contextvars.ContextVar = contextvars.ContextVar("request_scope", default=None)
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "request_id", "route"}
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+_exception_formatter = logging.Formatter()
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def current_route() -> Optional[str]:
+    scope = _request_scope.get()
+    return getattr(scope.get("route"), "path", None) if scope else None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "route": getattr(record, "route", None),
+            "pid": record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s %(route)s] %(name)s: %(message)s")
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, maxsize: int):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Runs on the logging thread: capture what only it knows, leave formatting to the listener
+        record.request_id = _request_id.get()
+        record.route = current_route()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks cannot cross threads as frames, so they are rendered here
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    def __init__(self, level: str = "INFO", fmt: str = "json", queue_size: int = 10000, stream=None):
+        self.level = level.upper()
+        self.handler = NonBlockingQueueHandler(queue_size)
+        output = logging.StreamHandler(stream)  # stderr by default
+        output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+        self.listener = QueueListener(self.handler.queue, output, respect_handler_level=True)
+        self.running = False
+
+    def start(self):
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        for name in ("uvicorn", "uvicorn.error"):
+            uvicorn_logger = logging.getLogger(name)
+            uvicorn_logger.handlers.clear()
+            uvicorn_logger.propagate = True
+        logging.getLogger("uvicorn.access").disabled = True
+        self.listener.start()
+        self.running = True
+
+    def stop(self):
+        """Flush whatever is queued and stop the listener thread"""
+        if self.running:
+            self.listener.stop()
+            self.running = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"level": self.level, "queued": self.handler.queue.qsize(), "dropped": self.handler.dropped}
+
+
+class AccessLogMiddleware:
+    def __init__(
+        self,
+        app,
+        sample_rate: float = 1.0,
+        route_sample_rates: Optional[Dict[str, float]] = None,
+        slow_request_ms: float = 1000.0
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.route_sample_rates = route_sample_rates or {}
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                # Keep a caller's id (e.g. from nginx) only if it is safe to echo and log
+                candidate = value.decode("latin-1")
+                request_id = candidate if _REQUEST_ID.match(candidate) else None
+                break
+        request_id = request_id or uuid.uuid4().hex
+        id_token = _request_id.set(request_id)
+        scope_token = _request_scope.set(scope)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._log(scope, status_code, (time.perf_counter() - started) * 1000)
+            _request_scope.reset(scope_token)
+            _request_id.reset(id_token)
+
+    def _log(self, scope, status_code: int, duration_ms: float):
+        route = current_route() or "unmatched"
+        sample_rate = 1.0
+        if status_code >= 500:
+            level = logging.WARNING
+        elif status_code >= 400 or duration_ms >= self.slow_request_ms:
+            level = logging.INFO
+        else:
+            level = logging.INFO
+            sample_rate = self.route_sample_rates.get(route, self.sample_rate)
+            if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+                return
+        if not access_logger.isEnabledFor(level):
+            return
+        access_logger.log(level, f"{scope['method']} {route} {status_code} {duration_ms:.1f}ms", extra={
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": round(duration_ms, 2),
+            "sample_rate": sample_rate
+        })
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "/api/plants=0.01,/health=0" into {route template: sample rate}"""
+    rates = {}
+    for part in spec.split(","):
+        route, _, rate = part.strip().rpartition("=")
+        if route:
+            rates[route] = float(rate)
+    return rates
@@ -0,0 +1,69 @@
+"""Per-user profile statistics.
+
+compute_user_stats() gets the counts with server-side aggregation: one pass
+over the user's orders for the order count and total spent, plus the review
+and wishlist counts, all issued concurrently.
+
+With materialisation enabled, UserStatsStore keeps the result in a user_stats
+document that order/review/wishlist writes $inc in place, so the profile page
+is a single primary-key read however long the user's history is. The document
+is created from compute_user_stats() on first read and rebuilt once it is
+older than max_age_seconds, which bounds any drift from missed increments.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+STAT_FIELDS = ("order_count", "review_count", "wishlist_count", "total_spent")
+
+
+async def compute_user_stats(db, user_id: str) -> Dict[str, Any]:
+    orders_pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {
+            "_id": None,
+            "order_count": {"$sum": 1},
+            "total_spent": {"$sum": {"$cond": [
+                {"$eq": ["$status", "COMPLETED"]}, {"$ifNull": ["$total_amount", 0]}, 0
+            ]}}
+        }}
+    ]
+    order_rows, review_count, wishlist_count = await asyncio.gather(
+        db.orders.aggregate(orders_pipeline).to_list(length=1),
+        db.reviews.count_documents({"user_id": user_id}),
+        db.wishlist.count_documents({"user_id": user_id})
+    )
+    orders = order_rows[0] if order_rows else {}
+    return {
+        "order_count": orders.get("order_count", 0),
+        "review_count": review_count,
+        "wishlist_count": wishlist_count,
+        "total_spent": orders.get("total_spent", 0),
+    }
+
+
+class UserStatsStore:
+    def __init__(self, enabled: bool = False, max_age_seconds: float = 86400):
+        self.enabled = enabled
+        self.max_age_seconds = max_age_seconds
+
+    async def get(self, db, user_id: str) -> Dict[str, Any]:
+        if not self.enabled:
+            return await compute_user_stats(db, user_id)
+        cutoff = datetime.utcnow() - timedelta(seconds=self.max_age_seconds)
+        stats = await db.user_stats.find_one({"user_id": user_id, "refreshed_at": {"$gte": cutoff}})
+        if stats:
+            return {field: stats.get(field, 0) for field in STAT_FIELDS}
+        stats = await compute_user_stats(db, user_id)
+        await db.user_stats.update_one(
+            {"user_id": user_id},
+            {"$set": {**stats, "refreshed_at": datetime.utcnow()}},
+            upsert=True
+        )
+        return stats
+
+    async def increment(self, db, user_id: str, **deltas) -> None:
+        """Apply write-side deltas; a user without a stats document is left for the next read to build"""
+        if not self.enabled or not user_id:
+            return
+        await db.user_stats.update_one({"user_id": user_id}, {"$inc": deltas})
@@ -249,6 +249,46 @@ class NurseryAPITester(unittest.TestCase):
             self.assertEqual(plant["category"], "houseplant", "Plant category doesn't match filter")
         print(f"✅ Category + search filtering works - found {len(plants)} houseplants")
 
+        # Test search ranking puts name matches first
+        response = requests.get(f"{self.base_url}/api/plants?search=herb")
+        self.assertEqual(response.status_code, 200, "Search failed")
+        plants = response.json()
+        self.assertGreater(len(plants), 0, "Search for 'herb' should match plants")
+        self.assertIn("herb", plants[0]["name"].lower(), "Best search match should have the term in its name")
+        print(f"✅ Search ranking works - top match for 'herb' is {plants[0]['name']}")
+
+        # Test regex metacharacters in search are treated as plain text
+        response = requests.get(f"{self.base_url}/api/plants", params={"search": "(.*)+$"})
+        self.assertEqual(response.status_code, 200, "Search with metacharacters failed")
+        print(f"✅ Search with regex metacharacters handled safely")
+
+        # Test typeahead suggestions match on prefix
+        response = requests.get(f"{self.base_url}/api/plants/suggest", params={"q": "mon"})
+        self.assertEqual(response.status_code, 200, "Typeahead suggestions failed")
+        suggestions = response.json()
+        self.assertTrue(any(s["id"] == "plant_001" for s in suggestions), "Prefix 'mon' should suggest Monstera")
+        print(f"✅ Typeahead works - {len(suggestions)} suggestions for 'mon'")
+
+        # Test cursor pagination walks the same plants as the full listing
+        full_ids = [p["id"] for p in requests.get(f"{self.base_url}/api/plants?sort_by=price_asc").json()]
+        paged_ids, cursor = [], None
+        while True:
+            params = {"sort_by": "price_asc", "limit": 5, "fields": "id,name,price"}
+            if cursor:
+                params["cursor"] = cursor
+            response = requests.get(f"{self.base_url}/api/plants", params=params)
+            self.assertEqual(response.status_code, 200, "Paginated plant listing failed")
+            page = response.json()
+            self.assertEqual(page["total"], len(full_ids), "Page total doesn't match catalog size")
+            for plant in page["items"]:
+                self.assertEqual(set(plant), {"id", "name", "price"}, "Field projection not applied")
+            paged_ids.extend(p["id"] for p in page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(paged_ids, full_ids, "Cursor pages don't match the full listing")
+        print(f"✅ Cursor pagination works - {len(paged_ids)} plants across pages")
+
     def test_10_user_profile_management(self):
         """Test user profile management API - Phase 3"""
         print("\n🔍 Testing User Profile Management...")
@@ -340,11 +380,22 @@ class NurseryAPITester(unittest.TestCase):
             self.test_11_paypal_order_creation()
         
         # Test GET orders (user's order history)
+        response = requests.get(f"{self.base_url}/api/orders?limit=5", headers=headers)
+        self.assertEqual(response.status_code, 200, f"Failed to get orders: {response.text}")
+        page = response.json()
+        self.assertIsInstance(page["items"], list, "Orders page should contain a list of items")
+        self.assertIn("next_cursor", page, "Orders page should contain next_cursor")
+        self.assertLessEqual(len(page["items"]), 5, "Orders page should respect limit")
+        for summary in page["items"]:
+            self.assertNotIn("payment_details", summary, "Order summaries should not carry payment details")
+            self.assertIn("item_count", summary, "Order summaries should carry item_count")
+        print(f"✅ Successfully retrieved {len(page['items'])} orders")
+        
+        # Without limit/cursor the history stays a plain list
         response = requests.get(f"{self.base_url}/api/orders", headers=headers)
         self.assertEqual(response.status_code, 200, f"Failed to get orders: {response.text}")
-        orders = response.json()
-        self.assertIsInstance(orders, list, "Orders response should be a list")
-        print(f"✅ Successfully retrieved {len(orders)} orders")
+        self.assertIsInstance(response.json(), list, "Unpaginated orders should be a list")
+        self.assertLessEqual(len(response.json()), 20, "Unpaginated orders should be capped at one default page")
         
         # Test GET specific order
         if self.test_order_id:
@@ -375,10 +426,10 @@ class NurseryAPITester(unittest.TestCase):
         headers = self.get_auth_headers()
         
         # Test GET plant reviews
-        response = requests.get(f"{self.base_url}/api/plants/{self.test_plant_id}/reviews")
+        response = requests.get(f"{self.base_url}/api/plants/{self.test_plant_id}/reviews?limit=100&paginate=true")
         self.assertEqual(response.status_code, 200, f"Failed to get reviews: {response.text}")
-        reviews = response.json()
-        self.assertIsInstance(reviews, list, "Reviews response should be a list")
+        reviews = response.json()["items"]
+        self.assertIsInstance(reviews, list, "Reviews page should contain a list of items")
         print(f"✅ Successfully retrieved {len(reviews)} reviews for plant {self.test_plant_id}")
         
         # Test POST create review
@@ -399,10 +450,13 @@ class NurseryAPITester(unittest.TestCase):
         print(f"✅ Successfully created review: {self.test_review_id}")
         
         # Verify the review was added
-        response = requests.get(f"{self.base_url}/api/plants/{self.test_plant_id}/reviews")
+        response = requests.get(f"{self.base_url}/api/plants/{self.test_plant_id}/reviews?limit=100&paginate=true")
         self.assertEqual(response.status_code, 200, "Failed to get updated reviews")
-        updated_reviews = response.json()
+        updated_page = response.json()
+        updated_reviews = updated_page["items"]
         self.assertGreater(len(updated_reviews), len(reviews), "Review count should have increased")
+        self.assertEqual(updated_reviews[0].get("id"), self.test_review_id, "Newest review should come first")
+        self.assertIsNotNone(updated_page["rating_histogram"], "Reviewed plant should carry a rating histogram")
         
         # Find our review
         our_review = None
@@ -421,6 +475,23 @@ class NurseryAPITester(unittest.TestCase):
                                json=review_data, headers=headers)
         self.assertEqual(response.status_code, 400, "Duplicate review should be rejected")
         print(f"✅ Duplicate review prevention works")
+        
+        # Test cursor pagination under every sort
+        for sort_by in ("newest", "most_helpful", "rating"):
+            seen = []
+            cursor = None
+            while True:
+                url = f"{self.base_url}/api/plants/{self.test_plant_id}/reviews?limit=1&sort_by={sort_by}&paginate=true"
+                response = requests.get(url + (f"&cursor={cursor}" if cursor else ""))
+                self.assertEqual(response.status_code, 200, f"Failed to page reviews by {sort_by}: {response.text}")
+                page = response.json()
+                seen.extend(review["id"] for review in page["items"])
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+            self.assertEqual(len(seen), len(set(seen)), f"Review pages sorted by {sort_by} should not repeat")
+            self.assertEqual(len(seen), len(updated_reviews), f"Review pages sorted by {sort_by} should cover every review")
+        print(f"✅ Review pagination works for every sort")
 
     def test_14_wishlist_functionality(self):
         """Test wishlist functionality - Phase 4"""
@@ -458,8 +529,18 @@ class NurseryAPITester(unittest.TestCase):
                 break
         
         self.assertTrue(plant_found, "Plant should be in wishlist")
+        self.assertEqual(updated_wishlist[-1]["plant_id"], self.test_plant_id, "Newest wishlist entry should come last")
+        self.assertIn("added_at", updated_wishlist[-1], "Wishlist entries should carry added_at")
         print(f"✅ Wishlist addition verified")
-        
+
+        # Test paginated wishlist
+        response = requests.get(f"{self.base_url}/api/wishlist?limit=1", headers=headers)
+        self.assertEqual(response.status_code, 200, f"Failed to get wishlist page: {response.text}")
+        page = response.json()
+        self.assertEqual(len(page["items"]), 1, "Wishlist page should respect limit")
+        self.assertEqual(page["total"], initial_count + 1, "Wishlist page total should count every entry")
+        print(f"✅ Wishlist pagination works")
+
         # Test duplicate addition prevention
         response = requests.post(f"{self.base_url}/api/wishlist/{self.test_plant_id}", headers=headers)
         self.assertEqual(response.status_code, 400, "Duplicate wishlist item should be rejected")
@@ -561,21 +642,21 @@ class NurseryAPITester(unittest.TestCase):
         plant_before = plant_response.json()
         
         # Get reviews to verify rating calculation
-        reviews_response = requests.get(f"{self.base_url}/api/plants/{self.test_plant_id}/reviews")
+        reviews_response = requests.get(f"{self.base_url}/api/plants/{self.test_plant_id}/reviews?limit=1&paginate=true")
         self.assertEqual(reviews_response.status_code, 200, "Failed to get reviews")
-        reviews = reviews_response.json()
+        histogram = reviews_response.json()["rating_histogram"]
         
-        if reviews:
-            # Calculate expected average rating
-            total_rating = sum(review["rating"] for review in reviews)
-            expected_avg = total_rating / len(reviews)
+        review_count = sum(histogram.values())
+        if review_count:
+            # Calculate expected average rating from the per-star counts
+            expected_avg = sum(int(star) * count for star, count in histogram.items()) / review_count
             
             # Allow for small floating point differences
             self.assertAlmostEqual(plant_before["average_rating"], expected_avg, places=1,
                                  msg="Plant average rating calculation is incorrect")
-            self.assertEqual(plant_before["total_reviews"], len(reviews),
+            self.assertEqual(plant_before["total_reviews"], review_count,
                            "Plant total reviews count is incorrect")
-            print(f"✅ Rating calculation verified: {plant_before['average_rating']} avg from {len(reviews)} reviews")
+            print(f"✅ Rating calculation verified: {plant_before['average_rating']} avg from {review_count} reviews")
         
         # Test order total calculation accuracy
         order_data = {
@@ -609,6 +690,31 @@ class NurseryAPITester(unittest.TestCase):
         print(f"   Shipping: ${calculation['shipping_cost']}")
         print(f"   Discount: ${calculation['discount_amount']}")
 
+    def test_18_health_and_readiness(self):
+        """Test liveness and readiness endpoints"""
+        print("\n🔍 Testing Health and Readiness...")
+        
+        response = requests.get(f"{self.base_url}/health")
+        self.assertEqual(response.status_code, 200, "Health check failed")
+        
+        response = requests.get(f"{self.base_url}/ready")
+        self.assertEqual(response.status_code, 200, f"Server should be ready: {response.text}")
+        readiness = response.json()
+        self.assertTrue(readiness["ready"], "Readiness should report ready")
+        self.assertGreater(readiness["startup_seconds"], 0, "Readiness should report the startup time")
+        self.assertIn(readiness["status"], ("ok", "degraded"), "A ready worker should not be down")
+        self.assertTrue(readiness["mongo"]["ok"], "Readiness should report a successful Mongo ping")
+        self.assertIn("reachable", readiness["paypal"], "Readiness should report PayPal reachability")
+        print(f"✅ Worker {readiness['pid']} ready {readiness['startup_seconds']}s after launch, "
+              f"status {readiness['status']}, Mongo ping {readiness['mongo']['latency_ms']}ms")
+        
+        response = requests.get(f"{self.base_url}/metrics")
+        self.assertEqual(response.status_code, 200, "Metrics endpoint failed")
+        self.assertIn('http_requests_total{method="GET",route="/api/plants"', response.text,
+                      "Metrics should count requests by route template")
+        self.assertIn("mongo_command_duration_seconds_bucket", response.text, "Metrics should time Mongo commands")
+        print(f"✅ Metrics exposed")
+
 if __name__ == "__main__":
     # Run the tests in order
     test_suite = unittest.TestSuite()
@@ -632,6 +738,7 @@ if __name__ == "__main__":
     test_suite.addTest(NurseryAPITester('test_15_authentication_required_endpoints'))
     test_suite.addTest(NurseryAPITester('test_16_comprehensive_error_handling'))
     test_suite.addTest(NurseryAPITester('test_17_data_integrity_and_calculations'))
+    test_suite.addTest(NurseryAPITester('test_18_health_and_readiness'))
     test_suite.addTest(NurseryAPITester('test_08_error_handling'))
     
     runner = unittest.TextTestRunner(verbosity=2)
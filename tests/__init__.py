@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The backend is a flat set of modules run from backend/, so tests import them the same way
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,29 @@
+"""Scratch Mongo databases for tests that talk to Mongo.
+
+Each test gets a throwaway database on MONGO_URL (default localhost), created
+with the API's indexes and dropped afterwards. Tests are skipped when no
+server answers, so the rest of the suite still runs without one.
+"""
+import os
+import unittest
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from indexes import ensure_indexes
+
+
+class MongoTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"), serverSelectionTimeoutMS=1000)
+        self.db = self.client[f"nursery_test_{uuid.uuid4().hex[:12]}"]
+        try:
+            await self.db.command("ping")
+        except Exception as e:
+            self.client.close()
+            raise unittest.SkipTest(f"No Mongo server available: {e}")
+        await ensure_indexes(self.db)
+
+    async def asyncTearDown(self):
+        await self.client.drop_database(self.db.name)
+        self.client.close()
@@ -0,0 +1,141 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+from tests.mongo import MongoTestCase
+
+from auth import Authenticator, TokenCache, UserCache, token_digest
+
+SECRET = "test-secret"
+
+
+class NonUtcTimezone:
+    """Run a test with the process in a zone ahead of UTC, where naive datetimes are misread"""
+
+    def setUp(self):
+        self._tz = os.environ.get("TZ")
+        os.environ["TZ"] = "Europe/Berlin"
+        time.tzset()
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        if self._tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = self._tz
+        time.tzset()
+
+
+class TokenCacheTest(NonUtcTimezone, unittest.TestCase):
+    def test_entry_expires_at_exp(self):
+        cache = TokenCache()
+        cache.set("digest", {"user_id": "user_001", "exp": 1000})
+        self.assertIsNotNone(cache.get("digest", 999.9))
+        self.assertIsNone(cache.get("digest", 1000))
+        self.assertIsNone(cache.get("digest", 999.9))
+
+    def test_cached_token_stops_verifying_at_exp(self):
+        authenticator = Authenticator(SECRET, token_ttl_seconds=1)
+        token = authenticator.create_token({"user_id": "user_001"})
+        payload = authenticator.verify(token)
+        self.assertEqual(payload["user_id"], "user_001")
+        self.assertEqual(authenticator.tokens.stats()["entries"], 1)
+
+        time.sleep(max(0.0, payload["exp"] - time.time()))
+        self.assertIsNone(authenticator.verify(token))
+        self.assertEqual(authenticator.tokens.stats()["entries"], 0)
+
+
+class RevocationTest(NonUtcTimezone, MongoTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.worker_a = Authenticator(SECRET)
+        self.worker_b = Authenticator(SECRET)
+
+    async def test_logout_revokes_the_token_only(self):
+        token = self.worker_a.create_token({"user_id": "user_001"})
+        other = self.worker_a.create_token({"user_id": "user_001"})
+        payload = self.worker_a.verify(token)
+
+        await self.worker_a.revoke_token(self.db, token, payload)
+
+        self.assertIsNone(self.worker_a.verify(token))
+        self.assertIsNotNone(self.worker_a.verify(other))
+
+    async def test_deactivation_revokes_tokens_issued_before_it(self):
+        tokens = [self.worker_a.create_token({"user_id": "user_001"}) for _ in range(2)]
+        bystander = self.worker_a.create_token({"user_id": "user_002"})
+        for token in tokens:
+            self.assertIsNotNone(self.worker_a.verify(token))
+
+        await self.worker_a.revoke_user(self.db, "user_001")
+
+        for token in tokens:
+            self.assertIsNone(self.worker_a.verify(token))
+        self.assertIsNotNone(self.worker_a.verify(bystander))
+
+    async def test_other_workers_pick_up_revocations_on_refresh(self):
+        logged_out = self.worker_a.create_token({"user_id": "user_001"})
+        deactivated = self.worker_a.create_token({"user_id": "user_002"})
+        self.assertIsNotNone(self.worker_b.verify(logged_out))
+        self.assertIsNotNone(self.worker_b.verify(deactivated))
+
+        await self.worker_a.revoke_token(self.db, logged_out, self.worker_a.verify(logged_out))
+        await self.worker_a.revoke_user(self.db, "user_002")
+        self.assertIsNotNone(self.worker_b.verify(logged_out))
+
+        self.assertEqual(await self.worker_b.revocations.refresh(self.db), 2)
+        self.assertIsNone(self.worker_b.verify(logged_out))
+        self.assertIsNone(self.worker_b.verify(deactivated))
+
+    async def test_refresh_prunes_revoked_tokens_once_expired(self):
+        token = self.worker_a.create_token({"user_id": "user_001"})
+        payload = self.worker_a.verify(token)
+        await self.worker_a.revoke_token(self.db, token, payload)
+        await self.worker_b.revocations.refresh(self.db)
+        self.assertEqual(self.worker_b.revocations.stats()["tokens"], 1)
+
+        # One second before exp the entry must still be held, whatever the local timezone
+        with mock.patch("time.time", return_value=payload["exp"] - 1):
+            await self.worker_b.revocations.refresh(self.db)
+        self.assertTrue(self.worker_b.revocations.is_revoked(token_digest(token), payload))
+
+        with mock.patch("time.time", return_value=payload["exp"] + 1):
+            await self.worker_b.revocations.refresh(self.db)
+        self.assertEqual(self.worker_b.revocations.stats()["tokens"], 0)
+
+
+class UserCacheTest(MongoTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        await self.db.users.insert_many([
+            {"id": f"user_{i:03}", "email": f"user{i}@example.com", "password_hash": "x"} for i in range(5)
+        ])
+
+    async def test_size_is_bounded(self):
+        cache = UserCache(ttl_seconds=60, max_entries=3)
+        for i in range(5):
+            self.assertNotIn("password_hash", await cache.get(self.db, f"user_{i:03}"))
+
+        self.assertEqual(cache.stats()["entries"], 3)
+        self.assertEqual(list(cache._entries), ["user_002", "user_003", "user_004"])
+
+    async def test_expired_entries_are_evicted(self):
+        cache = UserCache(ttl_seconds=0.05)
+        await cache.get(self.db, "user_000")
+        await cache.get(self.db, "user_001")
+        time.sleep(0.06)
+
+        await cache.get(self.db, "user_002")
+        self.assertEqual(list(cache._entries), ["user_002"])
+
+    async def test_missing_user_is_not_cached(self):
+        cache = UserCache(ttl_seconds=60)
+        self.assertIsNone(await cache.get(self.db, "nobody"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,17 @@
+import unittest
+
+from tests.mongo import MongoTestCase
+
+from indexes import explain_query_shapes
+
+
+class QueryShapesTest(MongoTestCase):
+    async def test_every_shape_is_served_by_an_index(self):
+        for result in await explain_query_shapes(self.db):
+            with self.subTest(collection=result["collection"], filter=result["filter"], sort=result.get("sort")):
+                self.assertFalse(result["collscan"], result["stages"])
+                self.assertFalse(result["in_memory_sort"], result["stages"])
+
+
+if __name__ == "__main__":
+    unittest.main()
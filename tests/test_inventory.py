@@ -0,0 +1,120 @@
+import unittest
+from datetime import datetime, timedelta
+
+from tests.mongo import MongoTestCase
+
+from inventory import HOLDS_FIELD, HOLDS_PROJECTION, InsufficientStock, InventoryEngine
+
+
+class InventoryEngineTest(MongoTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        await self.db.plants.insert_many([
+            {"id": "plant_001", "name": "Monstera", "stock_quantity": 10},
+            {"id": "plant_002", "name": "Ficus", "stock_quantity": 3},
+            {"id": "plant_003", "name": "Pothos", "stock_quantity": 7},
+        ])
+        self.inventory = InventoryEngine(reservation_ttl_seconds=3600)
+
+    async def stock(self):
+        return {plant["id"]: plant["stock_quantity"] async for plant in self.db.plants.find({}, {"_id": 0})}
+
+    async def holds(self):
+        return {
+            plant["id"]: plant[HOLDS_FIELD]
+            async for plant in self.db.plants.find({HOLDS_FIELD: {"$exists": True}}, {"_id": 0, "id": 1, HOLDS_FIELD: 1})
+        }
+
+    async def status(self, order_id):
+        reservation = await self.db.inventory_reservations.find_one({"order_id": order_id})
+        return reservation["status"] if reservation else None
+
+    async def test_reserve_takes_stock_once(self):
+        lines = {"plant_001": 2, "plant_002": 1}
+        await self.inventory.reserve(self.db, "order_1", lines)
+        await self.inventory.reserve(self.db, "order_1", lines)
+
+        self.assertEqual(await self.stock(), {"plant_001": 8, "plant_002": 2, "plant_003": 7})
+        self.assertEqual(await self.holds(), {"plant_001": {"order_1": 2}, "plant_002": {"order_1": 1}})
+        self.assertEqual(await self.status("order_1"), "held")
+
+    async def test_holds_are_projected_out_of_catalog_reads(self):
+        await self.inventory.reserve(self.db, "order_1", {"plant_001": 2})
+        plant = await self.db.plants.find_one({"id": "plant_001"}, {"_id": 0, **HOLDS_PROJECTION})
+        self.assertNotIn(HOLDS_FIELD, plant)
+
+    async def test_insufficient_stock_rolls_back_held_lines(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            await self.inventory.reserve(self.db, "order_1", {"plant_001": 2, "plant_002": 5, "plant_003": 1})
+
+        self.assertEqual(raised.exception.plant_ids, ["plant_002"])
+        self.assertEqual(await self.stock(), {"plant_001": 10, "plant_002": 3, "plant_003": 7})
+        self.assertEqual(await self.holds(), {})
+        self.assertEqual(await self.status("order_1"), "released")
+
+    async def test_commit_clears_holds_once(self):
+        await self.inventory.reserve(self.db, "order_1", {"plant_001": 2, "plant_002": 1})
+        self.assertEqual(await self.inventory.commit(self.db, "order_1", {"plant_001": 2, "plant_002": 1}), [])
+        self.assertEqual(await self.inventory.commit(self.db, "order_1", {"plant_001": 2, "plant_002": 1}), [])
+
+        self.assertEqual(await self.stock(), {"plant_001": 8, "plant_002": 2, "plant_003": 7})
+        self.assertEqual(await self.holds(), {})
+        self.assertEqual(await self.status("order_1"), "committed")
+
+    async def test_release_returns_stock_once(self):
+        await self.inventory.reserve(self.db, "order_1", {"plant_001": 2, "plant_002": 1})
+        self.assertTrue(await self.inventory.release(self.db, "order_1"))
+        self.assertFalse(await self.inventory.release(self.db, "order_1"))
+
+        self.assertEqual(await self.stock(), {"plant_001": 10, "plant_002": 3, "plant_003": 7})
+        self.assertEqual(await self.holds(), {})
+        self.assertEqual(await self.status("order_1"), "released")
+
+    async def test_clearing_one_order_keeps_other_holds(self):
+        await self.inventory.reserve(self.db, "order_1", {"plant_001": 2})
+        await self.inventory.reserve(self.db, "order_2", {"plant_001": 3})
+        await self.inventory.release(self.db, "order_1")
+
+        self.assertEqual(await self.stock(), {"plant_001": 7, "plant_002": 3, "plant_003": 7})
+        self.assertEqual(await self.holds(), {"plant_001": {"order_2": 3}})
+
+    async def test_commit_without_hold_decrements_once_and_reports_oversell(self):
+        lines = {"plant_001": 2, "plant_002": 5}
+        self.assertEqual(await self.inventory.commit(self.db, "order_1", lines), ["plant_002"])
+        self.assertEqual(await self.inventory.commit(self.db, "order_1", lines), [])
+
+        self.assertEqual(await self.stock(), {"plant_001": 8, "plant_002": 0, "plant_003": 7})
+
+    async def expire(self, order_id):
+        await self.db.inventory_reservations.update_one(
+            {"order_id": order_id}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+
+    async def test_reaper_releases_expired_holds_of_unpaid_orders(self):
+        await self.inventory.reserve(self.db, "order_1", {"plant_001": 2})
+        await self.db.orders.insert_one({"order_id": "order_1", "status": "CREATED"})
+        await self.expire("order_1")
+
+        self.assertEqual(await self.inventory.release_expired(self.db), 1)
+        self.assertEqual(await self.stock(), {"plant_001": 10, "plant_002": 3, "plant_003": 7})
+        self.assertEqual(await self.status("order_1"), "released")
+
+    async def test_reaper_commits_expired_holds_of_completed_orders(self):
+        # Payment went through but the commit after it failed, leaving the hold in place
+        await self.inventory.reserve(self.db, "order_1", {"plant_001": 2, "plant_002": 1})
+        await self.db.orders.insert_one({"order_id": "order_1", "status": "COMPLETED", "inventory_status": "error"})
+        await self.expire("order_1")
+
+        self.assertEqual(await self.inventory.release_expired(self.db), 0)
+        self.assertEqual(await self.stock(), {"plant_001": 8, "plant_002": 2, "plant_003": 7})
+        self.assertEqual(await self.holds(), {})
+        self.assertEqual(await self.status("order_1"), "committed")
+        order = await self.db.orders.find_one({"order_id": "order_1"})
+        self.assertEqual(order["inventory_status"], "committed")
+
+        self.assertEqual(await self.inventory.release_expired(self.db), 0)
+        self.assertEqual(await self.stock(), {"plant_001": 8, "plant_002": 2, "plant_003": 7})
+
+
+if __name__ == "__main__":
+    unittest.main()
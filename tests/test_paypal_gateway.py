@@ -0,0 +1,161 @@
+import asyncio
+import unittest
+
+import httpx
+
+import fake_paypal
+from paypal_gateway import PayPalError, PayPalGateway
+
+TOKEN_PATH = "/v1/oauth2/token"
+PAYMENT = {
+    "intent": "sale",
+    "payer": {"payment_method": "paypal"},
+    "transactions": [{"amount": {"total": "10.00", "currency": "USD"}}],
+}
+
+
+class ScriptedTransport(httpx.ASGITransport):
+    """Routes to fake_paypal.app, recording every request and injecting queued faults.
+
+    Faults apply to API calls only (not token requests), one per call:
+    a status code is answered without reaching the fake, "timeout" raises a
+    read timeout, and "lost" lets the fake handle the call but answers 502,
+    as when the response is lost on the way back.
+    """
+
+    def __init__(self):
+        super().__init__(app=fake_paypal.app)
+        self.requests = []
+        self.faults = []
+
+    def paths(self):
+        return [request.url.path for request in self.requests]
+
+    async def handle_async_request(self, request):
+        self.requests.append(request)
+        # The fake answers without ever suspending; a real round trip lets other requests run meanwhile
+        await asyncio.sleep(0)
+        if not self.faults or request.url.path == TOKEN_PATH:
+            return await super().handle_async_request(request)
+        fault = self.faults.pop(0)
+        if fault == "timeout":
+            raise httpx.ReadTimeout("simulated timeout", request=request)
+        if fault == "lost":
+            response = await super().handle_async_request(request)
+            await response.aread()
+            fault = 502
+        return httpx.Response(fault, json={"name": "SIMULATED", "message": f"simulated {fault}"})
+
+
+class PayPalGatewayTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        fake_paypal.payments.clear()
+        fake_paypal.tokens.clear()
+        fake_paypal.idempotent_responses.clear()
+        self.transport = ScriptedTransport()
+        self.gateway = self.make_gateway()
+
+    def make_gateway(self, **options):
+        options = {"max_retries": 2, "backoff_base": 0, **options}
+        gateway = PayPalGateway("client", "secret", base_url="http://paypal.test", transport=self.transport, **options)
+        self.addAsyncCleanup(gateway.aclose)
+        return gateway
+
+    def token_requests(self):
+        return self.transport.paths().count(TOKEN_PATH)
+
+    async def test_token_is_fetched_once_and_reused(self):
+        payment = await self.gateway.create_payment(PAYMENT)
+        await self.gateway.find_payment(payment["id"])
+        await self.gateway.find_payment(payment["id"])
+
+        self.assertEqual(self.token_requests(), 1)
+
+    async def test_concurrent_first_calls_share_one_token_request(self):
+        await asyncio.gather(*(self.gateway.create_payment(PAYMENT) for _ in range(5)))
+
+        self.assertEqual(self.token_requests(), 1)
+        self.assertEqual(len(fake_paypal.payments), 5)
+
+    async def test_token_is_refreshed_once_it_expires(self):
+        await self.gateway.create_payment(PAYMENT)
+        self.gateway._token_expires_at = 0
+        await self.gateway.create_payment(PAYMENT)
+
+        self.assertEqual(self.token_requests(), 2)
+
+    async def test_rejected_token_gets_one_free_retry(self):
+        gateway = self.make_gateway(max_retries=0)
+        await gateway.create_payment(PAYMENT)
+        # PayPal forgets the cached token, e.g. it was revoked
+        fake_paypal.tokens.clear()
+
+        payment = await gateway.create_payment(PAYMENT)
+
+        self.assertEqual(payment["state"], "created")
+        self.assertEqual(self.token_requests(), 2)
+
+    async def test_second_rejection_is_raised(self):
+        self.transport.faults = [401, 401]
+        with self.assertRaises(PayPalError) as raised:
+            await self.gateway.create_payment(PAYMENT)
+
+        self.assertEqual(raised.exception.status_code, 401)
+        self.assertEqual(self.token_requests(), 2)
+        self.assertEqual(fake_paypal.payments, {})
+
+    async def test_server_errors_and_timeouts_are_retried(self):
+        self.transport.faults = [503, "timeout"]
+        payment = await self.gateway.create_payment(PAYMENT)
+
+        self.assertEqual(payment["state"], "created")
+        self.assertEqual(self.transport.paths().count("/v1/payments/payment"), 3)
+        self.assertEqual(len(fake_paypal.payments), 1)
+
+    async def test_retries_are_bounded(self):
+        self.transport.faults = [500, 502, 503, 504]
+        with self.assertRaises(PayPalError) as raised:
+            await self.gateway.create_payment(PAYMENT)
+
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(self.transport.paths().count("/v1/payments/payment"), 3)
+        self.assertEqual(self.transport.faults, [504])
+
+    async def test_client_errors_are_not_retried(self):
+        with self.assertRaises(PayPalError) as raised:
+            await self.gateway.find_payment("PAYID-MISSING")
+
+        self.assertEqual(raised.exception.status_code, 404)
+        self.assertEqual(self.transport.paths().count("/v1/payments/payment/PAYID-MISSING"), 1)
+
+    async def test_retried_post_reuses_its_request_id(self):
+        # The first create reaches PayPal but its answer is lost; the retry must not create a second payment
+        self.transport.faults = ["lost"]
+        payment = await self.gateway.create_payment(PAYMENT, request_id="order-1")
+
+        creates = [request for request in self.transport.requests if request.url.path == "/v1/payments/payment"]
+        self.assertEqual([request.headers["PayPal-Request-Id"] for request in creates], ["order-1", "order-1"])
+        self.assertEqual(list(fake_paypal.payments), [payment["id"]])
+
+    async def test_retried_execute_is_not_applied_twice(self):
+        payment = await self.gateway.create_payment(PAYMENT)
+        self.transport.faults = ["lost"]
+
+        executed = await self.gateway.execute_payment(payment["id"], "PAYER-1")
+
+        self.assertEqual(executed["state"], "approved")
+        execute_path = f"/v1/payments/payment/{payment['id']}/execute"
+        executes = [request for request in self.transport.requests if request.url.path == execute_path]
+        self.assertEqual(len(executes), 2)
+        self.assertEqual(len({request.headers["PayPal-Request-Id"] for request in executes}), 1)
+
+    def test_backoff_is_jittered_within_the_exponential_window(self):
+        gateway = PayPalGateway("client", "secret", backoff_base=0.2)
+        for attempt in range(3):
+            delays = [gateway._backoff(attempt) for _ in range(200)]
+            self.assertTrue(all(0 <= delay <= 0.2 * 2 ** attempt for delay in delays))
+            self.assertGreater(len(set(delays)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from tests.mongo import MongoTestCase
+
+from ratings import reconcile_ratings
+
+
+class ReconcileRatingsTest(MongoTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        # Seeded figures without rating state, as plants were before the state existed
+        await self.db.plants.insert_many([
+            {"id": "plant_001", "name": "Monstera", "average_rating": 4.5, "total_reviews": 12},
+            {"id": "plant_002", "name": "Ficus", "average_rating": 4.8, "total_reviews": 9},
+        ])
+        await self.db.reviews.insert_many([
+            {"id": "review_1", "plant_id": "plant_001", "rating": 5},
+            {"id": "review_2", "plant_id": "plant_001", "rating": 4},
+            {"id": "review_3", "plant_id": "plant_001", "rating": 4},
+        ])
+
+    async def plant(self, plant_id):
+        return await self.db.plants.find_one({"id": plant_id}, {"_id": 0})
+
+    async def test_initialises_plants_without_rating_state(self):
+        self.assertEqual(await reconcile_ratings(self.db), 2)
+
+        reviewed = await self.plant("plant_001")
+        self.assertEqual(reviewed["rating_histogram"], {"1": 0, "2": 0, "3": 0, "4": 2, "5": 1})
+        self.assertEqual((reviewed["rating_sum"], reviewed["rating_count"]), (13, 3))
+        self.assertEqual((reviewed["average_rating"], reviewed["total_reviews"]), (4.3, 3))
+
+        unreviewed = await self.plant("plant_002")
+        self.assertEqual(unreviewed["rating_histogram"], {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0})
+        self.assertEqual((unreviewed["average_rating"], unreviewed["total_reviews"]), (0.0, 0))
+
+    async def test_second_run_finds_nothing_to_fix(self):
+        await reconcile_ratings(self.db)
+        self.assertEqual(await reconcile_ratings(self.db), 0)
+
+    async def test_repairs_drifted_state(self):
+        await reconcile_ratings(self.db)
+        await self.db.plants.update_one({"id": "plant_001"}, {"$set": {"rating_count": 7, "rating_histogram.5": 5}})
+
+        self.assertEqual(await reconcile_ratings(self.db), 1)
+        self.assertEqual((await self.plant("plant_001"))["rating_histogram"]["5"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()